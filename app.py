@@ -2,6 +2,9 @@ import os
 
 from flask import Flask
 
+from core import assets, profiler
+from core.cli import cli
+from core.git_store import start_from_config
 from core.router import router
 
 template_dir = os.path.abspath("templates")
@@ -16,3 +19,8 @@ if __debug__:
 
 
 app.register_blueprint(router)
+app.cli.add_command(cli)
+app.cli.add_command(assets.cli)
+
+git_store = start_from_config()
+sampling_profiler = profiler.start_from_config()
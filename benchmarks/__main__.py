@@ -0,0 +1,17 @@
+import os
+
+# the app refuses to start without these; benchmarks never log in for real
+os.environ.setdefault("LOGIN_KEY", "benchmark")
+os.environ.setdefault("TIMEZONE", "UTC")
+os.environ.setdefault("GEMINI_KEY", "unused")
+
+import sys  # noqa: E402
+
+if sys.argv[1:2] == ["tenants"]:
+    from .tenants import main  # noqa: E402
+
+    main(sys.argv[2:])
+else:
+    from .run import main  # noqa: E402
+
+    main()
@@ -0,0 +1,64 @@
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+
+from core import clock, entry_log
+from core.model import Status
+from core.storage import Storage
+
+STATUSES = [Status.PENDING, Status.COMPLETED, Status.DELETED]
+
+
+def synthetic_day(
+    day: datetime, tasks: int, log_length: int, rng: random.Random
+) -> list[dict]:
+    """Serialized entries for one day, in the format `Entry.serialize` writes."""
+    entries = []
+    for index in range(tasks):
+        created = day + timedelta(minutes=rng.randrange(24 * 60))
+        updated = created
+        status = Status.PENDING
+        log = [entry_log.encode(entry_log.CREATED, created)]
+        for _ in range(log_length - 1):
+            updated += timedelta(minutes=rng.randrange(1, 600))
+            if rng.random() < 0.2:
+                target = (updated + timedelta(days=1)).strftime("%d-%m-%Y")
+                log.append(entry_log.encode(entry_log.POSTPONED, updated, target))
+            else:
+                status = rng.choice(STATUSES)
+                log.append(entry_log.encode(entry_log.STATUS, updated, status.name))
+        entries.append(
+            {
+                "id": index,
+                "title": f"Task {index} of {day:%d-%m-%Y}",
+                "status": status.value,
+                "date_created": created.isoformat(),
+                "date_updated": updated.isoformat(),
+                "log": log,
+            }
+        )
+    return entries
+
+
+def generate(
+    storage: Storage,
+    years: float = 1.0,
+    tasks_per_day: int = 10,
+    log_length: int = 3,
+    seed: int = 0,
+    end: Optional[datetime] = None,
+) -> int:
+    """
+    Fill `storage` with `years` of history ending today and return the
+    number of entries written. Output is deterministic for a given seed.
+    """
+    rng = random.Random(seed)
+    end = (end or clock.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    days = {}
+    for offset in range(int(years * 365), -1, -1):
+        day = end - timedelta(days=offset)
+        days[day.strftime("%d-%m-%Y")] = synthetic_day(
+            day, tasks_per_day, max(1, log_length), rng
+        )
+    storage.save_days(days)
+    return sum(len(entries) for entries in days.values())
@@ -0,0 +1,275 @@
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+
+from flask import Flask
+
+from config import config
+from core import clock
+from core.cache import day_cache
+from core.model import Todo, open_storage
+from core.router import router
+
+from .generate import generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+@dataclass
+class Result:
+    name: str
+    kind: str
+    iterations: int
+    p50_ms: float
+    p99_ms: float
+    mean_ms: float
+    ops_per_s: float
+    peak_kib: float
+
+
+def percentile(samples: list[float], p: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    rank = max(1, math.ceil(p / 100 * len(samples)))
+    return samples[rank - 1]
+
+
+def measure(
+    name: str,
+    kind: str,
+    run: Callable[[int], object],
+    setup: Optional[Callable[[int], object]] = None,
+    iterations: int = 100,
+    cold: bool = False,
+) -> Result:
+    """
+    Time `iterations` calls of `run(i)`, each preceded by an untimed
+    `setup(i)`. Peak memory is taken in a separate, shorter pass, since
+    tracemalloc slows everything it watches.
+    """
+
+    def prepare(i: int) -> None:
+        if cold:
+            day_cache.clear()
+        if setup is not None:
+            setup(i)
+
+    samples = []
+    for i in range(iterations):
+        prepare(i)
+        start = time.perf_counter_ns()
+        run(i)
+        samples.append((time.perf_counter_ns() - start) / 1e6)
+
+    tracemalloc.start()
+    peak = 0
+    try:
+        for i in range(iterations, iterations + min(iterations, 5)):
+            prepare(i)
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            run(i)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    total = sum(samples)
+    samples.sort()
+    return Result(
+        name=name,
+        kind=kind,
+        iterations=iterations,
+        p50_ms=round(percentile(samples, 50), 3),
+        p99_ms=round(percentile(samples, 99), 3),
+        mean_ms=round(total / len(samples), 3),
+        ops_per_s=round(len(samples) / (total / 1000), 1) if total else 0.0,
+        peak_kib=round(peak / 1024, 1),
+    )
+
+
+def _client():
+    app = Flask(__name__, template_folder=os.path.join(ROOT, "templates"))
+    app.register_blueprint(router)
+    client = app.test_client()
+    client.set_cookie("_s_key", config.HASHED_LOGIN_KEY)
+    return client
+
+
+def _checked(response) -> None:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.path} -> {response.status_code}")
+
+
+def run_suite(iterations: int = 100, cold: bool = False) -> list[Result]:
+    """Benchmark every model operation and route against `config.DATA_PATH`."""
+    today = clock.today().key
+    client = _client()
+
+    def todo() -> Todo:
+        return Todo(date=today)
+
+    def add_one(i: int) -> None:
+        todo().add(f"setup {i}")
+
+    def last(i: int) -> int:
+        return len(todo()) - 1
+
+    model = [
+        ("Todo.add", lambda i: todo().add(f"bench {i}"), None),
+        ("Todo.update", lambda i: todo().update(i % len(todo()), title=f"r{i}"), None),
+        ("Todo.reorder", lambda i: todo().reorder(0, len(todo()) - 1), None),
+        ("Todo.postpone", lambda i: todo().postpone(last(i)), add_one),
+        ("Todo.percentage", lambda i: todo().percentage(), None),
+        ("Todo.percentage_weekly", lambda i: Todo.percentage_weekly(), None),
+    ]
+    routes = [
+        ("GET /", lambda i: _checked(client.get("/")), None),
+        ("GET /todo", lambda i: _checked(client.get(f"/todo?_t={today}")), None),
+        (
+            "POST /todo",
+            lambda i: _checked(
+                client.post(f"/todo?_t={today}", data={"title": f"bench {i}"})
+            ),
+            None,
+        ),
+        (
+            "POST /todo/<date>/<index>/completed",
+            lambda i: _checked(client.post(f"/todo/{today}/{last(i)}/completed")),
+            add_one,
+        ),
+        (
+            "POST /todo/<date>/<index>/postpone",
+            lambda i: _checked(client.post(f"/todo/{today}/{last(i)}/postpone")),
+            add_one,
+        ),
+        (
+            "DELETE /todo/<date>/<index>/delete",
+            lambda i: _checked(client.delete(f"/todo/{today}/{last(i)}/delete")),
+            add_one,
+        ),
+    ]
+
+    results = []
+    for kind, cases in (("model", model), ("route", routes)):
+        for name, run, setup in cases:
+            results.append(measure(name, kind, run, setup, iterations, cold))
+    return results
+
+
+def _commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.decode().strip()
+
+
+def compare(baseline: dict, current: dict) -> list[str]:
+    """One line per benchmark: p50 and p99 relative to `baseline`."""
+    previous = {result["name"]: result for result in baseline["results"]}
+    lines = []
+    for result in current["results"]:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        ratios = [
+            f"{key} x{result[key] / before[key]:.2f}" if before[key] else f"{key} n/a"
+            for key in ("p50_ms", "p99_ms")
+        ]
+        lines.append(f"{result['name']:<40} {'  '.join(ratios)}")
+    return lines
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the Todo model and routes on synthetic history.",
+    )
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--tasks-per-day", type=int, default=10)
+    parser.add_argument("--log-length", type=int, default=3)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", default=config.STORAGE_BACKEND)
+    parser.add_argument("--layout", default=config.STORAGE_LAYOUT)
+    parser.add_argument("--format", default=config.STORAGE_FORMAT)
+    parser.add_argument(
+        "--cold", action="store_true", help="clear the day cache before each sample"
+    )
+    parser.add_argument("--output", help="result file (default: benchmarks/results/)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    config.STORAGE_BACKEND = args.backend
+    config.STORAGE_LAYOUT = args.layout
+    config.STORAGE_FORMAT = args.format
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config.DATA_PATH = os.path.join(tmp, "todo.json")
+        with open(config.DATA_PATH, "w") as f:
+            f.write("{}")
+        storage = open_storage()
+        entries = generate(
+            storage, args.years, args.tasks_per_day, args.log_length, args.seed
+        )
+        size = sum(
+            os.path.getsize(os.path.join(directory, name))
+            for directory, _, names in os.walk(tmp)
+            for name in names
+        )
+        results = run_suite(args.iterations, args.cold)
+        storage.close()
+
+    report = {
+        "meta": {
+            "commit": _commit(),
+            "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "years": args.years,
+            "tasks_per_day": args.tasks_per_day,
+            "log_length": args.log_length,
+            "seed": args.seed,
+            "backend": args.backend,
+            "layout": args.layout,
+            "format": args.format,
+            "cold": args.cold,
+            "entries": entries,
+            "data_bytes": size,
+        },
+        "results": [asdict(result) for result in results],
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{report['meta']['timestamp']}-{report['meta']['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=4)
+
+    print(f"{entries} entries, {size / 1024:.0f} KiB on disk -> {output}")
+    for result in results:
+        print(
+            f"{result.name:<40} p50 {result.p50_ms:>9.3f} ms  p99 {result.p99_ms:>9.3f} ms"
+            f"  {result.ops_per_s:>9.1f}/s  peak {result.peak_kib:>9.1f} KiB"
+        )
+    if args.compare:
+        with open(args.compare) as f:
+            print(
+                "\n".join(
+                    ["", f"against {args.compare}:", *compare(json.load(f), report)]
+                )
+            )
+    return report
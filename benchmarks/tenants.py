@@ -0,0 +1,174 @@
+import argparse
+import gc
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict
+from typing import Optional
+
+from config import config
+from core import clock, counters, locking, search, storage, tenants
+
+from .run import RESULTS_DIR, _checked, _client, _commit, measure
+
+SETTINGS = ("TENANTS_DIR", "TENANTS_MAX_OPEN", "TENANTS_IDLE_SECONDS")
+
+
+def _registries() -> dict[str, int]:
+    """Sizes of the process-wide state kept per journal."""
+    return {
+        "storages": len(storage._storages),
+        "locks": len(locking._locks),
+        "counters": len(counters._counters),
+        "indexes": len(search._indexes),
+    }
+
+
+def load_test(
+    count: int = 2000,
+    requests: int = 2000,
+    max_open: int = 64,
+    idle_seconds: float = 900.0,
+    seed: int = 0,
+) -> dict:
+    """
+    Serve `count` synthetic tenants from one process, whose pool keeps at
+    most `max_open` journals open.
+
+    Every tenant's first request opens (and creates) its journal. Then
+    `requests` mixed reads and writes go half to a hot set of `max_open`
+    // 2 tenants and half to any tenant. Finally every journal is opened
+    once more under tracemalloc: the heap must level off once the pool
+    is full, however many tenants follow.
+    """
+    saved = {name: getattr(config, name) for name in SETTINGS}
+    with tempfile.TemporaryDirectory() as root:
+        config.TENANTS_DIR = root
+        config.TENANTS_MAX_OPEN = max_open
+        config.TENANTS_IDLE_SECONDS = idle_seconds
+        try:
+            report = _load(count, requests, max_open, seed)
+        finally:
+            tenants.pool_for(root).close()
+            for name, value in saved.items():
+                setattr(config, name, value)
+    report["meta"].update(
+        commit=_commit(),
+        timestamp=int(time.time()),
+        tenants=count,
+        requests=requests,
+        max_open=max_open,
+        idle_seconds=idle_seconds,
+        seed=seed,
+    )
+    return report
+
+
+def _load(count: int, requests: int, max_open: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    names = [f"tenant-{n:05d}" for n in range(count)]
+    tenants.keys_for(config.TENANTS_DIR).register(
+        {name: f"key-{name}" for name in names}
+    )
+    cookies = [tenants.hash_key(f"key-{name}") for name in names]
+    pool = tenants.pool_for(config.TENANTS_DIR)
+    client = _client()
+    today = clock.today().key
+    largest = 0
+
+    def request(tenant: int, method: str = "GET", **kwargs) -> None:
+        nonlocal largest
+        client.set_cookie("_s_key", cookies[tenant])
+        response = client.open(f"/todo?_t={today}", method=method, **kwargs)
+        # the journal is released once the response is closed, as a server does
+        response.close()
+        _checked(response)
+        largest = max(largest, len(pool))
+
+    hot = max(1, max_open // 2)
+    mix = [
+        rng.randrange(hot) if rng.random() < 0.5 else rng.randrange(count)
+        for _ in range(requests + 5)
+    ]
+    writes = [rng.random() < 0.3 for _ in mix]
+
+    # measure() runs 5 extra, traced iterations after the timed ones
+    results = [
+        measure(
+            "first request",
+            "tenant",
+            lambda i: request(i, "POST", data={"title": f"first task of {i}"}),
+            iterations=count - 5,
+        ),
+        measure(
+            "mixed traffic",
+            "tenant",
+            lambda i: request(
+                mix[i],
+                "POST" if writes[i] else "GET",
+                data={"title": f"task {i}"} if writes[i] else None,
+            ),
+            iterations=requests,
+        ),
+    ]
+
+    heap = []
+    tracemalloc.start()
+    try:
+        for n in range(count):
+            request(n)
+            if (n + 1) % max(1, count // 10) == 0:
+                gc.collect()
+                heap.append(round(tracemalloc.get_traced_memory()[0] / 1024, 1))
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "meta": {},
+        "pool": {**pool.stats(), "largest": largest},
+        "registries": _registries(),
+        # traced heap after every tenth of the final sweep
+        "heap_kib": heap,
+        "results": [asdict(result) for result in results],
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks tenants",
+        description="Load-test one process serving thousands of tenant journals.",
+    )
+    parser.add_argument("--tenants", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--max-open", type=int, default=64)
+    parser.add_argument("--idle-seconds", type=float, default=900.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/)")
+    args = parser.parse_args(argv)
+
+    report = load_test(
+        args.tenants, args.requests, args.max_open, args.idle_seconds, args.seed
+    )
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"tenants-{report['meta']['timestamp']}-{report['meta']['commit']}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=4)
+
+    pool = report["pool"]
+    print(
+        f"{args.tenants} tenants, at most {pool['largest']} of {pool['max_open']}"
+        f" journals open, {pool['evictions']} evictions -> {output}"
+    )
+    print(f"heap during the last sweep (KiB): {report['heap_kib']}")
+    for result in report["results"]:
+        print(
+            f"{result['name']:<20} p50 {result['p50_ms']:>9.3f} ms"
+            f"  p99 {result['p99_ms']:>9.3f} ms  {result['ops_per_s']:>9.1f}/s"
+        )
+    return report
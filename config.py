@@ -26,6 +26,88 @@ class Config:
         self.TIMEZONE: str = self.__get_key("TIMEZONE")
         self.GEMINI_KEY: str = self.__get_key("GEMINI_KEY")
 
+        # storage
+        self.DATA_PATH: str = self.__get_key(
+            "DATA_PATH", os.path.join(os.path.dirname(__file__), "data", "todo.json")
+        )
+        self.STORAGE_BACKEND: str = self.__get_key("STORAGE_BACKEND", "json")
+        # file | day | month
+        self.STORAGE_LAYOUT: str = self.__get_key("STORAGE_LAYOUT", "file")
+        # pretty | compact | binary; files in any format are always readable
+        self.STORAGE_FORMAT: str = self.__get_key("STORAGE_FORMAT", "pretty")
+
+        # one journal per tenant under TENANTS_DIR (unset: DATA_PATH only);
+        # at most TENANTS_MAX_OPEN are kept open, and idle ones are closed
+        self.TENANTS_DIR: str = self.__get_key("TENANTS_DIR", "")
+        self.TENANTS_MAX_OPEN: int = int(self.__get_key("TENANTS_MAX_OPEN", "256"))
+        self.TENANTS_IDLE_SECONDS: float = float(
+            self.__get_key("TENANTS_IDLE_SECONDS", "900")
+        )
+
+        # git history of the data directory
+        self.GIT_STORE: bool = self.__get_key("GIT_STORE", "") not in ("", "0", "false")
+        self.GIT_STORE_WINDOW: float = float(self.__get_key("GIT_STORE_WINDOW", "30"))
+        self.GIT_STORE_MAX_OPS: int = int(self.__get_key("GIT_STORE_MAX_OPS", "50"))
+        self.GIT_STORE_REMOTE: str = self.__get_key("GIT_STORE_REMOTE", "")
+
+        # pending tasks of the last ROLLOVER_DAYS days are carried over to
+        # today the first time the process opens it, when enabled
+        self.ROLLOVER_ON_OPEN: bool = self.__get_key("ROLLOVER_ON_OPEN", "") not in (
+            "",
+            "0",
+            "false",
+        )
+        self.ROLLOVER_DAYS: int = int(self.__get_key("ROLLOVER_DAYS", "30"))
+
+        # full-text search also covers the log text of every task
+        self.SEARCH_LOGS: bool = self.__get_key("SEARCH_LOGS", "") not in (
+            "",
+            "0",
+            "false",
+        )
+
+        # live updates of open views over server-sent events
+        self.LIVE_UPDATES: bool = self.__get_key("LIVE_UPDATES", "1") not in (
+            "",
+            "0",
+            "false",
+        )
+        self.LIVE_MAX_STREAMS: int = int(self.__get_key("LIVE_MAX_STREAMS", "32"))
+        # streams end after this long and the browser reconnects, so a
+        # stream never holds a worker indefinitely
+        self.LIVE_STREAM_SECONDS: float = float(
+            self.__get_key("LIVE_STREAM_SECONDS", "60")
+        )
+
+        # assistant: answers are cached on disk next to the data for
+        # AI_CACHE_TTL seconds and requested by AI_WORKERS background threads
+        self.AI_MODEL: str = self.__get_key("AI_MODEL", "gemini-2.0-flash")
+        self.AI_BASE_URL: str = self.__get_key(
+            "AI_BASE_URL", "https://generativelanguage.googleapis.com"
+        )
+        self.AI_CACHE_TTL: float = float(self.__get_key("AI_CACHE_TTL", "604800"))
+        self.AI_WORKERS: int = int(self.__get_key("AI_WORKERS", "2"))
+        self.AI_BATCH_SIZE: int = int(self.__get_key("AI_BATCH_SIZE", "8"))
+        self.AI_BATCH_WINDOW_MS: float = float(
+            self.__get_key("AI_BATCH_WINDOW_MS", "50")
+        )
+        self.AI_MAX_PENDING: int = int(self.__get_key("AI_MAX_PENDING", "64"))
+
+        # cache
+        self.CACHE_MAX_ENTRIES: int = int(self.__get_key("CACHE_MAX_ENTRIES", "50000"))
+        # rendered pages and partials, bounded by their total length
+        self.FRAGMENT_CACHE_MAX_CHARS: int = int(
+            self.__get_key("FRAGMENT_CACHE_MAX_CHARS", "16000000")
+        )
+
+        # instrumentation: Server-Timing headers and /metrics
+        self.METRICS: bool = self.__get_key("METRICS", "") not in ("", "0", "false")
+        # sampling profiler; per-route profiles are dumped here when set
+        self.PROFILE_DIR: str = self.__get_key("PROFILE_DIR", "")
+        self.PROFILE_INTERVAL_MS: float = float(
+            self.__get_key("PROFILE_INTERVAL_MS", "5")
+        )
+
         # in app
         self.HASHED_LOGIN_KEY = hashlib.sha256(self.LOGIN_KEY.encode()).hexdigest()
 
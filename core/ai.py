@@ -1,6 +1,399 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional, Protocol
+
 from config import config
 
+from . import codec
+from .clock import Day
+from .locking import atomic_write
+from .model import Entry, _load_days
+from .storage import Storage, on_release
+
+logger = logging.getLogger(__name__)
+
+GEMINI_URL = "https://generativelanguage.googleapis.com"
+# how often expired responses are swept from disk at most, in seconds
+SWEEP_SECONDS = 3600.0
+
+BATCH_INSTRUCTION = (
+    "Each part of the user's message is a separate request. Answer every "
+    "part on its own and reply with a JSON array holding one string per "
+    "part, in the same order."
+)
+
+
+class ProviderError(RuntimeError):
+    pass
+
+
+class Busy(RuntimeError):
+    """Too many requests are already waiting on the provider."""
+
+
+class Provider(Protocol):
+    # identifies the model in cache keys, so switching models misses
+    name: str
+
+    def complete(self, prompts: list[str]) -> list[str]:
+        """One answer per prompt, in order; raises ProviderError."""
+        ...
+
+
+class GeminiProvider:
+    """
+    Google's Gemini API over plain HTTP. Several prompts go out as one
+    request whose parts are answered with a JSON array, one answer each.
+    `base_url` points it at any server speaking the same protocol.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gemini-2.0-flash",
+        base_url: str = GEMINI_URL,
+        timeout: float = 30.0,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.name = f"gemini:{model}"
+
+    def _post(self, body: dict) -> dict:
+        request = urllib.request.Request(
+            f"{self.base_url}/v1beta/models/{self.model}:generateContent",
+            data=codec.dumps_compact(body),
+            headers={
+                "Content-Type": "application/json",
+                "x-goog-api-key": self.api_key,
+            },
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return codec.loads_json(response.read())
+        except (OSError, ValueError) as error:
+            # URLError and timeouts are OSErrors, malformed bodies ValueErrors
+            raise ProviderError(f"Gemini request failed: {error}") from error
+
+    @staticmethod
+    def _text(response: dict) -> str:
+        try:
+            parts = response["candidates"][0]["content"]["parts"]
+            return "".join(part.get("text", "") for part in parts)
+        except (KeyError, IndexError, TypeError) as error:
+            raise ProviderError("Gemini returned no candidate") from error
+
+    def complete(self, prompts: list[str]) -> list[str]:
+        if len(prompts) == 1:
+            body = {"contents": [{"role": "user", "parts": [{"text": prompts[0]}]}]}
+            return [self._text(self._post(body))]
+
+        body = {
+            "systemInstruction": {"parts": [{"text": BATCH_INSTRUCTION}]},
+            "contents": [
+                {"role": "user", "parts": [{"text": prompt} for prompt in prompts]}
+            ],
+            "generationConfig": {
+                "responseMimeType": "application/json",
+                "responseSchema": {"type": "ARRAY", "items": {"type": "STRING"}},
+            },
+        }
+        try:
+            answers = codec.loads_json(self._text(self._post(body)))
+        except ValueError as error:
+            raise ProviderError("Gemini returned a malformed batch") from error
+        if (
+            not isinstance(answers, list)
+            or len(answers) != len(prompts)
+            or not all(isinstance(answer, str) for answer in answers)
+        ):
+            raise ProviderError(
+                f"Gemini answered {len(prompts)} prompts with {answers!r:.80}"
+            )
+        return answers
+
+
+class ResponseCache:
+    """
+    Provider answers on disk, one file per content hash under
+    `directory`. A file's mtime is when it was written; answers older
+    than `ttl` seconds are misses and get removed, on lookup or by a
+    periodic sweep.
+    """
+
+    def __init__(self, directory: str, ttl: float):
+        self.directory = directory
+        self.ttl = ttl
+        self._swept = time.monotonic()
+        self._sweep_lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.txt")
+
+    def _expired(self, path: str) -> bool:
+        return time.time() - os.stat(path).st_mtime > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            if self._expired(path):
+                os.remove(path)
+                return None
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, text: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, text.encode("utf-8"))
+
+    def evict(self) -> int:
+        """Remove every expired answer; returns how many went."""
+        removed = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    if self._expired(path):
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def sweep_if_due(self) -> None:
+        with self._sweep_lock:
+            if time.monotonic() - self._swept < min(self.ttl, SWEEP_SECONDS):
+                return
+            self._swept = time.monotonic()
+        self.evict()
+
+
+def summary_prompt(date: str, entries: list[Entry]) -> str:
+    lines = "\n".join(f"- [{entry.status.value}] {entry.title}" for entry in entries)
+    return (
+        f"Summarize this day ({date}) of a personal task journal in two or "
+        "three sentences: what got done, what is still open, and anything "
+        f"that stands out.\n\n{lines}"
+    )
+
+
+def breakdown_prompt(entry: Entry) -> str:
+    return (
+        "Break this task from a personal task journal into three to six "
+        "concrete next steps, one short line each, as a plain list.\n\n"
+        f"Task: {entry.title}"
+    )
+
+
+def review_prompt(days: dict[str, list[Entry]]) -> str:
+    sections = []
+    for date, entries in days.items():
+        lines = "\n".join(
+            f"- [{entry.status.value}] {entry.title}" for entry in entries
+        )
+        sections.append(f"{date}\n{lines or '- nothing recorded'}")
+    return (
+        "Write a short weekly review of this personal task journal: what "
+        "was accomplished, what keeps getting postponed or dropped, and one "
+        "suggestion for next week.\n\n" + "\n\n".join(sections)
+    )
+
 
 class AI:
-    def __init__(self, api) -> None:
-        self.api_key = config.GEMINI_KEY
+    """
+    Assistant answers computed from the journal of `storage`.
+
+    Prompts are built from the data on the request thread and handed to
+    a pool of `workers` background threads, which send whatever is
+    waiting to the provider in batches of up to `batch_size`, after
+    lingering `window` seconds for more to arrive. Every answer is cached
+    on disk by the hash of the model and prompt, so a day that has not
+    changed never costs another call, and a prompt already in flight is
+    shared rather than sent twice. At most `max_pending` prompts wait at
+    once; past that `submit` raises `Busy`.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        provider: Provider,
+        ttl: float = 7 * 24 * 3600.0,
+        workers: int = 2,
+        batch_size: int = 8,
+        window: float = 0.05,
+        max_pending: int = 64,
+    ):
+        self.storage = storage
+        self.provider = provider
+        self.cache = ResponseCache(f"{storage.path}.ai", ttl)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.window = window
+        self.max_pending = max_pending
+
+        # key -> prompt, not yet taken by a worker
+        self._pending: OrderedDict[str, str] = OrderedDict()
+        # key -> future, from submit until the answer is cached
+        self._futures: dict[str, Future] = {}
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._closed = False
+
+        self.calls = 0
+
+    def key(self, prompt: str) -> str:
+        raw = codec.canonical({"provider": self.provider.name, "prompt": prompt})
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    def submit(self, prompt: str) -> Future:
+        """The answer to `prompt`; already done when it is cached."""
+        key = self.key(prompt)
+        with self._cond:
+            future = self._futures.get(key)
+            if future is not None:
+                return future
+            future = Future()
+            cached = self.cache.get(key)
+            if cached is not None:
+                future.set_result(cached)
+                return future
+            if self._closed:
+                raise RuntimeError("The assistant is closed")
+            if len(self._futures) >= self.max_pending:
+                raise Busy(f"{len(self._futures)} prompts are already waiting")
+            self._futures[key] = future
+            self._pending[key] = prompt
+            self._start()
+            self._cond.notify()
+            return future
+
+    def _start(self) -> None:
+        if self._threads:
+            return
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"ai-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _take(self) -> Optional[list[tuple[str, str]]]:
+        """The next batch, None once closed and drained."""
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            # give prompts submitted together a moment to join the batch
+            deadline = time.monotonic() + self.window
+            while len(self._pending) < self.batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(self.batch_size, len(self._pending))
+            self.calls += count > 0
+            return [self._pending.popitem(last=False) for _ in range(count)]
+
+    def _run(self) -> None:
+        while (batch := self._take()) is not None:
+            if batch:
+                self._send(batch)
+
+    def _send(self, batch: list[tuple[str, str]]) -> None:
+        keys = [key for key, _ in batch]
+        try:
+            answers = self.provider.complete([prompt for _, prompt in batch])
+            for key, answer in zip(keys, answers):
+                self.cache.put(key, answer)
+            outcome: object = answers
+        except Exception as error:
+            # failures are not cached; the next request for them retries
+            logger.exception("Assistant batch of %d failed", len(batch))
+            outcome = error
+
+        with self._cond:
+            futures = [self._futures.pop(key) for key in keys]
+        for n, future in enumerate(futures):
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome[n])
+        self.cache.sweep_if_due()
+
+    def close(self, wait: bool = True) -> None:
+        """Answer whatever is pending and stop the workers."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    # answers
+
+    def _done(self, text: str) -> Future:
+        future = Future()
+        future.set_result(text)
+        return future
+
+    def daily_summary(self, date: str) -> Future:
+        entries = _load_days(self.storage, [date])[date]
+        if not entries:
+            return self._done("Nothing was recorded on this day.")
+        return self.submit(summary_prompt(date, entries))
+
+    def breakdown(self, entry: Entry) -> Future:
+        return self.submit(breakdown_prompt(entry))
+
+    def weekly_review(self, date: str) -> Future:
+        """A review of the seven days ending with `date`."""
+        end = Day.parse(date)
+        dates = [(end - n).key for n in range(6, -1, -1)]
+        days = _load_days(self.storage, dates)
+        if not any(days.values()):
+            return self._done("Nothing was recorded this week.")
+        return self.submit(review_prompt({date: days[date] for date in dates}))
+
+
+_assistants: dict[str, AI] = {}
+_assistants_lock = threading.Lock()
+
+
+def ai_for(storage: Storage) -> AI:
+    """The process-wide assistant of `storage`, talking to the configured model."""
+    with _assistants_lock:
+        assistant = _assistants.get(storage.path)
+        if assistant is None:
+            provider = GeminiProvider(
+                config.GEMINI_KEY, config.AI_MODEL, config.AI_BASE_URL
+            )
+            assistant = _assistants[storage.path] = AI(
+                storage,
+                provider,
+                ttl=config.AI_CACHE_TTL,
+                workers=config.AI_WORKERS,
+                batch_size=config.AI_BATCH_SIZE,
+                window=config.AI_BATCH_WINDOW_MS / 1000,
+                max_pending=config.AI_MAX_PENDING,
+            )
+        return assistant
+
+
+@on_release
+def _close_assistant(path: str) -> None:
+    # pending prompts are still answered, without holding up the release
+    with _assistants_lock:
+        assistant = _assistants.pop(path, None)
+    if assistant is not None:
+        assistant.close(wait=False)
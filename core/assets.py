@@ -0,0 +1,185 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from typing import Optional
+
+import click
+from flask import Blueprint, Response, current_app, request, send_file
+from flask.cli import AppGroup
+from werkzeug.security import safe_join
+
+from . import codec
+from .locking import atomic_write
+from .storage import _stat_signature
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - only gzip variants are built then
+    brotli = None
+
+# built files live here, inside the static folder
+DIST = "dist"
+MANIFEST = "manifest.json"
+# sources of other build steps, never served themselves
+SOURCES = frozenset({"css/input.css"})
+# served variants in order of preference: Accept-Encoding token -> suffix
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _fingerprinted(name: str, data: bytes) -> str:
+    """`js/htmx.js` -> `js/htmx.<first 12 hex of its blake2b>.js`."""
+    digest = hashlib.blake2b(data, digest_size=6).hexdigest()
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest}{ext}"
+
+
+def _compressed(data: bytes) -> dict[str, bytes]:
+    """The variants of `data` worth serving: only those that are smaller."""
+    variants = {"gzip": gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    return {name: body for name, body in variants.items() if len(body) < len(data)}
+
+
+def build(static_dir: str) -> dict[str, dict]:
+    """
+    Write a fingerprinted, precompressed copy of every file under
+    `static_dir` to its `dist` folder, along with the manifest mapping
+    each name to its copy and the encodings it has. Copies from the
+    previous build are kept, so pages rendered before it still load,
+    and older ones removed. Returns the manifest.
+    """
+    dist = os.path.join(static_dir, DIST)
+    manifest: dict[str, dict] = {}
+    written = {MANIFEST}
+    for entry in Manifest(static_dir).entries().values():
+        written.add(entry["file"])
+        written.update(entry["file"] + ENCODINGS[name] for name in entry["encodings"])
+    for root, dirs, names in os.walk(static_dir):
+        if root == static_dir:
+            dirs[:] = [d for d in dirs if d != DIST]
+        for filename in sorted(names):
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, static_dir).replace(os.sep, "/")
+            if name in SOURCES:
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+
+            hashed = _fingerprinted(name, data)
+            variants = _compressed(data)
+            for suffix, body in [("", data)] + [
+                (ENCODINGS[encoding], body) for encoding, body in variants.items()
+            ]:
+                target = os.path.join(dist, hashed + suffix)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                atomic_write(target, body)
+                written.add(hashed + suffix)
+            manifest[name] = {"file": hashed, "encodings": sorted(variants)}
+
+    for root, _, names in os.walk(dist):
+        for filename in names:
+            path = os.path.join(root, filename)
+            if os.path.relpath(path, dist).replace(os.sep, "/") not in written:
+                os.remove(path)
+    atomic_write(os.path.join(dist, MANIFEST), codec.dumps(manifest, "pretty"))
+    return manifest
+
+
+class Manifest:
+    """
+    The asset manifest of a static folder, reloaded whenever the build
+    replaces it. Without a build every name resolves to the plain static
+    file, so development and tests need no build step.
+    """
+
+    def __init__(self, static_dir: str):
+        self.path = os.path.join(static_dir, DIST, MANIFEST)
+        self._lock = threading.Lock()
+        self._signature: Optional[tuple] = None
+        self._entries: dict[str, dict] = {}
+
+    def _refresh(self) -> None:
+        signature = _stat_signature(self.path)
+        if signature == self._signature:
+            return
+        try:
+            with open(self.path, "rb") as f:
+                entries = codec.loads_json(f.read())
+        except FileNotFoundError:
+            entries = {}
+        self._entries = entries
+        self._signature = signature
+
+    def entries(self) -> dict[str, dict]:
+        with self._lock:
+            self._refresh()
+            return self._entries
+
+    def get(self, name: str) -> Optional[dict]:
+        return self.entries().get(name)
+
+
+_manifests: dict[str, Manifest] = {}
+_manifests_lock = threading.Lock()
+
+
+def manifest_for(static_dir: str) -> Manifest:
+    with _manifests_lock:
+        manifest = _manifests.get(static_dir)
+        if manifest is None:
+            manifest = _manifests[static_dir] = Manifest(static_dir)
+        return manifest
+
+
+assets = Blueprint("assets", __name__)
+
+
+@assets.app_template_global()
+def asset(name: str) -> str:
+    """URL of the static file `name`, fingerprinted when it has been built."""
+    static_dir = current_app.static_folder
+    entry = manifest_for(static_dir).get(name) if static_dir else None
+    if entry is None:
+        return f"{current_app.static_url_path or ''}/{name}"
+    return f"{request.script_root}/assets/{entry['file']}"
+
+
+@assets.route("/assets/<path:file>", methods=["GET"])
+def serve(file: str):
+    """
+    A built asset, in the best precompressed variant the browser accepts.
+    The name changes with the content, so it is cached for good.
+    """
+    static_dir = current_app.static_folder
+    path = safe_join(os.path.join(static_dir, DIST), file) if static_dir else None
+    if path is None or file == MANIFEST or not os.path.isfile(path):
+        return Response("Not found", status=404)
+
+    encoding = None
+    for candidate, suffix in ENCODINGS.items():
+        if request.accept_encodings[candidate] and os.path.isfile(path + suffix):
+            path, encoding = path + suffix, candidate
+            break
+
+    mimetype = mimetypes.guess_type(file)[0] or "application/octet-stream"
+    response = send_file(path, mimetype=mimetype, etag=False, conditional=False)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = IMMUTABLE
+    return response
+
+
+cli = AppGroup("assets", help="Static asset pipeline.")
+
+
+@cli.command("build")
+def build_command():
+    """Fingerprint and precompress the static files for serving."""
+    manifest = build(current_app.static_folder)
+    compressed = sum(1 for entry in manifest.values() if entry["encodings"])
+    click.echo(f"Built {len(manifest)} assets, {compressed} precompressed")
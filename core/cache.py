@@ -0,0 +1,195 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from config import config
+
+
+class DayCache:
+    """
+    Process-wide LRU of deserialized days. Callers store and receive
+    copies (see `model._copies`), so cached entries are never mutated.
+
+    Every cached day remembers the storage signature (inode, mtime, size of
+    the backing file) it was read at; a lookup with a different signature is
+    a miss, so edits made outside the app are picked up on the next request.
+    Memory is bounded by the total number of cached entries rather than the
+    number of days, since one busy day can outweigh months of quiet ones.
+    """
+
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        # key -> (signature, entries, version)
+        self._days: OrderedDict[Hashable, tuple[Any, list, Optional[str]]] = (
+            OrderedDict()
+        )
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(
+        self, key: Hashable, signature: Any
+    ) -> Optional[tuple[list, Optional[str]]]:
+        """The cached entries and content version of `key`, if still fresh."""
+        with self._lock:
+            cached = self._days.get(key)
+            if cached is None or signature is None or cached[0] != signature:
+                self.misses += 1
+                return None
+            self._days.move_to_end(key)
+            self.hits += 1
+            return cached[1], cached[2]
+
+    def get(self, key: Hashable, signature: Any) -> Optional[list]:
+        cached = self.lookup(key, signature)
+        return None if cached is None else cached[0]
+
+    def put(
+        self,
+        key: Hashable,
+        signature: Any,
+        entries: list,
+        version: Optional[str] = None,
+    ) -> None:
+        if signature is None:
+            self.invalidate(key)
+            return
+        with self._lock:
+            self._discard(key)
+            self._days[key] = (signature, entries, version)
+            self._size += len(entries)
+            while self._size > self.max_entries and len(self._days) > 1:
+                oldest = next(iter(self._days))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._discard(key)
+
+    def forget(self, path: str) -> None:
+        """Drop every day of the storage at `path`."""
+        with self._lock:
+            for key in [key for key in self._days if key[0] == path]:
+                self._discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._days.clear()
+            self._size = 0
+
+    def _discard(self, key: Hashable) -> None:
+        cached = self._days.pop(key, None)
+        if cached is not None:
+            self._size -= len(cached[1])
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "days": len(self._days),
+                "entries": self._size,
+                "max_entries": self.max_entries,
+            }
+
+
+day_cache = DayCache(config.CACHE_MAX_ENTRIES)
+
+
+class FragmentCache:
+    """
+    Process-wide LRU of rendered HTML.
+
+    Keys are `(storage path, day, name, ...)` tuples, with a None day for
+    pages spanning many days. Every fragment is kept with the version it
+    was rendered at and a lookup with another version is a miss, so a
+    stale fragment is never served even when a write from another process
+    was missed; invalidation only frees the memory early. Memory is
+    bounded by the total length of the cached HTML.
+    """
+
+    def __init__(self, max_chars: int = 16_000_000):
+        self.max_chars = max_chars
+        # key -> (version, html)
+        self._fragments: OrderedDict[tuple, tuple[Hashable, str]] = OrderedDict()
+        # (storage path, day) -> keys cached for it
+        self._by_day: dict[tuple, set[tuple]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple, version: Hashable) -> Optional[str]:
+        with self._lock:
+            cached = self._fragments.get(key)
+            if cached is None or cached[0] != version:
+                self.misses += 1
+                return None
+            self._fragments.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+    def put(self, key: tuple, version: Hashable, html: str) -> None:
+        with self._lock:
+            self._discard(key)
+            self._fragments[key] = (version, html)
+            self._by_day.setdefault(key[:2], set()).add(key)
+            self._size += len(html)
+            while self._size > self.max_chars and len(self._fragments) > 1:
+                self._discard(next(iter(self._fragments)))
+                self.evictions += 1
+
+    def invalidate_day(self, path: str, date: Optional[str]) -> None:
+        """Drop every fragment of `date` (None: the multi-day pages)."""
+        with self._lock:
+            for key in list(self._by_day.get((path, date), ())):
+                self._discard(key)
+
+    def forget(self, path: str) -> None:
+        """Drop every fragment of the storage at `path`."""
+        with self._lock:
+            for day in [day for day in self._by_day if day[0] == path]:
+                for key in list(self._by_day.get(day, ())):
+                    self._discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fragments.clear()
+            self._by_day.clear()
+            self._size = 0
+
+    def _discard(self, key: tuple) -> None:
+        cached = self._fragments.pop(key, None)
+        if cached is None:
+            return
+        self._size -= len(cached[1])
+        keys = self._by_day.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_day[key[:2]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "fragments": len(self._fragments),
+                "chars": self._size,
+                "max_chars": self.max_chars,
+            }
+
+
+fragment_cache = FragmentCache(config.FRAGMENT_CACHE_MAX_CHARS)
@@ -0,0 +1,214 @@
+import os
+from typing import Optional
+
+import click
+from flask.cli import AppGroup
+
+from config import config
+
+from . import counters, search, tenants, transfer
+from .git_store import GitStore
+from .goals import goals_for
+from .history import history_for
+from .history import migrate as migrate_logs
+from .model import open_storage
+from .storage import SqliteStorage, migrate_to_shards, sqlite_path
+
+cli = AppGroup("journal", help="Maintenance commands for the journal data.")
+
+
+@cli.command("shard")
+@click.option(
+    "--layout",
+    type=click.Choice(["day", "month"]),
+    default="month",
+    show_default=True,
+)
+@click.option(
+    "--source", help="Single-file journal to convert (defaults to DATA_PATH)."
+)
+def shard(layout: str, source: Optional[str]):
+    """Split the single-file journal into per-day or per-month shards."""
+    source = os.path.abspath(source or config.DATA_PATH)
+    target = migrate_to_shards(source, layout)
+    click.echo(f"Wrote {len(target.dates())} days to {target.path}")
+    click.echo(f"Set STORAGE_LAYOUT={layout} to start using them.")
+
+
+def _git_store() -> GitStore:
+    return GitStore(os.path.dirname(os.path.abspath(config.DATA_PATH)))
+
+
+@cli.command("history")
+@click.argument("date")
+def history(date: str):
+    """List the commits that changed DATE (dd-mm-yyyy)."""
+    for commit in _git_store().history(open_storage(), date):
+        click.echo(f"{commit.sha[:12]}  {commit.timestamp}  {commit.message}")
+
+
+@cli.command("restore")
+@click.argument("date")
+@click.argument("sha")
+def restore(date: str, sha: str):
+    """Restore DATE (dd-mm-yyyy) to its state at commit SHA."""
+    entries = _git_store().restore(open_storage(), date, sha)
+    click.echo(f"Restored {len(entries)} entries on {date} from {sha[:12]}")
+
+
+def _tenant_keys() -> tenants.TenantKeys:
+    if not config.TENANTS_DIR:
+        raise click.ClickException("Set TENANTS_DIR to keep a journal per tenant")
+    return tenants.keys_for(config.TENANTS_DIR)
+
+
+@cli.group("tenants")
+def tenants_group():
+    """Manage the tenants sharing this deployment."""
+
+
+@tenants_group.command("add")
+@click.argument("name")
+@click.password_option("--key", help="Login key of the tenant.")
+def add_tenant(name: str, key: str):
+    """Add tenant NAME, or change its login key."""
+    try:
+        _tenant_keys().register({name: key})
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    click.echo(f"Tenant {name} can log in; its journal is created on first use")
+
+
+@tenants_group.command("list")
+def list_tenants():
+    """List every tenant."""
+    for name in _tenant_keys().names():
+        click.echo(name)
+
+
+@cli.command("sqlite-import")
+@click.option("--source", help="Single-file journal to import (defaults to DATA_PATH).")
+def sqlite_import(source: Optional[str]):
+    """Load a JSON journal into the SQLite database next to DATA_PATH."""
+    source = os.path.abspath(source or config.DATA_PATH)
+    storage = SqliteStorage(sqlite_path(os.path.abspath(config.DATA_PATH)))
+    click.echo(f"Imported {storage.import_json(source)} days into {storage.path}")
+
+
+@cli.command("sqlite-export")
+@click.argument("target")
+def sqlite_export(target: str):
+    """Write the SQLite database next to DATA_PATH out as a JSON journal."""
+    storage = SqliteStorage(sqlite_path(os.path.abspath(config.DATA_PATH)))
+    click.echo(f"Exported {storage.export_json(target)} days to {target}")
+
+
+@cli.command("counters")
+@click.option("--rebuild", is_flag=True, help="Recompute the counters from the data.")
+def counters_command(rebuild: bool):
+    """Check the per-day status counters against the data."""
+    storage = open_storage()
+    if rebuild:
+        click.echo(f"Rebuilt counters for {len(counters.rebuild(storage))} days")
+        return
+
+    drift = counters.verify(storage)
+    for date, (stored, actual) in sorted(drift.items()):
+        click.echo(f"{date}: stored {stored}, actual {actual}")
+    if drift:
+        raise click.ClickException(
+            f"{len(drift)} day(s) drifted, run with --rebuild to fix"
+        )
+    click.echo("Counters match the data")
+
+
+@cli.command("search")
+@click.argument("query", required=False)
+@click.option("--rebuild", is_flag=True, help="Rebuild the index from the data.")
+def search_command(query: Optional[str], rebuild: bool):
+    """Search task titles, or rebuild the search index."""
+    storage = open_storage()
+    if rebuild:
+        click.echo(f"Indexed {search.rebuild(storage)} tasks")
+    if query:
+        for result in search.index_for(storage).search(query):
+            click.echo(f"{result['date']}  {result['status']:<9}  {result['title']}")
+
+
+@cli.command("goals")
+@click.option("--rebuild", is_flag=True, help="Recompute the rollups from the data.")
+def goals_command(rebuild: bool):
+    """Check the materialized goal progress against the data."""
+    store = goals_for(open_storage())
+    if rebuild:
+        click.echo(f"Rebuilt goal rollups over {store.rebuild()} linked tasks")
+        return
+
+    titles = {goal.id: goal.title for goal in store.goals()}
+    drift = store.verify()
+    for goal_id, (stored, actual) in sorted(drift.items()):
+        click.echo(f"{titles[goal_id]}: stored {stored}, actual {actual}")
+    if drift:
+        raise click.ClickException(
+            f"{len(drift)} goal(s) drifted, run with --rebuild to fix"
+        )
+    click.echo(f"Rollups of {len(titles)} goal(s) match the data")
+
+
+@cli.command("logs")
+@click.option(
+    "--migrate", is_flag=True, help="Move logs still kept inline into the store."
+)
+def logs_command(migrate: bool):
+    """Inspect the per-task history store, or migrate inline logs into it."""
+    storage = open_storage()
+    if migrate:
+        click.echo(f"Moved the logs of {migrate_logs(storage)} tasks")
+    click.echo(f"{len(history_for(storage))} tasks have a stored log")
+
+
+def _format_of(path: str, format: Optional[str]) -> str:
+    if format:
+        return format
+    return "csv" if path.endswith(".csv") else "ndjson"
+
+
+@cli.command("export")
+@click.argument("target", default="-")
+@click.option("--format", "format", type=click.Choice(transfer.FORMATS))
+@click.option("--start", help="First day to export (dd-mm-yyyy).")
+@click.option("--end", help="Last day to export (dd-mm-yyyy).")
+def export_command(
+    target: str, format: Optional[str], start: Optional[str], end: Optional[str]
+):
+    """Stream entries to TARGET (stdout by default), one per line."""
+    format = _format_of(target, format)
+    with click.open_file(target, "w", encoding="utf-8", newline="") as f:
+        count = 0
+        for line in transfer.export(open_storage(), format, start, end):
+            f.write(line)
+            count += 1
+    if target != "-":
+        rows = count - 1 if format == "csv" else count
+        click.echo(f"Exported {max(rows, 0)} entries to {target}")
+
+
+@cli.command("import")
+@click.argument("source")
+@click.option("--format", "format", type=click.Choice(transfer.FORMATS))
+@click.option(
+    "--chunk-size",
+    type=int,
+    default=transfer.IMPORT_CHUNK_SIZE,
+    show_default=True,
+    help="Entries written per storage write.",
+)
+def import_command(source: str, format: Optional[str], chunk_size: int):
+    """Load an export (NDJSON or CSV) into the journal, skipping known entries."""
+    format = _format_of(source, format)
+    with click.open_file(source, "r", encoding="utf-8", newline="") as f:
+        try:
+            added = transfer.load(open_storage(), f, format, chunk_size)
+        except ValueError as error:
+            raise click.ClickException(str(error))
+    click.echo(f"Imported {added} entries")
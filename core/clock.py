@@ -0,0 +1,172 @@
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, tzinfo
+from functools import lru_cache
+from typing import Iterator, Optional, Union
+from zoneinfo import ZoneInfo
+
+from config import config
+
+KEY_FORMAT = "%d-%m-%Y"
+
+
+@lru_cache(maxsize=4096)
+def _parse_key(key: str) -> int:
+    # the canonical "dd-mm-yyyy" is sliced; strptime costs ~20x more and
+    # is only left for anything else it might accept, and its errors
+    if len(key) == 10 and key[2] == key[5] == "-":
+        day, month, year = key[:2], key[3:5], key[6:]
+        if day.isdigit() and month.isdigit() and year.isdigit():
+            try:
+                return date(int(year), int(month), int(day)).toordinal()
+            except ValueError:
+                pass
+    return datetime.strptime(key, KEY_FORMAT).toordinal()
+
+
+@lru_cache(maxsize=4096)
+def _format_key(ordinal: int) -> str:
+    day = date.fromordinal(ordinal)
+    return f"{day.day:02d}-{day.month:02d}-{day.year:04d}"
+
+
+class Day(int):
+    """
+    A calendar day as its proleptic Gregorian ordinal.
+
+    Days compare, hash and subtract like the ints they are and convert
+    to and from the `%d-%m-%Y` keys the data is stored under through
+    small caches, so code can do date arithmetic without round-tripping
+    through `strptime`/`strftime`. Adding an int gives a Day; subtracting
+    a Day gives the number of days between them.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def parse(cls, key: str) -> "Day":
+        """The day of a `%d-%m-%Y` key; ValueError when it is not one."""
+        return cls(_parse_key(key))
+
+    @classmethod
+    def of(cls, value: Union["Day", str, date]) -> "Day":
+        """The day of a key, `date` or `datetime` (in its own zone)."""
+        if isinstance(value, Day):
+            return value
+        if isinstance(value, str):
+            return cls.parse(value)
+        if isinstance(value, datetime):
+            value = value.date()
+        return cls(value.toordinal())
+
+    @property
+    def key(self) -> str:
+        """The `%d-%m-%Y` form."""
+        return _format_key(self)
+
+    @property
+    def date(self) -> date:
+        return date.fromordinal(self)
+
+    def isoformat(self) -> str:
+        return self.date.isoformat()
+
+    def __add__(self, days: int) -> "Day":
+        return Day(int(self) + days)
+
+    __radd__ = __add__
+
+    def __sub__(self, other: int) -> Union["Day", int]:
+        if isinstance(other, Day):
+            return int(self) - int(other)
+        return Day(int(self) - other)
+
+    def __str__(self) -> str:
+        return self.key
+
+    def __repr__(self) -> str:
+        return f"Day({self.key!r})"
+
+
+def key_to_iso(key: str) -> str:
+    """`%d-%m-%Y` -> `%Y-%m-%d`, which sorts chronologically."""
+    # built from the parsed day, since strptime also accepts unpadded keys
+    return Day.parse(key).isoformat()
+
+
+def iso_to_key(iso: str) -> str:
+    """`%Y-%m-%d` -> `%d-%m-%Y`."""
+    return f"{iso[8:10]}-{iso[5:7]}-{iso[:4]}"
+
+
+class Clock:
+    """
+    The application's source of the current time, in the configured zone.
+    The zone object is resolved once per TIMEZONE value instead of on
+    every call.
+    """
+
+    def __init__(self, timezone: Optional[str] = None):
+        # None follows config.TIMEZONE
+        self._timezone = timezone
+        self._zone: Optional[tuple[str, tzinfo]] = None
+
+    @property
+    def tz(self) -> tzinfo:
+        name = self._timezone or config.TIMEZONE
+        if self._zone is None or self._zone[0] != name:
+            self._zone = (name, ZoneInfo(name))
+        return self._zone[1]
+
+    def now(self) -> datetime:
+        return datetime.now(self.tz)
+
+    def today(self) -> Day:
+        return Day.of(self.now())
+
+
+class FrozenClock(Clock):
+    """A clock that only moves when told to, for tests."""
+
+    def __init__(self, at: datetime, timezone: Optional[str] = None):
+        super().__init__(timezone)
+        self._at = at if at.tzinfo else at.replace(tzinfo=self.tz)
+
+    def now(self) -> datetime:
+        return self._at
+
+    def advance(self, **delta: float) -> datetime:
+        """Move time forward by `timedelta(**delta)`."""
+        self._at += timedelta(**delta)
+        return self._at
+
+
+_active: Clock = Clock()
+_lock = threading.Lock()
+
+
+def now() -> datetime:
+    return _active.now()
+
+
+def today() -> Day:
+    return _active.today()
+
+
+def use(new: Clock) -> Clock:
+    """Make `new` the application clock; returns the previous one."""
+    global _active
+    with _lock:
+        previous, _active = _active, new
+    return previous
+
+
+@contextmanager
+def frozen(at: datetime, timezone: Optional[str] = None) -> Iterator[FrozenClock]:
+    """Freeze the application clock at `at` for the enclosed block."""
+    clock = FrozenClock(at, timezone)
+    previous = use(clock)
+    try:
+        yield clock
+    finally:
+        use(previous)
@@ -0,0 +1,78 @@
+import json
+from typing import Any, Optional
+
+from config import config
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib json module is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - only needed for the binary format
+    msgpack = None
+
+# pretty: the original indented JSON, readable and diffable in git history
+# compact: JSON without any whitespace
+# binary: MessagePack, needs the msgpack package
+FORMATS = ("pretty", "compact", "binary")
+
+# the first byte of a JSON document; MessagePack maps start at 0x80 or above
+_JSON_START = frozenset(b"{[ \t\r\n")
+
+
+def dumps(data: Any, format: Optional[str] = None) -> bytes:
+    """
+    Encode a data file in `format`, STORAGE_FORMAT by default. Compact JSON
+    goes through orjson when it is installed.
+    """
+    format = format or config.STORAGE_FORMAT
+    match format:
+        case "pretty":
+            return json.dumps(data, indent=4).encode()
+        case "compact":
+            return dumps_compact(data)
+        case "binary":
+            if msgpack is None:
+                raise RuntimeError("The binary storage format needs msgpack installed")
+            return msgpack.packb(data, use_bin_type=True)
+    raise ValueError(f"Unknown storage format {format!r}")
+
+
+def loads(raw: bytes) -> Any:
+    """Decode a data file written in any of the formats."""
+    if not raw or raw[0] in _JSON_START:
+        return loads_json(raw) if raw.strip() else {}
+    if msgpack is None:
+        raise RuntimeError("Reading a binary data file needs msgpack installed")
+    return msgpack.unpackb(raw, raw=False)
+
+
+def read(path: str) -> Any:
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def dumps_compact(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def loads_json(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def dumps_line(data: Any) -> bytes:
+    """One compact JSON line, for the append-only journal and counter files."""
+    return dumps_compact(data) + b"\n"
+
+
+def canonical(data: Any) -> bytes:
+    """A stable encoding with sorted keys, for hashing content versions."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
@@ -0,0 +1,226 @@
+import bisect
+import os
+import threading
+from datetime import date
+from typing import Iterable, Optional
+
+from . import codec
+from .clock import Day, key_to_iso
+from .entry_log import postponed_to
+from .events import Mutation, subscribe
+from .history import history_for, uid_of
+from .locking import atomic_write, file_lock
+from .storage import Storage, on_release
+
+
+class StatusCounters:
+    """
+    Per-day status counters kept in a `<data>.counts` file next to the data:
+    one count per status value, plus `postponed` for entries moved away.
+
+    The file is append-only: every change is one `{"date", "delta"}` (or
+    `{"date", "set"}`) line, so an update costs O(1) no matter how much
+    history there is. Lines are replayed into memory once per process and
+    then tailed, the same way the journal backend does it; when the file
+    grows well past one line per day it is rewritten compactly.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = file_lock(path)
+        self._counts: Optional[dict[str, dict[str, int]]] = None
+        self._identity: Optional[tuple[int, int]] = None
+        self._offset = 0
+        self._lines = 0
+        # ISO keys of every counted day, sorted, for range scans
+        self._index: list[tuple[str, str]] = []
+        self._indexed = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @staticmethod
+    def _apply(counts: dict[str, dict[str, int]], line: dict) -> None:
+        day = counts.setdefault(line["date"], {})
+        if "set" in line:
+            day.clear()
+            day.update(line["set"])
+        for key, delta in line.get("delta", {}).items():
+            day[key] = day.get(key, 0) + delta
+
+    def _refresh(self) -> dict[str, dict[str, int]]:
+        try:
+            stat = os.stat(self.path)
+            identity = (stat.st_dev, stat.st_ino)
+        except FileNotFoundError:
+            identity = None
+
+        if self._counts is None or identity != self._identity:
+            self._counts, self._offset, self._lines = {}, 0, 0
+            self._identity = identity
+        if identity is None:
+            return self._counts
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self._apply(self._counts, codec.loads_json(line))
+                self._offset += len(line)
+                self._lines += 1
+        return self._counts
+
+    def _append(self, line: dict) -> None:
+        with self._lock:
+            counts = self._refresh()
+            raw = codec.dumps_line(line)
+            with open(self.path, "ab") as f:
+                f.write(raw)
+            if self._identity is None:
+                stat = os.stat(self.path)
+                self._identity = (stat.st_dev, stat.st_ino)
+            self._offset += len(raw)
+            self._lines += 1
+            self._apply(counts, line)
+
+            if self._lines > 4 * len(counts) + 1000:
+                self.replace_all(counts)
+
+    def get(self, dates: Iterable[str]) -> dict[str, dict[str, int]]:
+        with self._lock:
+            counts = self._refresh()
+            return {date: dict(counts.get(date, {})) for date in dates}
+
+    def range(self, start: date, end: date) -> dict[str, dict[str, int]]:
+        """
+        Counters of the days from `start` to `end` inclusive that have any,
+        in date order. Costs a bisection plus the size of the window.
+        """
+        with self._lock:
+            counts = self._refresh()
+            if self._indexed != len(counts):
+                # new days only appear once a day, so a rebuild is rare
+                self._index = sorted((key_to_iso(key), key) for key in counts)
+                self._indexed = len(counts)
+            low = bisect.bisect_left(self._index, (start.isoformat(),))
+            high = bisect.bisect_right(self._index, (end.isoformat(), "\uffff"))
+            return {key: dict(counts[key]) for _, key in self._index[low:high]}
+
+    def all(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {date: dict(day) for date, day in self._refresh().items()}
+
+    def adjust(self, date: str, **deltas: int) -> None:
+        """Add `deltas` (status value -> change) to the counters of `date`."""
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if deltas:
+            self._append({"date": date, "delta": deltas})
+
+    def set_day(self, date: str, counts: dict[str, int]) -> None:
+        self._append({"date": date, "set": {k: v for k, v in counts.items() if v}})
+
+    def replace_all(self, counts: dict[str, dict[str, int]]) -> None:
+        """Atomically rewrite the file with one line per day."""
+        lines = []
+        for day_key, day in counts.items():
+            day = {key: value for key, value in day.items() if value}
+            if day:
+                lines.append(codec.dumps_line({"date": day_key, "set": day}))
+        with self._lock:
+            atomic_write(self.path, b"".join(lines))
+            self._counts = None
+            self._refresh()
+
+
+def count_entries(entries: list[dict]) -> dict[str, int]:
+    counts: dict[str, int] = {}
+    for entry in entries:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    return counts
+
+
+def recount(storage: Storage) -> dict[str, dict[str, int]]:
+    """Counters computed from scratch by scanning every day of `storage`."""
+    counts: dict[str, dict[str, int]] = {}
+    logs = history_for(storage).all()
+    for day_key, entries in storage.load_days(storage.dates()).items():
+        day = counts.setdefault(day_key, {})
+        for key, value in count_entries(entries).items():
+            day[key] = day.get(key, 0) + value
+
+        # a postponed entry remembers every hop in its log
+        for entry in entries:
+            for raw in logs.get(uid_of(entry)) or entry.get("log", []):
+                target = postponed_to(raw)
+                if target:
+                    source = (Day.parse(target) - 1).key
+                    source_day = counts.setdefault(source, {})
+                    source_day["postponed"] = source_day.get("postponed", 0) + 1
+
+    return {
+        day_key: {key: value for key, value in day.items() if value}
+        for day_key, day in counts.items()
+        if any(day.values())
+    }
+
+
+def verify(storage: Storage) -> dict[str, tuple[dict, dict]]:
+    """Days whose stored counters drifted: date -> (stored, actual)."""
+    stored = counters_for(storage).all()
+    actual = recount(storage)
+    drift = {}
+    for day_key in set(stored) | set(actual):
+        have = {k: v for k, v in stored.get(day_key, {}).items() if v}
+        want = actual.get(day_key, {})
+        if have != want:
+            drift[day_key] = (have, want)
+    return drift
+
+
+def rebuild(storage: Storage) -> dict[str, dict[str, int]]:
+    counts = recount(storage)
+    counters_for(storage).replace_all(counts)
+    return counts
+
+
+_counters: dict[str, StatusCounters] = {}
+_counters_lock = threading.Lock()
+
+
+def counters_for(storage: Storage) -> StatusCounters:
+    """
+    The process-wide counters of `storage`, built by a full scan the first
+    time they are needed for existing data.
+    """
+    with _counters_lock:
+        counters = _counters.get(storage.path)
+    if counters is not None:
+        return counters
+    # the storage lock before the registry lock, see `search.index_for`
+    with storage.lock(), _counters_lock:
+        counters = _counters.get(storage.path)
+        if counters is None:
+            counters = StatusCounters(f"{storage.path}.counts")
+            if not counters.exists():
+                counters.replace_all(recount(storage))
+            _counters[storage.path] = counters
+        return counters
+
+
+@on_release
+def _forget_counters(path: str) -> None:
+    with _counters_lock:
+        _counters.pop(path, None)
+
+
+@subscribe
+def _recount_restored_day(mutation: Mutation) -> None:
+    # a restore rewrites the day wholesale; statuses are recounted, while
+    # the postponed counter of the day is kept
+    if mutation.kind != "restore":
+        return
+    counters = counters_for(mutation.storage)
+    postponed = counters.get([mutation.date])[mutation.date].get("postponed", 0)
+    counts = count_entries(mutation.storage.load_day(mutation.date))
+    counters.set_day(mutation.date, {**counts, "postponed": postponed})
@@ -1,8 +1,8 @@
 from functools import wraps
 
-from flask import Response, redirect, request
+from flask import Response, make_response, redirect, request
 
-from config import config
+from . import tenants
 
 
 def is_logged_in(func):
@@ -18,13 +18,41 @@ def is_logged_in(func):
         def __redirect_to_login_normal():
             return redirect("/login")
 
-        if not login_key or login_key != config.HASHED_LOGIN_KEY:
+        tenant = tenants.resolve(login_key)
+        if tenant is None:
             return (
                 __redirect_to_login_htmx()
                 if is_htmx_request
                 else __redirect_to_login_normal()
             )
 
+        # the tenant's journal stays open until the response has been sent,
+        # streamed bodies included
+        journal = tenants.enter(tenant)
+        if journal is None:
+            return func(*args, **kwargs)
+        try:
+            response = make_response(func(*args, **kwargs))
+        except BaseException:
+            tenants.leave(journal)
+            raise
+        response.call_on_close(lambda: tenants.leave(journal))
+        return response
+
+    return wrapper
+
+
+def is_operator(func):
+    """
+    Only for the LOGIN_KEY session: tenants must not see process-wide
+    state such as metrics, which covers every journal, nor change it.
+    """
+
+    @is_logged_in
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if tenants.resolve(request.cookies.get("_s_key")) != "":
+            return Response("Forbidden", status=403)
         return func(*args, **kwargs)
 
     return wrapper
@@ -0,0 +1,90 @@
+import sys
+from datetime import datetime
+from typing import Any, Optional, Union
+
+# kind codes as stored on disk
+CREATED = "c"
+TITLE = "t"
+STATUS = "s"
+POSTPONED = "p"
+# a free-form line, which is what every log entry used to be
+NOTE = "n"
+
+LEGACY_POSTPONED_PREFIX = "Task postponed to "
+
+RawEvent = Union[str, list]
+
+
+def encode(kind: str, at: datetime, payload: Any = None) -> list:
+    """
+    The stored form of a log event: `[kind, iso timestamp]`, followed by
+    the payload when there is one.
+    """
+    if payload is None:
+        return [kind, at.isoformat()]
+    return [kind, at.isoformat(), payload]
+
+
+class LogEvent:
+    """
+    One decoded event of an entry's log.
+
+    Entries keep their log in the stored form and only decode it when it is
+    displayed, so loading a day does not pay for the history of every task.
+    Lines written before events were structured decode to `NOTE` events
+    carrying the original text.
+    """
+
+    __slots__ = ("kind", "at", "payload")
+
+    def __init__(self, kind: str, at: Optional[datetime], payload: Any = None):
+        self.kind = kind
+        self.at = at
+        self.payload = payload
+
+    @classmethod
+    def decode(cls, raw: RawEvent) -> "LogEvent":
+        if isinstance(raw, str):
+            return cls(NOTE, None, raw)
+        kind, at, *payload = raw
+        return cls(
+            sys.intern(kind),
+            datetime.fromisoformat(at),
+            payload[0] if payload else None,
+        )
+
+    def __str__(self) -> str:
+        match self.kind:
+            case "c":
+                return f"Task created on {self.at.strftime('%d-%m-%Y %H:%M:%S')}"
+            case "t":
+                title, previous = self.payload
+                return f"Title updated to {title} from {previous} on {self.at.strftime('%d-%m-%Y, %H:%M:%S')}"
+            case "s":
+                return f"Status updated to {self.payload} on {self.at.strftime('%d-%m-%Y, %H:%M:%S')}"
+            case "p":
+                return f"Task postponed to {self.payload} on {self.at.strftime('%d-%m-%Y, %H:%M:%S')}"
+        return str(self.payload)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, LogEvent):
+            return NotImplemented
+        return (self.kind, self.at, self.payload) == (
+            other.kind,
+            other.at,
+            other.payload,
+        )
+
+    def __repr__(self):
+        return f"LogEvent<kind={self.kind}, at={self.at}, payload={self.payload!r}>"
+
+
+def postponed_to(raw: RawEvent) -> Optional[str]:
+    """The day a stored log event moved its entry to, if it is a postpone."""
+    if isinstance(raw, str):
+        if raw.startswith(LEGACY_POSTPONED_PREFIX):
+            return raw[len(LEGACY_POSTPONED_PREFIX) :].split(" ", 1)[0]
+        return None
+    if raw and raw[0] == POSTPONED:
+        return raw[2]
+    return None
@@ -0,0 +1,51 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Mutation:
+    """A change made through `Todo`, published after it has been written."""
+
+    kind: str  # add | update | reorder | postpone | batch | restore
+    storage: Any
+    date: str
+    index: Optional[int] = None
+    entry: Any = None
+    to_date: Optional[str] = None
+
+
+Listener = Callable[[Mutation], None]
+
+_listeners: list[Listener] = []
+_lock = threading.Lock()
+
+
+def subscribe(listener: Listener) -> Listener:
+    with _lock:
+        if listener not in _listeners:
+            _listeners.append(listener)
+    return listener
+
+
+def unsubscribe(listener: Listener) -> None:
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+def publish(mutation: Mutation) -> None:
+    """
+    Notify every listener. The write has already happened, so a failing
+    listener is logged rather than allowed to fail the request.
+    """
+    with _lock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        try:
+            listener(mutation)
+        except Exception:
+            logger.exception("Mutation listener %r failed", listener)
@@ -0,0 +1,118 @@
+import hashlib
+import os
+from typing import Callable, Hashable
+
+from flask import Response, current_app, render_template, request
+from markupsafe import Markup
+
+from .cache import fragment_cache
+from .counters import counters_for
+from .events import Mutation, subscribe
+from .model import Entry, _isoformat
+from .storage import Storage, _stat_signature, on_release
+
+# template fingerprints of apps that never reload their templates
+_template_versions: dict[tuple, tuple] = {}
+
+
+def template_version() -> tuple:
+    """
+    Fingerprint of the template files, part of every fragment version so
+    editing a template (or deploying new ones) retires what was rendered
+    with the old ones.
+    """
+    searchpath = tuple(getattr(current_app.jinja_loader, "searchpath", ()))
+    version = _template_versions.get(searchpath)
+    if version is None:
+        signature = []
+        for directory in searchpath:
+            for root, _, names in os.walk(directory):
+                paths = sorted(os.path.join(root, name) for name in names)
+                signature.append(_stat_signature(*paths))
+        version = tuple(signature)
+        if not current_app.jinja_env.auto_reload:
+            _template_versions[searchpath] = version
+    return version
+
+
+def etag(version: Hashable) -> str:
+    return hashlib.blake2b(repr(version).encode(), digest_size=12).hexdigest()
+
+
+def cached(key: tuple, version: Hashable, render: Callable[[], str]) -> str:
+    """The fragment `key` at `version`, rendered on a miss."""
+    html = fragment_cache.get(key, version)
+    if html is None:
+        html = render()
+        fragment_cache.put(key, version, html)
+    return html
+
+
+def conditional(key: tuple, version: Hashable, render: Callable[[], str]) -> Response:
+    """
+    Answer a GET for a fragment with a strong ETag derived from
+    `version`: 304 when the browser already has it, otherwise the cached
+    or freshly rendered HTML. Browsers revalidate on every use, so nothing
+    stale is ever shown.
+    """
+    tag = etag((version, template_version()))
+    if tag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(cached(key, tag, render))
+    response.set_etag(tag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def item_version(entry: Entry) -> tuple:
+    # every change to an entry moves its update timestamp
+    return entry.id, entry.status.value, _isoformat(entry._date_updated)
+
+
+def item_renderer(path: str, date: str) -> Callable[[Entry], Markup]:
+    """`render_item(todo)` for the day page: items come from the cache."""
+    version = template_version()
+
+    def render_item(todo: Entry) -> Markup:
+        key = (path, date, "item", todo.uid)
+        return Markup(
+            cached(
+                key,
+                (item_version(todo), version),
+                lambda: render_template(
+                    "partials/todo/item.html", todo=todo, date=date
+                ),
+            )
+        )
+
+    return render_item
+
+
+def dashboard_version(storage: Storage, today: str) -> tuple:
+    """Everything the dashboard shows comes from the status counters."""
+    version = (today, _stat_signature(counters_for(storage).path))
+    if storage.indexed_counts:
+        version += (storage.signature(today),)
+    return version
+
+
+def progress_version(storage: Storage, date: str) -> tuple:
+    """The progress bar of `date` comes from its status counters alone."""
+    version = (_stat_signature(counters_for(storage).path),)
+    if storage.indexed_counts:
+        version += (storage.signature(date),)
+    return version
+
+
+@subscribe
+def _invalidate_mutation(mutation: Mutation) -> None:
+    path = mutation.storage.path
+    for date in {mutation.date, mutation.to_date} - {None}:
+        fragment_cache.invalidate_day(path, date)
+    # reorders leave every count, and so the dashboard, as it was
+    if mutation.kind != "reorder":
+        fragment_cache.invalidate_day(path, None)
+
+
+on_release(fragment_cache.forget)
@@ -0,0 +1,248 @@
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from config import config
+
+from .events import Mutation, publish, subscribe, unsubscribe
+from .storage import Storage
+
+logger = logging.getLogger(__name__)
+
+# files inside the data directory that never belong in history
+EXCLUDES = [
+    "/.journal.git/",
+    "*.tmp",
+    "*.lock",
+    "*.counts",
+    "*.search",
+    "*.rollup",
+    "*.ai/",
+]
+
+
+class GitError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Commit:
+    sha: str
+    timestamp: int
+    message: str
+
+
+class GitStore:
+    """
+    Versions the data directory in its own git repository.
+
+    Mutations published by `Todo` are queued and committed in batches by a
+    background worker, either once `max_ops` changes are pending or
+    `window` seconds after the first pending change, so a request never
+    waits on git. When `remote` is set every batch is pushed there as well.
+    """
+
+    def __init__(
+        self,
+        work_tree: str,
+        git_dir: Optional[str] = None,
+        window: float = 30.0,
+        max_ops: int = 50,
+        remote: Optional[str] = None,
+        branch: str = "main",
+    ):
+        self.work_tree = os.path.abspath(work_tree)
+        self.git_dir = os.path.abspath(
+            git_dir or os.path.join(self.work_tree, ".journal.git")
+        )
+        self.window = window
+        self.max_ops = max_ops
+        self.remote = remote
+        self.branch = branch
+
+        # a Mutation to batch, an Event to set once everything before it is
+        # committed, or None to stop
+        self._queue: queue.Queue = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._commit_lock = threading.Lock()
+
+    # git plumbing
+
+    def _git(self, *args: str) -> bytes:
+        command = [
+            "git",
+            f"--git-dir={self.git_dir}",
+            f"--work-tree={self.work_tree}",
+            "-c",
+            "user.name=journal",
+            "-c",
+            "user.email=journal@localhost",
+            *args,
+        ]
+        result = subprocess.run(command, capture_output=True)
+        if result.returncode != 0:
+            raise GitError(result.stderr.decode().strip() or f"git {args[0]} failed")
+        return result.stdout
+
+    def init(self) -> None:
+        """Create the repository on first use."""
+        if os.path.exists(os.path.join(self.git_dir, "HEAD")):
+            return
+        os.makedirs(self.git_dir, exist_ok=True)
+        self._git("init", "--quiet", f"--initial-branch={self.branch}")
+        with open(os.path.join(self.git_dir, "info", "exclude"), "a") as f:
+            f.write("\n".join(EXCLUDES) + "\n")
+
+    def commit(self, message: str) -> Optional[str]:
+        """Commit everything that changed in the work tree, None if nothing did."""
+        with self._commit_lock:
+            self.init()
+            self._git("add", "--all")
+            if not self._git("status", "--porcelain"):
+                return None
+            self._git("commit", "--quiet", "-m", message)
+            sha = self._git("rev-parse", "HEAD").decode().strip()
+            if self.remote:
+                self._git("push", "--quiet", self.remote, f"HEAD:{self.branch}")
+            return sha
+
+    # batching
+
+    def record(self, mutation: Mutation) -> None:
+        """Mutation listener; only enqueues."""
+        # journals kept elsewhere (other tenants) are not versioned here
+        if (
+            os.path.commonpath([self.work_tree, mutation.storage.path])
+            != self.work_tree
+        ):
+            return
+        self._queue.put(mutation)
+
+    def start(self) -> "GitStore":
+        if self._worker is not None and self._worker.is_alive():
+            return self
+        self.init()
+        subscribe(self.record)
+        self._worker = threading.Thread(target=self._run, name="git-store", daemon=True)
+        self._worker.start()
+        return self
+
+    def stop(self) -> None:
+        """Commit whatever is pending and stop the worker."""
+        unsubscribe(self.record)
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything recorded so far has been committed."""
+        if self._worker is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self) -> None:
+        pending: list[Mutation] = []
+        deadline: Optional[float] = None
+
+        while True:
+            timeout = (
+                None if deadline is None else max(0.0, deadline - time.monotonic())
+            )
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = "window"
+
+            if isinstance(item, Mutation):
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.window
+                if len(pending) < self.max_ops:
+                    continue
+
+            if pending:
+                try:
+                    self.commit(self._message(pending))
+                except GitError:
+                    logger.exception("Committing %d mutations failed", len(pending))
+                pending, deadline = [], None
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is None:
+                return
+
+    @staticmethod
+    def _message(pending: list[Mutation]) -> str:
+        dates = sorted(
+            {m.date for m in pending} | {m.to_date for m in pending if m.to_date}
+        )
+        lines = [f"journal: {len(pending)} change(s) on {', '.join(dates)}", ""]
+        lines += [
+            f"- {m.kind} {m.date}" + (f" -> {m.to_date}" if m.to_date else "")
+            for m in pending
+        ]
+        return "\n".join(lines)
+
+    # history
+
+    def _relative(self, storage: Storage, date: str) -> list[str]:
+        return [
+            os.path.relpath(path, self.work_tree) for path in storage.paths_for(date)
+        ]
+
+    def history(self, storage: Storage, date: str) -> list[Commit]:
+        """Commits that touched the files holding `date`, newest first."""
+        self.init()
+        try:
+            out = self._git(
+                "log", "--format=%H%x1f%ct%x1f%s", "--", *self._relative(storage, date)
+            )
+        except GitError:
+            # no commits yet
+            return []
+        commits = []
+        for line in out.decode().splitlines():
+            sha, timestamp, message = line.split("\x1f", 2)
+            commits.append(Commit(sha, int(timestamp), message))
+        return commits
+
+    def load_at(self, storage: Storage, date: str, sha: str) -> list[dict]:
+        """The serialized entries of `date` as they were at commit `sha`."""
+
+        def read(path: str) -> Optional[bytes]:
+            relative = os.path.relpath(path, self.work_tree)
+            try:
+                return self._git("show", f"{sha}:{relative}")
+            except GitError:
+                return None
+
+        return storage.load_day_at(date, read)
+
+    def restore(self, storage: Storage, date: str, sha: str) -> list[dict]:
+        """Write `date` back as it was at `sha` and commit the restore."""
+        entries = self.load_at(storage, date, sha)
+        storage.save_day(date, entries)
+        publish(Mutation("restore", storage, date))
+        self.commit(f"journal: restore {date} to {sha[:12]}")
+        return entries
+
+
+def start_from_config() -> Optional[GitStore]:
+    """Start the commit pipeline when GIT_STORE is enabled."""
+    if not config.GIT_STORE:
+        return None
+    return GitStore(
+        os.path.dirname(os.path.abspath(config.DATA_PATH)),
+        window=config.GIT_STORE_WINDOW,
+        max_ops=config.GIT_STORE_MAX_OPS,
+        remote=config.GIT_STORE_REMOTE or None,
+    ).start()
@@ -0,0 +1,376 @@
+import os
+import re
+import threading
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from . import codec
+from .clock import key_to_iso
+from .events import Mutation, subscribe
+from .history import uid_of
+from .locking import atomic_write, file_lock
+from .storage import Storage, _stat_signature, on_release
+
+TAG = re.compile(r"#([\w-]+)")
+
+
+def tags_of(title: str) -> set[str]:
+    """The `#tags` in a task title, lowercased."""
+    return {tag.lower() for tag in TAG.findall(title)}
+
+
+@dataclass
+class Goal:
+    id: str
+    title: str
+    # tasks whose title carries `#tag` count towards the goal
+    tag: Optional[str] = None
+    # uids of tasks linked explicitly
+    links: list[str] = field(default_factory=list)
+
+
+def _bump(counts: dict[str, int], key: str, delta: int) -> None:
+    counts[key] = counts.get(key, 0) + delta
+    if not counts[key]:
+        del counts[key]
+
+
+def _empty_rollup() -> dict:
+    # members: task uid -> {"date", "status", "goals"} of every linked task
+    # goals: goal id -> {"counts": {status: n}, "days": {date: {status: n}}}
+    return {"members": {}, "goals": {}}
+
+
+def progress_of(counts: dict[str, int]) -> dict:
+    """Totals and completion of a goal's status counts; deleted tasks do not count."""
+    total = counts.get("pending", 0) + counts.get("completed", 0)
+    completed = counts.get("completed", 0)
+    return {
+        "total": total,
+        "completed": completed,
+        "pending": counts.get("pending", 0),
+        "percentage": round(completed / total * 100, 2) if total else 0.0,
+    }
+
+
+class GoalStore:
+    """
+    Goals of the journal in `storage` and their materialized progress.
+
+    Goals live in a `<data>.goals` file. Their progress is a rollup of
+    the status and day of every linked task and per-goal status counts,
+    in total and per day. It is kept the way the status counters are:
+    `<data>.goals.rollup` is append-only, one `{"uid", "member"}` line
+    per task whose record changed (`{"drop": goal}` when a goal goes
+    away), replayed once per process and then tailed. A mutation costs
+    the lines of the tasks it touched, and the file is rewritten with one
+    line per linked task once it grows well past that. Only creating a
+    goal for a tag (and `rebuild`) scans every day once.
+    """
+
+    def __init__(self, storage: Storage):
+        self.storage = storage
+        self.path = f"{storage.path}.goals"
+        self.rollup_path = f"{self.path}.rollup"
+        self._lock = file_lock(self.path)
+        self._signature: Optional[tuple] = None
+        self._goals: list[Goal] = []
+        self._rollup = _empty_rollup()
+        self._identity: Optional[tuple[int, int]] = None
+        self._offset = 0
+        self._lines = 0
+
+    def _refresh(self) -> None:
+        signature = _stat_signature(self.path)
+        if signature != self._signature:
+            try:
+                with open(self.path, "rb") as f:
+                    goals = codec.loads_json(f.read())["goals"]
+            except FileNotFoundError:
+                goals = []
+            self._goals = [Goal(**goal) for goal in goals]
+            self._signature = signature
+
+        try:
+            stat = os.stat(self.rollup_path)
+            identity = (stat.st_dev, stat.st_ino)
+        except FileNotFoundError:
+            identity = None
+        if identity != self._identity:
+            self._rollup, self._offset, self._lines = _empty_rollup(), 0, 0
+            self._identity = identity
+        if identity is None:
+            return
+        with open(self.rollup_path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self._replay(codec.loads_json(line))
+                self._offset += len(line)
+                self._lines += 1
+
+    def _replay(self, line: dict) -> None:
+        if "drop" in line:
+            self._rollup["goals"].pop(line["drop"], None)
+        else:
+            self._place(self._rollup, line["uid"], line["member"])
+
+    def _save_goals(self) -> None:
+        raw = codec.dumps({"goals": [asdict(goal) for goal in self._goals]}, "pretty")
+        atomic_write(self.path, raw)
+        self._signature = _stat_signature(self.path)
+
+    def _append(self, lines: list[dict]) -> None:
+        """Log changes already applied to the in-memory rollup."""
+        if not lines:
+            return
+        raw = b"".join(codec.dumps_line(line) for line in lines)
+        with open(self.rollup_path, "ab") as f:
+            f.write(raw)
+        if self._identity is None:
+            stat = os.stat(self.rollup_path)
+            self._identity = (stat.st_dev, stat.st_ino)
+        self._offset += len(raw)
+        self._lines += len(lines)
+        if self._lines > 4 * len(self._rollup["members"]) + 1000:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite the rollup file with one line per linked task."""
+        lines = [
+            codec.dumps_line({"uid": uid, "member": member})
+            for uid, member in self._rollup["members"].items()
+        ]
+        raw = b"".join(lines)
+        atomic_write(self.rollup_path, raw)
+        stat = os.stat(self.rollup_path)
+        self._identity = (stat.st_dev, stat.st_ino)
+        self._offset, self._lines = len(raw), len(lines)
+
+    # membership
+
+    def _member(self, uid: str, title: str, status: str, date: str) -> Optional[dict]:
+        tags = tags_of(title)
+        goals = [
+            goal.id
+            for goal in self._goals
+            if uid in goal.links or (goal.tag and goal.tag in tags)
+        ]
+        if not goals:
+            return None
+        return {"date": date, "status": status, "goals": goals}
+
+    def _count(self, rollup: dict, member: dict, sign: int) -> None:
+        for goal_id in member["goals"]:
+            goal = rollup["goals"].setdefault(goal_id, {"counts": {}, "days": {}})
+            _bump(goal["counts"], member["status"], sign)
+            day = goal["days"].setdefault(member["date"], {})
+            _bump(day, member["status"], sign)
+            if not day:
+                del goal["days"][member["date"]]
+            if not goal["counts"] and not goal["days"]:
+                del rollup["goals"][goal_id]
+
+    def _place(
+        self,
+        rollup: dict,
+        uid: str,
+        member: Optional[dict],
+        lines: Optional[list[dict]] = None,
+    ) -> None:
+        """Make `member` the record of task `uid`, logging it into `lines`."""
+        members = rollup["members"]
+        old = members.get(uid)
+        if old == member:
+            return
+        if old is not None:
+            self._count(rollup, old, -1)
+            del members[uid]
+        if member is not None:
+            self._count(rollup, member, 1)
+            members[uid] = member
+        if lines is not None:
+            lines.append({"uid": uid, "member": member})
+
+    def _reconcile(
+        self,
+        rollup: dict,
+        date: str,
+        entries: list[dict],
+        lines: Optional[list[dict]] = None,
+    ) -> None:
+        """Bring the records of one day's tasks in line with its entries."""
+        present = {
+            uid_of(entry): self._member(
+                uid_of(entry), entry["title"], entry["status"], date
+            )
+            for entry in entries
+        }
+        for uid, member in list(rollup["members"].items()):
+            if member["date"] == date and uid not in present:
+                self._place(rollup, uid, None, lines)
+        for uid, member in present.items():
+            self._place(rollup, uid, member, lines)
+
+    def _scan(self) -> dict:
+        rollup = _empty_rollup()
+        for date, entries in self.storage.load_days(self.storage.dates()).items():
+            self._reconcile(rollup, date, entries)
+        return rollup
+
+    # reading
+
+    def goals(self) -> list[Goal]:
+        with self._lock:
+            self._refresh()
+            return list(self._goals)
+
+    def get(self, goal_id: str) -> Optional[Goal]:
+        return next((goal for goal in self.goals() if goal.id == goal_id), None)
+
+    def progress(self, goal_id: str) -> dict:
+        """Completion of a goal plus its per-day status counts, newest day first."""
+        with self._lock:
+            self._refresh()
+            rollup = self._rollup["goals"].get(goal_id, {"counts": {}, "days": {}})
+            return {
+                **progress_of(rollup["counts"]),
+                "days": dict(
+                    sorted(
+                        rollup["days"].items(),
+                        key=lambda day: key_to_iso(day[0]),
+                        reverse=True,
+                    )
+                ),
+            }
+
+    # changing
+
+    def create(self, title: str, tag: Optional[str] = None) -> Goal:
+        """
+        Add a goal. A goal for a tag starts with every task already
+        carrying it, which takes one scan of the journal.
+        """
+        tag = tag.lstrip("#").lower() if tag else None
+        goal = Goal(uuid.uuid4().hex, title, tag)
+        with self.storage.lock(), self._lock:
+            self._refresh()
+            self._goals.append(goal)
+            self._save_goals()
+            if tag:
+                self._rollup = self._scan()
+                self._compact()
+        return goal
+
+    def delete(self, goal_id: str) -> bool:
+        with self._lock:
+            self._refresh()
+            goals = [goal for goal in self._goals if goal.id != goal_id]
+            if len(goals) == len(self._goals):
+                return False
+            self._goals = goals
+            self._save_goals()
+            lines: list[dict] = []
+            for uid, member in list(self._rollup["members"].items()):
+                if goal_id in member["goals"]:
+                    rest = [g for g in member["goals"] if g != goal_id]
+                    self._place(
+                        self._rollup,
+                        uid,
+                        {**member, "goals": rest} if rest else None,
+                        lines,
+                    )
+            self._rollup["goals"].pop(goal_id, None)
+            self._append([*lines, {"drop": goal_id}])
+            return True
+
+    def link(self, goal_id: str, date: str, entry) -> bool:
+        """Count the task `entry` on `date` towards the goal; False if there is no such goal."""
+        with self._lock:
+            self._refresh()
+            goal = next((goal for goal in self._goals if goal.id == goal_id), None)
+            if goal is None:
+                return False
+            if entry.uid not in goal.links:
+                goal.links.append(entry.uid)
+                self._save_goals()
+            lines: list[dict] = []
+            member = self._member(entry.uid, entry.title, entry.status.value, date)
+            self._place(self._rollup, entry.uid, member, lines)
+            self._append(lines)
+            return True
+
+    def apply(self, mutation: Mutation) -> None:
+        """Move the rollup by the tasks a mutation touched."""
+        if mutation.kind == "reorder" or not self.goals():
+            return
+        entries = None
+        if mutation.kind not in ("add", "update", "postpone"):
+            # whole-day rewrites: batches, rollovers, imports, restores. The
+            # day is read before taking our lock, which must never be held
+            # while waiting for the storage lock
+            entries = mutation.storage.load_day(mutation.date)
+        with self._lock:
+            self._refresh()
+            lines: list[dict] = []
+            if entries is not None:
+                self._reconcile(self._rollup, mutation.date, entries, lines)
+            else:
+                entry = mutation.entry
+                member = self._member(
+                    entry.uid,
+                    entry.title,
+                    entry.status.value,
+                    mutation.to_date or mutation.date,
+                )
+                self._place(self._rollup, entry.uid, member, lines)
+            self._append(lines)
+
+    def verify(self) -> dict[str, tuple[dict, dict]]:
+        """Goals whose stored rollup differs from a recount: id -> (stored, actual)."""
+        with self.storage.lock(), self._lock:
+            self._refresh()
+            actual = self._scan()["goals"]
+            drift = {}
+            for goal in self._goals:
+                pair = (
+                    self._rollup["goals"].get(goal.id, {}),
+                    actual.get(goal.id, {}),
+                )
+                if pair[0] != pair[1]:
+                    drift[goal.id] = pair
+            return drift
+
+    def rebuild(self) -> int:
+        """Recompute the rollup from the data; returns the number of linked tasks."""
+        with self.storage.lock(), self._lock:
+            self._refresh()
+            self._rollup = self._scan()
+            self._compact()
+            return len(self._rollup["members"])
+
+
+_stores: dict[str, GoalStore] = {}
+_stores_lock = threading.Lock()
+
+
+def goals_for(storage: Storage) -> GoalStore:
+    """The process-wide goal store of `storage`."""
+    with _stores_lock:
+        store = _stores.get(storage.path)
+        if store is None:
+            store = _stores[storage.path] = GoalStore(storage)
+        return store
+
+
+@on_release
+def _forget_store(path: str) -> None:
+    with _stores_lock:
+        _stores.pop(path, None)
+
+
+@subscribe
+def _update_rollups(mutation: Mutation) -> None:
+    goals_for(mutation.storage).apply(mutation)
@@ -0,0 +1,201 @@
+import os
+import threading
+import uuid
+from typing import Iterable, Optional
+
+from . import codec
+from .cache import day_cache
+from .entry_log import RawEvent
+from .locking import atomic_write, file_lock
+from .storage import Storage, on_release
+
+# namespace of the ids derived for entries written before they had one
+_LEGACY_NAMESPACE = uuid.UUID("6f1c2a4e-93b1-4d0a-9a57-3f0e8c1d2b64")
+
+
+def new_uid() -> str:
+    return uuid.uuid4().hex
+
+
+def uid_of(entry: dict) -> str:
+    """
+    The stable id of a serialized entry. Entries written before ids
+    existed get one derived from their creation timestamp, which already
+    identified them across reorders and postpones.
+    """
+    uid = entry.get("uid")
+    if uid:
+        return uid
+    return uuid.uuid5(_LEGACY_NAMESPACE, entry["date_created"]).hex
+
+
+class HistoryStore:
+    """
+    Per-task audit logs kept in a `<data>.history` file next to the data,
+    keyed by the entry's stable id.
+
+    Days only hold the current state of their entries; every change to a
+    task appends one `{"uid", "log"}` line here instead of growing a log
+    that is rewritten with its day (and copied along on every postpone).
+    Only the offsets of each task's lines are kept in memory, tailed like
+    the status counters, and a log is read from disk when it is asked for.
+    When the file grows well past one line per task it is rewritten with
+    the lines of each task merged.
+
+    Entries written before the store existed keep their log inline until
+    they next change (or `flask journal logs --migrate` runs); a task with
+    no lines here falls back to it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = file_lock(path)
+        self._offsets: Optional[dict[str, list[tuple[int, int]]]] = None
+        self._identity: Optional[tuple[int, int]] = None
+        self._offset = 0
+        self._lines = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _refresh(self) -> dict[str, list[tuple[int, int]]]:
+        try:
+            stat = os.stat(self.path)
+            identity = (stat.st_dev, stat.st_ino)
+        except FileNotFoundError:
+            identity = None
+
+        if self._offsets is None or identity != self._identity:
+            self._offsets, self._offset, self._lines = {}, 0, 0
+            self._identity = identity
+        if identity is None:
+            return self._offsets
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                uid = codec.loads_json(line)["uid"]
+                self._offsets.setdefault(uid, []).append((self._offset, len(line)))
+                self._offset += len(line)
+                self._lines += 1
+        return self._offsets
+
+    def _read(self, f, spans: list[tuple[int, int]]) -> list[RawEvent]:
+        log: list[RawEvent] = []
+        for offset, length in spans:
+            f.seek(offset)
+            log.extend(codec.loads_json(f.read(length))["log"])
+        return log
+
+    def events(self, uid: str) -> list[RawEvent]:
+        """The stored log of the task `uid`, oldest event first."""
+        with self._lock:
+            spans = self._refresh().get(uid)
+            if not spans:
+                return []
+            with open(self.path, "rb") as f:
+                return self._read(f, spans)
+
+    def all(self) -> dict[str, list[RawEvent]]:
+        """Every stored log, for full scans."""
+        with self._lock:
+            offsets = self._refresh()
+            if not offsets:
+                return {}
+            with open(self.path, "rb") as f:
+                return {uid: self._read(f, spans) for uid, spans in offsets.items()}
+
+    def log_of(self, entry: dict) -> list[RawEvent]:
+        """The full log of a serialized entry, stored or still inline."""
+        return self.events(uid_of(entry)) or list(entry.get("log", []))
+
+    def record(self, changes: Iterable[tuple[str, list, list]]) -> None:
+        """
+        Append `(uid, inline, new)` logs in one write: `new` events are
+        always appended, the `inline` log an entry was loaded with only
+        when the task has nothing stored yet, so moving it here twice (from
+        two processes holding the same day) cannot duplicate it.
+        """
+        with self._lock:
+            offsets = self._refresh()
+            lines = []
+            for uid, inline, new in changes:
+                log = list(new) if uid in offsets else [*inline, *new]
+                if log:
+                    lines.append(codec.dumps_line({"uid": uid, "log": log}))
+            if not lines:
+                return
+            with open(self.path, "ab") as f:
+                f.write(b"".join(lines))
+            self._refresh()
+
+            if self._lines > 2 * len(offsets) + 1000:
+                self.replace_all(self.all())
+
+    def replace_all(self, logs: dict[str, list[RawEvent]]) -> None:
+        """Atomically rewrite the file with one line per task."""
+        raw = b"".join(
+            codec.dumps_line({"uid": uid, "log": log}) for uid, log in logs.items()
+        )
+        with self._lock:
+            atomic_write(self.path, raw)
+            self._offsets = None
+            self._refresh()
+
+    def __contains__(self, uid: str) -> bool:
+        with self._lock:
+            return uid in self._refresh()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._refresh())
+
+
+_histories: dict[str, HistoryStore] = {}
+_histories_lock = threading.Lock()
+
+
+def history_for(storage: Storage) -> HistoryStore:
+    """The process-wide history store of `storage`."""
+    with _histories_lock:
+        history = _histories.get(storage.path)
+        if history is None:
+            history = _histories[storage.path] = HistoryStore(f"{storage.path}.history")
+        return history
+
+
+@on_release
+def _forget_history(path: str) -> None:
+    with _histories_lock:
+        _histories.pop(path, None)
+
+
+def migrate(storage: Storage) -> int:
+    """
+    Move every log still kept inline into the history store and rewrite
+    the days without them. Returns the number of entries moved.
+    """
+    history = history_for(storage)
+    moved = 0
+    with storage.lock():
+        days = storage.load_days(storage.dates())
+        changed = {}
+        for date, entries in days.items():
+            inline = [entry for entry in entries if entry.get("log")]
+            if not inline:
+                continue
+            history.record((uid_of(entry), entry["log"], []) for entry in inline)
+            changed[date] = [
+                {**entry, "uid": uid_of(entry), "log": []} for entry in entries
+            ]
+            moved += len(inline)
+        if not changed:
+            return 0
+        try:
+            storage.save_days(changed)
+        finally:
+            for date in changed:
+                day_cache.invalidate((storage.path, date))
+    return moved
@@ -0,0 +1,181 @@
+import queue
+import threading
+import time
+from typing import Iterator, Optional
+
+from flask import has_app_context, has_request_context, render_template, request
+
+from config import config
+
+from .events import Mutation, subscribe
+from .model import _load_days, _percentage
+
+# how long a disconnected browser waits before reconnecting, in ms
+RETRY_MS = 1000
+# idle streams send a comment this often so proxies keep them open
+HEARTBEAT_SECONDS = 15.0
+# messages a subscriber may fall behind by before it is dropped
+QUEUE_SIZE = 64
+
+# a subscription's queue yields this once the subscription is closed
+_CLOSED = object()
+
+
+def format_event(event: str, data: str) -> str:
+    """One server-sent event; every line of `data` gets its own field."""
+    lines = "".join(f"data: {line}\n" for line in data.splitlines() or [""])
+    return f"event: {event}\n{lines}\n"
+
+
+class Subscription:
+    def __init__(self, broker: "Broker", channel: tuple, client: Optional[str]):
+        self.broker = broker
+        self.channel = channel
+        self.client = client
+        self.closed = False
+        self._queue: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+
+    def deliver(self, message: str) -> bool:
+        """Queue `message`; False when the subscriber has fallen too far behind."""
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def get(self, timeout: float):
+        """The next message, None after `timeout`, `_CLOSED` once closed."""
+        if self.closed:
+            return _CLOSED
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.broker.unsubscribe(self)
+            try:
+                self._queue.put_nowait(_CLOSED)
+            except queue.Full:
+                pass
+
+
+class Broker:
+    """
+    In-process publish/subscribe for the open views of a day.
+
+    Channels are `(storage path, day)` pairs. Messages are formatted
+    once and queued for every subscriber of the channel, except the
+    client that caused them when `skip` is given. A subscriber that
+    stops reading is dropped rather than allowed to grow its queue; its
+    browser reconnects and starts again from a fresh snapshot.
+    """
+
+    def __init__(self, max_streams: int):
+        self.max_streams = max_streams
+        self._channels: dict[tuple, set[Subscription]] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(
+        self, channel: tuple, client: Optional[str] = None
+    ) -> Optional[Subscription]:
+        """A new subscription, None when `max_streams` are already open."""
+        with self._lock:
+            if self._count >= self.max_streams:
+                return None
+            subscription = Subscription(self, channel, client)
+            self._channels.setdefault(channel, set()).add(subscription)
+            self._count += 1
+            return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._channels[subscription.channel]
+            self._count -= 1
+
+    def listening(self, channel: tuple) -> bool:
+        return channel in self._channels
+
+    def publish(
+        self, channel: tuple, event: str, data: str, skip: Optional[str] = None
+    ) -> int:
+        """Send an event to the channel; returns how many subscribers got it."""
+        message = format_event(event, data)
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        delivered = 0
+        for subscription in subscribers:
+            if skip is not None and subscription.client == skip:
+                continue
+            if subscription.deliver(message):
+                delivered += 1
+            else:
+                subscription.close()
+        return delivered
+
+    def __len__(self) -> int:
+        return self._count
+
+
+broker = Broker(config.LIVE_MAX_STREAMS)
+
+
+def stream(subscription: Subscription, snapshot: str, lifetime: float) -> Iterator[str]:
+    """
+    The body of an event stream: the snapshot, then every message of the
+    subscription until `lifetime` seconds have passed. Ending the stream
+    lets a worker go; the browser reconnects on its own.
+    """
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        yield format_event("swap", snapshot)
+        deadline = time.monotonic() + lifetime
+        while (remaining := deadline - time.monotonic()) > 0:
+            message = subscription.get(min(remaining, HEARTBEAT_SECONDS))
+            if message is _CLOSED:
+                break
+            yield ": keep-alive\n\n" if message is None else message
+    finally:
+        subscription.close()
+
+
+def render_progress(entries: list) -> str:
+    counts: dict[str, int] = {}
+    for entry in entries:
+        counts[entry.status.value] = counts.get(entry.status.value, 0) + 1
+    return render_template(
+        "partials/todo/progress_bar.html", percentage=_percentage(counts), oob=True
+    )
+
+
+@subscribe
+def _publish_mutation(mutation: Mutation) -> None:
+    # views are rendered by the process that serves them, so there is
+    # nothing to do outside the app or when nobody has the day open
+    if not has_app_context():
+        return
+    client = request.headers.get("X-Client") if has_request_context() else None
+    for date in filter(None, {mutation.date, mutation.to_date}):
+        channel = (mutation.storage.path, date)
+        if not broker.listening(channel):
+            continue
+        entries = _load_days(mutation.storage, [date])[date]
+        single = mutation.kind in ("add", "update") and date == mutation.date
+        items = render_template(
+            "partials/todo/live.html",
+            kind=mutation.kind if single else "refresh",
+            todo=mutation.entry,
+            todos=entries,
+            date=date,
+        )
+        # the client that made the change already swapped its own items
+        broker.publish(channel, "swap", items, skip=client)
+        broker.publish(channel, "swap", render_progress(entries))
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import threading
+from typing import Union
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms only get thread locks
+    fcntl = None
+
+
+class FileLock:
+    """
+    Advisory lock on `<path>.lock`, shared by every thread and process that
+    touches `path`.
+
+    The lock is re-entrant within a thread, so storage helpers can call
+    each other while holding it; the `fcntl.flock` is only taken by the
+    outermost acquire.
+    """
+
+    def __init__(self, path: str):
+        self.path = f"{path}.lock"
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self) -> None:
+        self._thread_lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+_locks: dict[str, FileLock] = {}
+_locks_lock = threading.Lock()
+
+
+def file_lock(path: str) -> FileLock:
+    """The process-wide lock guarding `path`."""
+    path = os.path.abspath(path)
+    with _locks_lock:
+        if path not in _locks:
+            _locks[path] = FileLock(path)
+        return _locks[path]
+
+
+def forget_locks(directory: str) -> int:
+    """
+    Drop the unheld locks of every path under `directory`, once the files
+    there are no longer in use; returns how many were dropped.
+    """
+    prefix = os.path.join(os.path.abspath(directory), "")
+    dropped = 0
+    with _locks_lock:
+        for path, lock in list(_locks.items()):
+            if not path.startswith(prefix):
+                continue
+            if not lock._thread_lock.acquire(blocking=False):
+                continue
+            try:
+                if lock._depth == 0:
+                    del _locks[path]
+                    dropped += 1
+            finally:
+                lock._thread_lock.release()
+    return dropped
+
+
+def atomic_write(path: str, data: Union[str, bytes]) -> None:
+    """
+    Replace `path` with `data` so readers only ever see the old or the new
+    contents: write a temp file next to it, fsync, then `os.replace`.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data.encode() if isinstance(data, str) else data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
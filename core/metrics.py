@@ -0,0 +1,178 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from flask import before_render_template, template_rendered
+
+from config import config
+
+# upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """A Prometheus histogram with one fixed label set per series."""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        # label values -> (bucket counts, sum, count)
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *values: str) -> None:
+        with self._lock:
+            series = self._series.setdefault(values, [[0] * len(BUCKETS), 0.0, 0])
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    series[0][i] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, (buckets, total, count) in sorted(self._series.items()):
+                labels = _labels(self.labels, values)
+                for bound, hits in zip(BUCKETS, buckets):
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {hits}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{labels}}} {total:.6f}")
+                lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series: dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values: str) -> None:
+        with self._lock:
+            self._series[values] = self._series.get(values, 0) + 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, count in sorted(self._series.items()):
+                lines.append(f"{self.name}{{{_labels(self.labels, values)}}} {count}")
+        return lines
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+requests_total = Counter(
+    "todo_requests_total",
+    "Requests served, by endpoint, method and status.",
+    ("endpoint", "method", "status"),
+)
+request_seconds = Histogram(
+    "todo_request_duration_seconds",
+    "Time spent serving requests, by endpoint.",
+    ("endpoint",),
+)
+span_seconds = Histogram(
+    "todo_span_duration_seconds",
+    "Time spent in instrumented sections: storage, (de)serialization, rendering.",
+    ("span",),
+)
+
+# spans of the request being served by the current thread:
+# name -> [seconds, count]
+_local = threading.local()
+
+
+def record(name: str, seconds: float) -> None:
+    span_seconds.observe(seconds, name)
+    spans = getattr(_local, "spans", None)
+    if spans is not None:
+        total = spans.setdefault(name, [0.0, 0])
+        total[0] += seconds
+        total[1] += 1
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block as `name`; free when metrics are off."""
+    if not config.METRICS:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def start_request() -> None:
+    _local.spans = {}
+    _local.started = time.perf_counter()
+    _local.rendering = []
+
+
+def finish_request(endpoint: Optional[str], method: str, status: int) -> Optional[str]:
+    """
+    Record the request that just finished and return its `Server-Timing`
+    header value, None if it was not started with `start_request`.
+    """
+    spans = getattr(_local, "spans", None)
+    if spans is None:
+        return None
+    elapsed = time.perf_counter() - _local.started
+    _local.spans = None
+
+    endpoint = endpoint or "unmatched"
+    requests_total.inc(endpoint, method, str(status))
+    request_seconds.observe(elapsed, endpoint)
+
+    timings = [
+        f'{name};dur={seconds * 1000:.2f};desc="{count}x"'
+        for name, (seconds, count) in spans.items()
+    ]
+    timings.append(f"total;dur={elapsed * 1000:.2f}")
+    return ", ".join(timings)
+
+
+def render(extra: Optional[list[str]] = None) -> str:
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in (requests_total, request_seconds, span_seconds):
+        lines += metric.render()
+    lines += extra or []
+    return "\n".join(lines) + "\n"
+
+
+def single(name: str, help: str, kind: str, value: float) -> list[str]:
+    """An unlabelled metric with one sample, e.g. a gauge read at scrape time."""
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {value}"]
+
+
+# template rendering is timed through Flask's signals, so every
+# render_template call is covered without touching the routes
+
+
+def _before_render(sender, template, context, **extra) -> None:
+    stack = getattr(_local, "rendering", None)
+    if config.METRICS and stack is not None:
+        stack.append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra) -> None:
+    stack = getattr(_local, "rendering", None)
+    if config.METRICS and stack:
+        record("render", time.perf_counter() - stack.pop())
+
+
+before_render_template.connect(_before_render)
+template_rendered.connect(_rendered)
@@ -1,17 +1,199 @@
 import enum
-import json
 import os
-from datetime import datetime, timedelta
-from typing import Optional
-
-from pytz import timezone
+from datetime import date, datetime, timedelta
+from typing import Callable, Optional, TypeVar, Union
 
 from config import config
 
-
-def _get_current_datetime() -> datetime:
-    tz = timezone(config.TIMEZONE)
-    return datetime.now(tz)
+from . import clock, entry_log
+from .cache import day_cache
+from .clock import Day
+from .counters import counters_for
+from .events import Mutation, publish
+from .history import HistoryStore, history_for, new_uid, uid_of
+from .metrics import span
+from .storage import ConflictError, Storage, day_version, get_storage, on_release
+from .tenants import current_data_path
+
+T = TypeVar("T")
+
+
+def open_storage(path: Optional[str] = None) -> Storage:
+    """
+    Resolve `path` (relative to this package) to the configured storage;
+    without one, the journal of the current request.
+    """
+    file_path = os.path.join(os.path.dirname(__file__), path or current_data_path())
+    return get_storage(os.path.abspath(file_path))
+
+
+# (storage path, day) pairs already rolled over by this process
+_rolled_over: set[tuple[str, str]] = set()
+
+
+def _first_open_of_today(storage: Storage, date: str) -> bool:
+    """True the first time this process opens today's list of `storage`."""
+    key = (storage.path, date)
+    if key in _rolled_over or date != clock.today().key:
+        return False
+    _rolled_over.add(key)
+    return True
+
+
+@on_release
+def _forget_storage(path: str) -> None:
+    day_cache.forget(path)
+    _rolled_over.difference_update([key for key in _rolled_over if key[0] == path])
+
+
+def _load_days(
+    storage: Storage, dates: list[str], versions: Optional[dict[str, str]] = None
+) -> dict[str, list["Entry"]]:
+    """
+    Deserialized entries for `dates`, served from the day cache where the
+    backing files have not changed. Misses are read from storage in one go.
+    The content version of each day is filled into `versions` when given.
+    """
+    days: dict[str, list[Entry]] = {}
+    versions = {} if versions is None else versions
+    signatures = {}
+    for key in dates:
+        signatures[key] = storage.signature(key)
+        cached = day_cache.lookup((storage.path, key), signatures[key])
+        if cached is not None:
+            days[key], versions[key] = _copies(cached[0]), cached[1]
+
+    missing = [key for key in dates if key not in days]
+    if missing:
+        with span("storage_load"):
+            loaded = storage.load_days(missing)
+        for key, items in loaded.items():
+            with span("deserialize"):
+                history = history_for(storage)
+                days[key] = [Entry.deserialize(item, history) for item in items]
+            versions[key] = day_version(items)
+            day_cache.put(
+                (storage.path, key),
+                signatures[key],
+                _copies(days[key]),
+                versions[key],
+            )
+    return days
+
+
+def _copies(entries: list["Entry"]) -> list["Entry"]:
+    """
+    Entries the day cache can hand out or keep. Callers mutate their
+    entries before the write commits, so the cache never shares its own.
+    """
+    return [entry.copy() for entry in entries]
+
+
+def _status_counts(storage: Storage, dates: list[str]) -> dict[str, dict[str, int]]:
+    """
+    Entries per status value for each of `dates`, read from the storage's
+    index or the stored counters rather than the entries themselves.
+    """
+    if storage.indexed_counts:
+        return storage.status_counts(dates)
+
+    with span("counters"):
+        counts = counters_for(storage).get(dates)
+    for day in counts.values():
+        day.pop("postponed", None)
+    return counts
+
+
+def _range_counts(
+    storage: Storage, start: date, end: date
+) -> dict[str, dict[str, int]]:
+    """
+    Status and `postponed` counters of the days with any between `start`
+    and `end`, in date order, without touching days outside the window.
+    """
+    with span("counters"):
+        counts = counters_for(storage).range(start, end)
+    if storage.indexed_counts:
+        indexed = storage.status_counts_between(start, end)
+        for key in set(counts) | set(indexed):
+            postponed = counts.get(key, {}).get("postponed", 0)
+            counts[key] = {**indexed.get(key, {}), "postponed": postponed}
+        counts = dict(sorted(counts.items(), key=lambda item: _parse_day(item[0])))
+    return counts
+
+
+def _percentage(counts: dict[str, int]) -> dict[str, float]:
+    """Share of the completed, pending and deleted tasks of a day."""
+    status_counts = {"completed": 0, "pending": 0, "deleted": 0}
+    for status in status_counts:
+        status_counts[status] = counts.get(status, 0)
+    total = sum(status_counts.values())
+
+    if total == 0:
+        return {k: 0.0 for k in status_counts}  # Avoid division by zero
+
+    return {k: round((v / total) * 100, 2) for k, v in status_counts.items()}
+
+
+def _parse_day(value: Union[str, date]) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return Day.parse(value).date
+
+
+def _bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _bucket_after(start: date, bucket: str) -> date:
+    if bucket == "week":
+        return start + timedelta(days=7)
+    if bucket == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def _bucket_label(start: date, bucket: str) -> str:
+    if bucket == "week":
+        year, week, _ = start.isocalendar()
+        return f"{year}-W{week:02d}"
+    if bucket == "month":
+        return start.strftime("%b %Y")
+    return start.strftime("%d %b")
+
+
+def _summary(counts: dict[str, int]) -> dict:
+    statuses = {k: counts.get(k, 0) for k in ("completed", "pending", "deleted")}
+    total = sum(statuses.values())
+    postponed = counts.get("postponed", 0)
+    return {
+        "counts": {**statuses, "postponed": postponed},
+        "total": total,
+        "percentage": {
+            k: round((v / total) * 100, 2) if total else 0.0
+            for k, v in statuses.items()
+        },
+        # share of the tasks planned for the span that were pushed out of it
+        "postpone_rate": (
+            round((postponed / (total + postponed)) * 100, 2)
+            if total + postponed
+            else 0.0
+        ),
+    }
+
+
+def _next_day(date: str) -> str:
+    return (Day.parse(date) + 1).key
+
+
+def _isoformat(value: "datetime | str") -> str:
+    return value if isinstance(value, str) else value.isoformat()
 
 
 class Status(enum.Enum):
@@ -21,50 +203,164 @@ class Status(enum.Enum):
     CANCELLED = "canceled"
 
 
+def _position(
+    entries: list["Entry"], positions: dict[str, int], uid: str
+) -> Optional[int]:
+    """
+    Index of the task `uid` in `entries`, in O(1): `positions` remembers
+    the index of every uid and is only rebuilt when the remembered one no
+    longer holds the task.
+    """
+    index = positions.get(uid)
+    if index is None or index >= len(entries) or entries[index].uid != uid:
+        positions.clear()
+        positions.update((entry.uid, i) for i, entry in enumerate(entries))
+        index = positions.get(uid)
+    return index
+
+
+def _flush_history(history: HistoryStore, entries: list["Entry"]) -> None:
+    """
+    Move the log events of `entries` into the history store, once the
+    entries have been written. Called with the storage lock held, so the
+    events of a write that failed never reach the store.
+    """
+    changes = [
+        (entry.uid, entry._log, entry._pending)
+        for entry in entries
+        if entry._history is history and (entry._log or entry._pending)
+    ]
+    history.record(changes)
+    for entry in entries:
+        if entry._history is history:
+            entry._log, entry._pending = [], []
+
+
 class Entry:
-    def __init__(self, id: int, title: str):
-        __datetime = _get_current_datetime()
+    __slots__ = (
+        "id",
+        "uid",
+        "title",
+        "status",
+        "_date_created",
+        "_date_updated",
+        "_log",
+        "_pending",
+        "_history",
+    )
+
+    def __init__(self, id: int, title: str, history: Optional[HistoryStore] = None):
+        __datetime = clock.now()
         self.id: int = id
+        # survives reorders and postpones, unlike the positional `id`
+        self.uid: str = new_uid()
         self.title: str = title
         self.status: Status = Status.PENDING
         self.date_created: datetime = __datetime
         self.date_updated: datetime = __datetime
-        self.log: list[str] = [
-            f"Task created on {__datetime.strftime('%d-%m-%Y %H:%M:%S')}"
-        ]
+        # stored form of the log, see `entry_log`. Entries attached to a
+        # history store keep it there; `_log` then only holds what an old
+        # entry was loaded with and `_pending` the events not stored yet
+        self._log: list[entry_log.RawEvent] = []
+        self._pending: list[entry_log.RawEvent] = []
+        self._history = history
+        self._record(entry_log.encode(entry_log.CREATED, __datetime))
+
+    # timestamps stay ISO strings after loading until something reads them
+
+    @property
+    def date_created(self) -> datetime:
+        if isinstance(self._date_created, str):
+            self._date_created = datetime.fromisoformat(self._date_created)
+        return self._date_created
+
+    @date_created.setter
+    def date_created(self, value: datetime) -> None:
+        self._date_created = value
+
+    @property
+    def date_updated(self) -> datetime:
+        if isinstance(self._date_updated, str):
+            self._date_updated = datetime.fromisoformat(self._date_updated)
+        return self._date_updated
+
+    @date_updated.setter
+    def date_updated(self, value: datetime) -> None:
+        self._date_updated = value
+
+    def _raw_log(self) -> list[entry_log.RawEvent]:
+        if self._history is None:
+            return list(self._log)
+        # read from the store on demand; tasks it has nothing for yet
+        # still carry their log inline
+        return (self._history.events(self.uid) or self._log) + self._pending
+
+    @property
+    def log(self) -> list[entry_log.LogEvent]:
+        """The decoded log; events render to text with `str()`."""
+        return [entry_log.LogEvent.decode(raw) for raw in self._raw_log()]
+
+    def _record(self, raw: entry_log.RawEvent) -> None:
+        if self._history is None:
+            self._log.append(raw)
+            return
+        if self._log:
+            # the inline log already happened, so it can move to the store
+            # before the write; a store that has it keeps its own copy
+            self._history.record([(self.uid, self._log, [])])
+            self._log = []
+        self._pending.append(raw)
 
     def update_title(self, title: str):
-        self.log.append(
-            f"Title updated to {title} from {self.title} on {self.date_updated.strftime('%d-%m-%Y, %H:%M:%S')}"
+        self.date_updated = clock.now()
+        self._record(
+            entry_log.encode(entry_log.TITLE, self.date_updated, [title, self.title])
         )
         self.title = title
-        self.date_updated = _get_current_datetime()
 
     def update_status(self, new_status: Status):
         self.status = new_status
-        self.date_updated = _get_current_datetime()
-        self.log.append(
-            f"Status updated to {new_status.name} on {self.date_updated.strftime('%d-%m-%Y, %H:%M:%S')}"
+        self.date_updated = clock.now()
+        self._record(
+            entry_log.encode(entry_log.STATUS, self.date_updated, new_status.name)
         )
 
+    def postpone_to(self, date: str, id: int):
+        self.id = id
+        self.date_updated = clock.now()
+        self._record(entry_log.encode(entry_log.POSTPONED, self.date_updated, date))
+
     def serialize(self) -> dict:
         return {
             "id": self.id,
+            "uid": self.uid,
             "title": self.title,
             "status": self.status.value,
-            "date_created": self.date_created.isoformat(),
-            "date_updated": self.date_updated.isoformat(),
-            "log": self.log,
+            "date_created": _isoformat(self._date_created),
+            "date_updated": _isoformat(self._date_updated),
+            "log": list(self._log),
         }
 
+    def copy(self) -> "Entry":
+        entry = Entry.__new__(Entry)
+        for name in self.__slots__:
+            setattr(entry, name, getattr(self, name))
+        entry._log = list(self._log)
+        entry._pending = list(self._pending)
+        return entry
+
     @classmethod
-    def deserialize(cls, data: dict) -> "Entry":
-        entry = cls(data["id"], data["title"])
+    def deserialize(cls, data: dict, history: Optional[HistoryStore] = None) -> "Entry":
+        entry = cls.__new__(cls)
         entry.id = data["id"]
+        entry.uid = uid_of(data)
+        entry.title = data["title"]
         entry.status = Status(data["status"])
-        entry.date_updated = datetime.fromisoformat(data["date_updated"])
-        entry.date_created = datetime.fromisoformat(data["date_created"])
-        entry.log = data["log"]
+        entry._date_updated = data["date_updated"]
+        entry._date_created = data["date_created"]
+        entry._log = list(data.get("log", ()))
+        entry._pending = []
+        entry._history = history
         return entry
 
     def __repr__(self):
@@ -72,51 +368,142 @@ class Entry:
 
 
 class Todo:
-    def __init__(self, path: str = "../data/todo.json", date: Optional[str] = None):
-        self.file_path = os.path.join(os.path.dirname(__file__), path)
-        self.file_path = os.path.abspath(self.file_path)
-        if not os.path.exists(self.file_path):
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        date: Union[str, Day, None] = None,
+        storage: Optional[Storage] = None,
+    ):
+        if storage is None:
+            storage = open_storage(path)
+        self.storage = storage
+        self.file_path = storage.path
+        if not self.storage.exists():
             raise FileNotFoundError(f"Todo file not found at {self.file_path}")
-        self.data = []
+        self.counters = counters_for(self.storage)
+        self.history = history_for(self.storage)
+        self._data: Optional[list[Entry]] = None
+        self._version: Optional[str] = None
+        # uid -> index into `data`, healed lazily when it goes stale
+        self._positions: dict[str, int] = {}
 
         if date is None:
-            date = _get_current_datetime().strftime("%d-%m-%Y")
+            date = clock.today().key
+        elif isinstance(date, Day):
+            date = date.key
+        else:
+            # "1-1-2025" is stored, indexed and counted as "01-01-2025"
+            date = Day.parse(date).key
 
         self.date = date
-        self.__open(date)
+
+    @property
+    def data(self) -> list["Entry"]:
+        """Entries of the day, loaded on first access."""
+        if self._data is None:
+            self.__open(self.date)
+        return self._data
+
+    @data.setter
+    def data(self, value: list["Entry"]) -> None:
+        self._data = value
+
+    @property
+    def day(self) -> Day:
+        return Day.parse(self.date)
+
+    @property
+    def version(self) -> str:
+        """Content version of the day as loaded, see `day_version`."""
+        if self._data is None:
+            self.__open(self.date)
+        return self._version
 
     def __open(self, date: str) -> None:
-        with open(self.file_path, "r") as f:
-            data: dict[str, list[dict]] = json.load(f)
-            self.data = [Entry.deserialize(item) for item in data.get(date, [])]
-
-    def __write(self, date: str, data: Entry) -> None:
-        """Write data to the JSON file."""
-        with open(self.file_path, "r+") as f:
-            _data = json.load(f)
-            if date not in _data:
-                _data[date] = []
-            _data[date].append(data.serialize())
-            f.seek(0)
-            json.dump(_data, f, indent=4)
-            f.truncate()
-            self.data.append(data)
-
-    def __bulk_write_date(self, date: str, data: list[Entry]) -> None:
-        """Write multiple entries to the JSON file."""
-        with open(self.file_path, "r+") as f:
-            _data = json.load(f)
-            _data[date] = [entry.serialize() for entry in data]
-            f.seek(0)
-            json.dump(_data, f, indent=4)
-            f.truncate()
-            self.data = data
+        if config.ROLLOVER_ON_OPEN and _first_open_of_today(self.storage, date):
+            self.rollover()
+        versions: dict[str, str] = {}
+        self._data = list(_load_days(self.storage, [date], versions)[date])
+        self._version = versions[date]
+
+    def __write_through(self, mutation: Mutation, write, *args) -> None:
+        """
+        Run a storage write against the version of the day this instance
+        loaded, move the log events of the mutated entry to the history
+        store, refresh the cached copy of the day with the in-memory list
+        and publish the mutation. A failed write drops the cached day
+        instead, since the storage may be ahead of it.
+        """
+        key = (self.storage.path, self.date)
+        try:
+            # the signature must be taken before anyone else can write
+            with self.storage.lock(), span("storage_save"):
+                self._version = write(*args, expected=self._version)
+                signature = self.storage.signature(self.date)
+                _flush_history(self.history, [mutation.entry])
+        except BaseException:
+            day_cache.invalidate(key)
+            raise
+        day_cache.put(key, signature, _copies(self.data), self._version)
+        publish(mutation)
+
+    def __retrying(self, attempt: Callable[[], T]) -> T:
+        """
+        Run `attempt` optimistically. When another writer changed the day
+        first, reload it and run `attempt` again while holding the storage
+        lock, so the second try cannot lose. Attempts must locate their
+        entry afresh every time.
+        """
+        try:
+            return attempt()
+        except ConflictError:
+            pass
+        with self.storage.lock():
+            self._data = None
+            return attempt()
+
+    def __position(self, uid: str) -> Optional[int]:
+        return _position(self.data, self._positions, uid)
+
+    def __locate(self, entry: "Entry") -> int:
+        """Current index of `entry`, which may have moved since it was read."""
+        index = self.__position(entry.uid)
+        if index is None:
+            raise IndexError("Task no longer exists")
+        return index
+
+    def index_of(self, ref: Union[int, str]) -> int:
+        """
+        Index of the task `ref` names: its stable `uid`, or its position
+        for links made before tasks had one. IndexError when there is none.
+        """
+        if isinstance(ref, str):
+            index = self.__position(ref)
+            if index is not None:
+                return index
+            if not ref.isdigit():
+                raise IndexError("Task no longer exists")
+        index = int(ref)
+        if index < 0 or index >= len(self.data):
+            raise IndexError("Task index out of range")
+        return index
 
     def add(self, task: str) -> Entry:
         """Add a task to the todo list"""
-        date = self.date
-        entry = Entry(len(self), task)
-        self.__write(date, entry)
+
+        def attempt() -> Entry:
+            entry = Entry(len(self), task, self.history)
+            self.data.append(entry)
+            self.__write_through(
+                Mutation("add", self.storage, self.date, len(self) - 1, entry),
+                self.storage.append,
+                self.date,
+                entry.serialize(),
+            )
+            return entry
+
+        entry = self.__retrying(attempt)
+        self.counters.adjust(self.date, **{entry.status.value: 1})
         return entry
 
     def get(self, index: int) -> Entry:
@@ -131,20 +518,35 @@ class Todo:
         """Update the status of a task at a specific index."""
         if index < 0 or index >= len(self.data):
             raise IndexError("Task index out of range")
-
-        task = self.data[index]
-
-        if title:
-            task.update_title(title)
-            self.__bulk_write_date(self.date, self.data)
-            return task
-
-        if status:
-            task.update_status(status)
-            self.__bulk_write_date(self.date, self.data)
+        if not title and not status:
+            raise ValueError("Either status or title is required")
+
+        target = self.data[index]
+        previous = target.status
+
+        def attempt() -> Entry:
+            nonlocal previous
+            current = self.__locate(target)
+            task = self.data[current]
+            # a retry sees the task as the other writer left it
+            previous = task.status
+            if title:
+                task.update_title(title)
+            else:
+                task.update_status(status)
+            self.__write_through(
+                Mutation("update", self.storage, self.date, current, task),
+                self.storage.replace,
+                self.date,
+                current,
+                task.serialize(),
+            )
             return task
 
-        raise ValueError("Either status or title is required")
+        task = self.__retrying(attempt)
+        if status and previous != status:
+            self.counters.adjust(self.date, **{previous.value: -1, status.value: 1})
+        return task
 
     def reorder(self, from_index: int, to_index: int) -> None:
         """Move a task from one index to another, shifting other tasks accordingly."""
@@ -153,64 +555,248 @@ class Todo:
         if to_index < 0 or to_index >= len(self.data):
             raise IndexError("To index out of range")
 
-        item = self.data.pop(from_index)  # remove the item
-        self.data.insert(to_index, item)  # insert it at the new position
-        self.__bulk_write_date(self.date, self.data)
+        target = self.data[from_index]
+
+        def attempt() -> None:
+            current = self.__locate(target)
+            destination = min(to_index, len(self.data) - 1)
+            item = self.data.pop(current)  # remove the item
+            self.data.insert(destination, item)  # insert it at the new position
+            self.__write_through(
+                Mutation("reorder", self.storage, self.date, destination, item),
+                self.storage.reorder,
+                self.date,
+                current,
+                destination,
+            )
+
+        self.__retrying(attempt)
 
     def postpone(self, index: int) -> Entry:
         """Move a task from today to the next day."""
         if index < 0 or index >= len(self.data):
             raise IndexError("Task index out of range")
 
-        with open(self.file_path, "r+") as f:
-            data = json.load(f)
-
-        # Current and next day keys
-        current_date = datetime.strptime(self.date, "%d-%m-%Y")
-        next_day = current_date + timedelta(days=1)
-        next_day_str = next_day.strftime("%d-%m-%Y")
+        next_day_str = (self.day + 1).key
+
+        target = self.data[index]
+
+        def attempt() -> Entry:
+            current = self.__locate(target)
+
+            # Get task and remove from today's list
+            task = self.data.pop(current)
+            task.postpone_to(
+                next_day_str,
+                len(_load_days(self.storage, [next_day_str])[next_day_str]),
+            )
+
+            day_cache.invalidate((self.storage.path, next_day_str))
+            self.__write_through(
+                Mutation(
+                    "postpone", self.storage, self.date, current, task, next_day_str
+                ),
+                self.storage.move,
+                self.date,
+                current,
+                next_day_str,
+                task.serialize(),
+            )
+            return task
 
-        # Get task and remove from today's list
-        task = self.data.pop(index)
-        task.date_updated = _get_current_datetime()
-        task.id = len(Todo(date=next_day_str))
-        task.log.append(
-            f"Task postponed to {next_day_str} on {task.date_updated.strftime('%d-%m-%Y, %H:%M:%S')}"
-        )
+        task = self.__retrying(attempt)
+        self.counters.adjust(self.date, **{task.status.value: -1, "postponed": 1})
+        self.counters.adjust(next_day_str, **{task.status.value: 1})
 
-        # Update file data
-        if next_day_str not in data:
-            data[next_day_str] = []
+        return task
 
-        data[self.date] = [entry.serialize() for entry in self.data]
-        data[next_day_str].append(task.serialize())
+    def apply_batch(self, operations: list[dict]) -> list[tuple[str, Entry]]:
+        """
+        Apply several operations with one load and one write of the days
+        they touch.
+
+        Each operation is a dict with an `op` of `status`, `title`,
+        `reorder` or `postpone`, the task it targets as an `id` (its uid) or
+        an `index` (`from`/`to` for a reorder, where `id` may stand in for
+        `from`), its `status` or `title` argument, and an optional `date`
+        that defaults to this list's day. Operations run in order, so an
+        index refers to the day as the previous operations left it. If any
+        of them is invalid nothing is written.
+
+        Returns every affected entry with the day it ended up on.
+        """
+        steps = [self.__batch_step(operation) for operation in operations]
+        dates = {step[1] for step in steps}
+        dates |= {_next_day(step[1]) for step in steps if step[0] == "postpone"}
+        return self.__retrying(lambda: self.__apply_steps(steps, sorted(dates)))
 
-        with open(self.file_path, "w") as f:
-            json.dump(data, f, indent=4)
+    def rollover(self, days: Optional[int] = None) -> list[tuple[str, Entry]]:
+        """
+        Carry every pending task of the `days` days before this one
+        (ROLLOVER_DAYS by default) over to this day, in one write of all
+        the days involved. Each moved task logs a postpone to this day.
 
-        return task
+        Returns the moved entries with this day.
+        """
+        days = config.ROLLOVER_DAYS if days is None else days
+        previous = [(self.day - n).key for n in range(days, 0, -1)]
+        counts = _status_counts(self.storage, previous)
+        sources = [date for date in previous if counts.get(date, {}).get("pending")]
+        if not sources:
+            return []
+        steps = [("rollover", date, self.date) for date in sources]
+        return self.__retrying(lambda: self.__apply_steps(steps, [*sources, self.date]))
+
+    def __batch_step(self, operation: dict) -> tuple:
+        """Validate one batch operation into `(op, date, *args)`."""
+        if not isinstance(operation, dict):
+            raise ValueError("Batch operations must be objects")
+        op = operation.get("op")
+        date = Day.parse(operation.get("date") or self.date).key
+
+        def target(key: str) -> Union[int, str]:
+            uid = operation.get("id")
+            return str(uid) if uid else int(operation[key])
+
+        try:
+            match op:
+                case "status":
+                    return op, date, target("index"), Status(operation["status"])
+                case "title":
+                    if not operation["title"]:
+                        raise ValueError("Title is required")
+                    return op, date, target("index"), str(operation["title"])
+                case "reorder":
+                    return op, date, target("from"), int(operation["to"])
+                case "postpone":
+                    return op, date, target("index")
+        except KeyError as error:
+            raise ValueError(f"Missing {error.args[0]!r} in {op} operation") from None
+        except TypeError as error:
+            raise ValueError(f"Invalid {op} operation: {error}") from None
+        raise ValueError(f"Unknown batch operation {op!r}")
+
+    def __apply_steps(self, steps: list[tuple], dates: list[str]) -> list[tuple]:
+        versions: dict[str, str] = {}
+        days = {
+            date: list(entries)
+            for date, entries in _load_days(self.storage, dates, versions).items()
+        }
+        changed: set[str] = set()
+        deltas: dict[str, dict[str, int]] = {}
+        affected: dict[int, tuple[str, Entry]] = {}
+        positions: dict[str, dict[str, int]] = {date: {} for date in dates}
+
+        def locate(date: str, ref: Union[int, str]) -> int:
+            if isinstance(ref, str):
+                index = _position(days[date], positions[date], ref)
+                if index is None:
+                    raise IndexError("Task no longer exists")
+                return index
+            if ref < 0 or ref >= len(days[date]):
+                raise IndexError("Task index out of range")
+            return ref
+
+        def count(date: str, key: str, delta: int) -> None:
+            day = deltas.setdefault(date, {})
+            day[key] = day.get(key, 0) + delta
+
+        try:
+            for op, date, *args in steps:
+                entries = days[date]
+                if op == "rollover":
+                    to_date = args[0]
+                    moved = [task for task in entries if task.status is Status.PENDING]
+                    if not moved:
+                        continue
+                    entries[:] = [
+                        task for task in entries if task.status is not Status.PENDING
+                    ]
+                    for task in moved:
+                        task.postpone_to(to_date, len(days[to_date]))
+                        days[to_date].append(task)
+                        affected[id(task)] = (to_date, task)
+                    changed.update((date, to_date))
+                    count(date, Status.PENDING.value, -len(moved))
+                    count(date, "postponed", len(moved))
+                    count(to_date, Status.PENDING.value, len(moved))
+                    continue
+
+                changed.add(date)
+                if op == "reorder":
+                    from_index, to_index = locate(date, args[0]), locate(date, args[1])
+                    task = entries.pop(from_index)
+                    entries.insert(to_index, task)
+                    affected[id(task)] = (date, task)
+                    continue
+
+                index = locate(date, args[0])
+                task = entries[index]
+                match op:
+                    case "status":
+                        if task.status != args[1]:
+                            count(date, task.status.value, -1)
+                            count(date, args[1].value, 1)
+                        task.update_status(args[1])
+                    case "title":
+                        task.update_title(args[1])
+                    case "postpone":
+                        next_day_str = _next_day(date)
+                        entries.pop(index)
+                        task.postpone_to(next_day_str, len(days[next_day_str]))
+                        days[next_day_str].append(task)
+                        changed.add(next_day_str)
+                        count(date, task.status.value, -1)
+                        count(date, "postponed", 1)
+                        count(next_day_str, task.status.value, 1)
+                        date = next_day_str
+                affected[id(task)] = (date, task)
+
+            with span("serialize"):
+                serialized = {
+                    date: [entry.serialize() for entry in days[date]]
+                    for date in changed
+                }
+            with self.storage.lock(), span("storage_save"):
+                saved = self.storage.save_days(
+                    serialized, expected={date: versions[date] for date in changed}
+                )
+                signatures = {date: self.storage.signature(date) for date in saved}
+                _flush_history(
+                    self.history, [entry for date in saved for entry in days[date]]
+                )
+        except BaseException:
+            # some days may have been written before the failure
+            for date in dates:
+                day_cache.invalidate((self.storage.path, date))
+            self._data = None
+            raise
+
+        for date, version in saved.items():
+            day_cache.put(
+                (self.storage.path, date),
+                signatures[date],
+                _copies(days[date]),
+                version,
+            )
+            publish(Mutation("batch", self.storage, date))
+        if self.date in saved:
+            self._data, self._version = list(days[self.date]), saved[self.date]
+        for date, day in deltas.items():
+            self.counters.adjust(date, **day)
+        return list(affected.values())
 
     def percentage(self):
         """
         Calculate the percentage of tasks by status (completed, pending, deleted)
         for the currently loaded date.
         """
-        status_counts = {"completed": 0, "pending": 0, "deleted": 0}
-        total = 0
-
-        for task in self.data:
-            status = task.status.value.lower()
-            if status in status_counts:
-                status_counts[status] += 1
-                total += 1
-
-        if total == 0:
-            return {k: 0.0 for k in status_counts}  # Avoid division by zero
-
-        return {k: round((v / total) * 100, 2) for k, v in status_counts.items()}
+        return _percentage(_status_counts(self.storage, [self.date])[self.date])
 
     @staticmethod
-    def percentage_weekly(path: str = "../data/todo.json") -> dict:
+    def percentage_weekly(
+        path: Optional[str] = None, storage: Optional[Storage] = None
+    ) -> dict:
         """
         Static method:
         Computes task status percentages (Completed, Pending, Deleted)
@@ -224,45 +810,40 @@ class Todo:
                 'deleted': [...]
             }
         """
-        file_path = os.path.join(os.path.dirname(__file__), path)
-        file_path = os.path.abspath(file_path)
-
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"Todo file not found at {file_path}")
+        if storage is None:
+            storage = open_storage(path)
 
-        with open(file_path, "r") as f:
-            data: dict[str, list[dict]] = json.load(f)
+        if not storage.exists():
+            raise FileNotFoundError(f"Todo file not found at {storage.path}")
 
-        today_dt = _get_current_datetime()
-        monday = today_dt - timedelta(days=today_dt.weekday())
+        today = clock.today()
+        monday = today - today.date.weekday()
+        week = [monday + i for i in range(7)]
+        data = _status_counts(storage, [day.key for day in week])
 
         results = {
             "percentage": {"dates": [], "completed": [], "pending": [], "deleted": []},
             "count": {"dates": [], "completed": [], "pending": [], "deleted": []},
         }
 
-        for i in range(7):
-            day = monday + timedelta(days=i)
-            day_str = day.strftime("%d-%m-%Y")
-            weekday_label = day.strftime("%a")
-            entries = data.get(day_str, [])
+        for day in week:
+            day_str = day.key
+            weekday_label = day.date.strftime("%a")
+            day_counts = data.get(day_str, {})
 
             results["percentage"]["dates"].append(weekday_label)
             results["count"]["dates"].append(weekday_label)
 
-            if not entries:
+            if not day_counts:
                 for k in ["completed", "pending", "deleted"]:
                     results["percentage"][k].append(0)
                     results["count"][k].append(0)
                 continue
 
-            total = len(entries)
-            counts = {"completed": 0, "pending": 0, "deleted": 0}
-
-            for e in entries:
-                s = e["status"].lower()
-                if s in counts:
-                    counts[s] += 1
+            total = sum(day_counts.values())
+            counts = {
+                k: day_counts.get(k, 0) for k in ["completed", "pending", "deleted"]
+            }
 
             for k in counts:
                 results["count"][k].append(counts[k])
@@ -270,6 +851,152 @@ class Todo:
 
         return results
 
+    STATS_BUCKETS = ("day", "week", "month")
+
+    @staticmethod
+    def stats(
+        start: Union[str, date],
+        end: Union[str, date],
+        bucket: str = "day",
+        path: Optional[str] = None,
+        storage: Optional[Storage] = None,
+    ) -> dict:
+        """
+        Static method:
+        Task statistics for the days from `start` to `end` inclusive
+        (`date`s or `%d-%m-%Y` keys), grouped into day, week (Monday
+        based) or month buckets. Only the counters inside the window are
+        read, so the cost follows the window rather than the history.
+
+        Returns:
+            dict -> {
+                'start': iso, 'end': iso, 'bucket': 'day',
+                'buckets': [{'label', 'start', 'end', 'counts', 'total',
+                             'percentage', 'postpone_rate'}, ...],
+                'totals': {'counts', 'total', 'percentage', 'postpone_rate'},
+                'streak': {'current': int, 'longest': int},
+            }
+        """
+        if bucket not in Todo.STATS_BUCKETS:
+            raise ValueError(f"Unknown bucket {bucket!r}")
+        start, end = _parse_day(start), _parse_day(end)
+        if end < start:
+            raise ValueError("The window ends before it starts")
+
+        if storage is None:
+            storage = open_storage(path)
+        if not storage.exists():
+            raise FileNotFoundError(f"Todo file not found at {storage.path}")
+
+        by_day = {
+            _parse_day(key): counts
+            for key, counts in _range_counts(storage, start, end).items()
+        }
+
+        grouped: dict[date, dict[str, int]] = {}
+        totals: dict[str, int] = {}
+        for day, day_counts in by_day.items():
+            counts = grouped.setdefault(_bucket_start(day, bucket), {})
+            for key, value in day_counts.items():
+                counts[key] = counts.get(key, 0) + value
+                totals[key] = totals.get(key, 0) + value
+
+        buckets = []
+        current = _bucket_start(start, bucket)
+        while current <= end:
+            following = _bucket_after(current, bucket)
+            first, last = max(current, start), min(following - timedelta(days=1), end)
+            counts = grouped.get(current, {})
+            buckets.append(
+                {
+                    "label": _bucket_label(current, bucket),
+                    "start": first.isoformat(),
+                    "end": last.isoformat(),
+                    **_summary(counts),
+                }
+            )
+            current = following
+
+        # streaks of consecutive days with at least one completed task; a
+        # day that has none yet does not end the current streak
+        longest = run = 0
+        previous = None
+        for day in sorted(by_day):
+            if not by_day[day].get("completed"):
+                continue
+            run = run + 1 if previous == day - timedelta(days=1) else 1
+            longest = max(longest, run)
+            previous = day
+        last_day = min(end, clock.today().date)
+        alive = previous is not None and (last_day - previous).days <= 1
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "bucket": bucket,
+            "buckets": buckets,
+            "totals": _summary(totals),
+            "streak": {"current": run if alive else 0, "longest": longest},
+        }
+
+    @staticmethod
+    def import_days(
+        days: dict[str, list[dict]],
+        path: Optional[str] = None,
+        storage: Optional[Storage] = None,
+    ) -> int:
+        """
+        Static method:
+        Append already validated, serialized entries to their days with
+        one load and one write of all of them. Entries whose creation
+        timestamp is already on the day are skipped, so importing the same
+        export twice adds nothing. Ids are renumbered to the positions the
+        entries land at; logs stay inline until their day is next written,
+        see `HistoryStore`.
+
+        Returns:
+            int -> number of entries added
+        """
+        if storage is None:
+            storage = open_storage(path)
+        if not storage.exists():
+            raise FileNotFoundError(f"Todo file not found at {storage.path}")
+        # opened first: counters built from a scan would already see the import
+        counters = counters_for(storage)
+
+        normalized: dict[str, list[dict]] = {}
+        for key, entries in days.items():
+            normalized.setdefault(Day.parse(key).key, []).extend(entries)
+        days = normalized
+        dates = sorted(days)
+        deltas: dict[str, dict[str, int]] = {}
+        with storage.lock():
+            with span("storage_load"):
+                current = storage.load_days(dates)
+            changed = {}
+            for date in dates:
+                entries = current[date]
+                seen = {entry["date_created"] for entry in entries}
+                for entry in days[date]:
+                    if entry["date_created"] in seen:
+                        continue
+                    seen.add(entry["date_created"])
+                    entries.append({**entry, "id": len(entries), "uid": uid_of(entry)})
+                    counts = deltas.setdefault(date, {})
+                    counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+                if date in deltas:
+                    changed[date] = entries
+            try:
+                with span("storage_save"):
+                    storage.save_days(changed)
+            finally:
+                for date in changed:
+                    day_cache.invalidate((storage.path, date))
+
+        for date, counts in deltas.items():
+            counters.adjust(date, **counts)
+            publish(Mutation("batch", storage, date))
+        return sum(sum(counts.values()) for counts in deltas.values())
+
     def __len__(self) -> int:
         return len(self.data)
 
@@ -0,0 +1,138 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from config import config
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the threads currently serving requests.
+
+    A single background thread wakes up every `interval` seconds and
+    records the Python stack of every tracked thread, keyed by the route
+    it is serving. Profiles are written to `<directory>/<route>.folded` in
+    the collapsed-stack format flame graph tools read, one
+    `frame;frame;frame count` line per distinct stack. Requests never
+    pay for the sampling themselves.
+    """
+
+    def __init__(
+        self, directory: str, interval: float = 0.005, dump_every: float = 10.0
+    ):
+        self.directory = directory
+        self.interval = interval
+        self.dump_every = dump_every
+        # thread id -> route being served
+        self._tracked: dict[int, str] = {}
+        self._samples: dict[str, Counter] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        if self._worker is None or not self._worker.is_alive():
+            os.makedirs(self.directory, exist_ok=True)
+            self._stop.clear()
+            self._worker = threading.Thread(
+                target=self._run, name="sampling-profiler", daemon=True
+            )
+            self._worker.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        self.dump()
+
+    def track(self, route: str) -> None:
+        with self._lock:
+            self._tracked[threading.get_ident()] = route
+
+    def untrack(self) -> None:
+        with self._lock:
+            self._tracked.pop(threading.get_ident(), None)
+
+    def sample(self) -> None:
+        frames = sys._current_frames()
+        with self._lock:
+            for ident, route in self._tracked.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    stacks = self._samples.setdefault(route, Counter())
+                    stacks[_collapse(frame)] += 1
+
+    def dump(self) -> list[str]:
+        """Write every route's profile so far; returns the files written."""
+        with self._lock:
+            profiles = {
+                route: Counter(stacks) for route, stacks in self._samples.items()
+            }
+        written = []
+        for route, stacks in profiles.items():
+            path = os.path.join(self.directory, f"{_slug(route)}.folded")
+            with open(path, "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            written.append(path)
+        return written
+
+    def _run(self) -> None:
+        last_dump = time.monotonic()
+        while not self._stop.wait(self.interval):
+            self.sample()
+            if time.monotonic() - last_dump >= self.dump_every:
+                self.dump()
+                last_dump = time.monotonic()
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _slug(route: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", route).strip("_") or "root"
+
+
+# the running profiler, if any; requests register with it
+active: Optional[SamplingProfiler] = None
+
+
+def enable(directory: Optional[str] = None) -> SamplingProfiler:
+    global active
+    if active is None:
+        active = SamplingProfiler(
+            directory or config.PROFILE_DIR or "profiles",
+            interval=config.PROFILE_INTERVAL_MS / 1000,
+        ).start()
+    return active
+
+
+def disable() -> list[str]:
+    """Stop profiling; returns the profile files written."""
+    global active
+    if active is None:
+        return []
+    profiler, active = active, None
+    profiler.stop()
+    return profiler.dump()
+
+
+def start_from_config() -> Optional[SamplingProfiler]:
+    """Start profiling when PROFILE_DIR is set."""
+    if not config.PROFILE_DIR:
+        return None
+    return enable(config.PROFILE_DIR)
@@ -1,25 +1,153 @@
-from datetime import datetime, timedelta
+from concurrent.futures import Future
+from datetime import timedelta
+from typing import Callable
 
-from flask import Blueprint, Response, render_template, request
+from flask import (
+    Blueprint,
+    Response,
+    jsonify,
+    render_template,
+    request,
+    stream_with_context,
+)
 
 from config import config
 
-from .decorators import is_logged_in
-from .model import Status, Todo, _get_current_datetime
+from . import ai, clock, fragments, live, metrics, profiler, search, tenants, transfer
+from .assets import assets
+from .cache import day_cache, fragment_cache
+from .clock import Day
+from .decorators import is_logged_in, is_operator
+from .goals import goals_for
+from .model import (
+    Status,
+    Todo,
+    _load_days,
+    open_storage,
+)
+from .storage import ConflictError
 
 router = Blueprint("router", __name__)
+# longest rollover a request may ask for, in days
+MAX_ROLLOVER_DAYS = 366
+router.register_blueprint(assets)
+
+
+@router.before_app_request
+def start_instrumentation():
+    if config.METRICS:
+        metrics.start_request()
+    if profiler.active is not None:
+        profiler.active.track(request.endpoint or request.path)
+
+
+@router.after_app_request
+def finish_instrumentation(response: Response):
+    if config.METRICS:
+        timing = metrics.finish_request(
+            request.endpoint, request.method, response.status_code
+        )
+        if timing:
+            response.headers["Server-Timing"] = timing
+    return response
+
+
+@router.teardown_app_request
+def stop_profiling(error=None):
+    if profiler.active is not None:
+        profiler.active.untrack()
 
 
 @router.route("/")
 @is_logged_in
 def home():
-    weekly_graph = Todo.percentage_weekly()
-    daily_graph = Todo().percentage()
+    storage = open_storage()
+    today = clock.today().date
+
+    def render() -> str:
+        weekly_graph = Todo.percentage_weekly(storage=storage)
+        daily_graph = Todo(storage=storage).percentage()
+        month_end = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
+        monthly_graph = Todo.stats(
+            today.replace(day=1), month_end - timedelta(days=1), "day", storage=storage
+        )
+        yearly_graph = Todo.stats(
+            today.replace(month=1, day=1),
+            today.replace(month=12, day=31),
+            "month",
+            storage=storage,
+        )
+        return render_template(
+            "dashboard.html",
+            weekly_graph_percentage=weekly_graph["percentage"],
+            weekly_graph_count=weekly_graph["count"],
+            daily_graph=daily_graph,
+            monthly_graph=monthly_graph,
+            yearly_graph=yearly_graph,
+        )
+
+    return fragments.conditional(
+        (storage.path, None, "dashboard"),
+        fragments.dashboard_version(storage, Day.of(today).key),
+        render,
+    )
+
+
+@router.route("/goals", methods=["GET", "POST"])
+@is_logged_in
+def goals():
+    store = goals_for(open_storage())
+    if request.method == "POST":
+        title = (request.form.get("title") or "").strip()
+        if not title:
+            return Response("A title is required", status=400)
+        goal = store.create(title, request.form.get("tag") or None)
+        return render_template(
+            "partials/goals/goal.html", goal=goal, progress=store.progress(goal.id)
+        )
     return render_template(
-        "dashboard.html",
-        weekly_graph_percentage=weekly_graph["percentage"],
-        weekly_graph_count=weekly_graph["count"],
-        daily_graph=daily_graph,
+        "goals.html",
+        goals=[(goal, store.progress(goal.id)) for goal in store.goals()],
+    )
+
+
+@router.route("/goals/<goal_id>", methods=["DELETE"])
+@is_logged_in
+def goal_delete(goal_id: str):
+    if not goals_for(open_storage()).delete(goal_id):
+        return Response("No such goal", status=404)
+    return ""
+
+
+@router.route("/goals/<goal_id>/progress", methods=["GET"])
+@is_logged_in
+def goal_progress(goal_id: str):
+    store = goals_for(open_storage())
+    if store.get(goal_id) is None:
+        return Response("No such goal", status=404)
+    return render_template(
+        "partials/goals/progress.html", progress=store.progress(goal_id)
+    )
+
+
+@router.route("/goals/<goal_id>/link", methods=["POST"])
+@is_logged_in
+def goal_link(goal_id: str):
+    """Count the task `ref` (its uid or index) of day `date` towards the goal."""
+    payload = request.get_json(silent=True) or request.form
+    date, ref = payload.get("date"), payload.get("ref")
+    if not date or ref is None:
+        return Response("date and ref are required", status=400)
+    todo = Todo(date=date)
+    try:
+        entry = todo.get(todo.index_of(str(ref)))
+    except IndexError as error:
+        return Response(str(error), status=404)
+    store = goals_for(todo.storage)
+    if not store.link(goal_id, date, entry):
+        return Response("No such goal", status=404)
+    return render_template(
+        "partials/goals/progress.html", progress=store.progress(goal_id)
     )
 
 
@@ -29,13 +157,14 @@ def login():
         login_key = request.form.get("login-key")
         if not login_key:
             return Response("Missing login key", status=200)
-        if login_key != config.LOGIN_KEY:
+        hashed = tenants.hash_key(login_key)
+        if tenants.resolve(hashed) is None:
             return Response("Invalid login key", status=200)
         resp = Response("ok")
         resp.headers["HX-Redirect"] = "/"
         resp.set_cookie(
             "_s_key",
-            config.HASHED_LOGIN_KEY,
+            hashed,
             httponly=True,
             samesite="Lax",
             max_age=3600,
@@ -53,24 +182,24 @@ def todo():
     if request.method == "GET":
         date = request.args.get("_t", None)
         todo = Todo(date=date)
-        prev_date = datetime.strptime(todo.date, "%d-%m-%Y") - timedelta(days=1)
-        next_date = datetime.strptime(todo.date, "%d-%m-%Y") + timedelta(days=1)
-        today = _get_current_datetime()
-
-        is_future: bool = datetime.strptime(todo.date, "%d-%m-%Y").date() > today.date()
-        is_present: bool = (
-            datetime.strptime(todo.date, "%d-%m-%Y").date() == today.date()
-        )
-        return render_template(
-            "todo.html",
-            todos=todo.data,
-            today=today,
-            date=todo.date,
-            next_date=next_date,
-            prev_date=prev_date,
-            is_future=is_future,
-            is_present=is_present,
-            percentage=todo.percentage(),
+        day = todo.day
+        today = clock.today()
+        # past days never change, so navigating history is mostly 304s
+        return fragments.conditional(
+            (todo.storage.path, todo.date, "page"),
+            (todo.version, int(today)),
+            lambda: render_template(
+                "todo.html",
+                todos=todo.data,
+                today=today,
+                date=todo.date,
+                next_date=day + 1,
+                prev_date=day - 1,
+                is_future=day > today,
+                is_present=day == today,
+                percentage=todo.percentage(),
+                render_item=fragments.item_renderer(todo.storage.path, todo.date),
+            ),
         )
 
     if request.method == "POST":
@@ -87,33 +216,275 @@ def todo():
     return render_template("404.html")
 
 
+@router.route("/stats", methods=["GET"])
+@is_logged_in
+def stats():
+    start = request.args.get("start")
+    end = request.args.get("end")
+    if not start or not end:
+        return Response("start and end are required", status=400)
+    try:
+        return jsonify(Todo.stats(start, end, request.args.get("bucket", "day")))
+    except ValueError as error:
+        return Response(str(error), status=400)
+
+
+@router.route("/search", methods=["GET"])
+@is_logged_in
+def search_tasks():
+    query = request.args.get("q", "").strip()
+    results = search.index_for(open_storage()).search(query) if query else []
+    return render_template("partials/search/results.html", results=results, query=query)
+
+
+@router.route("/export", methods=["GET"])
+@is_logged_in
+def export():
+    format = request.args.get("format", "ndjson")
+    start = request.args.get("start") or None
+    end = request.args.get("end") or None
+    try:
+        lines = transfer.export(open_storage(), format, start, end)
+        # the first line (or the error) is produced before the response starts
+        first = next(lines, "")
+    except ValueError as error:
+        return Response(str(error), status=400)
+
+    def stream():
+        yield first
+        yield from lines
+
+    response = Response(
+        stream_with_context(stream()), mimetype=transfer.MIMETYPES[format]
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="journal.{format}"'
+    return response
+
+
+@router.route("/live/<date>", methods=["GET"])
+@is_logged_in
+def live_updates(date: str):
+    try:
+        date = Day.parse(date).key
+    except ValueError as error:
+        return Response(str(error), status=400)
+
+    # a stream would hold a single-threaded worker for its whole lifetime;
+    # 204 tells the browser not to reconnect, and the page falls back to
+    # fetching the progress bar after each change
+    if not config.LIVE_UPDATES or not request.environ.get("wsgi.multithread"):
+        return Response(status=204)
+    storage = open_storage()
+    subscription = live.broker.subscribe(
+        (storage.path, date), request.args.get("client")
+    )
+    if subscription is None:
+        return Response(status=204)
+
+    snapshot = live.render_progress(_load_days(storage, [date])[date])
+    response = Response(
+        stream_with_context(
+            live.stream(subscription, snapshot, config.LIVE_STREAM_SECONDS)
+        ),
+        mimetype="text/event-stream",
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    response.call_on_close(subscription.close)
+    return response
+
+
 @router.route("/todo/<date>/progress", methods=["GET"])
 @is_logged_in
 def todo_progress(date: str):
     if request.method == "GET":
-        percentage = Todo(date=date).percentage()
-        return render_template("partials/todo/progress_bar.html", percentage=percentage)
+        todo = Todo(date=date)
+        # from the counters: the day itself is never loaded
+        return fragments.conditional(
+            (todo.storage.path, todo.date, "progress"),
+            fragments.progress_version(todo.storage, todo.date),
+            lambda: render_template(
+                "partials/todo/progress_bar.html", percentage=todo.percentage()
+            ),
+        )
     return render_template("404.html")
 
 
-@router.route("/todo/<date>/<index>/<method>", methods=["POST", "DELETE"])
+@router.route("/todo/<date>/<ref>", methods=["GET"])
+@is_logged_in
+def todo_item(date: str, ref: str):
+    todo = Todo(date=date)
+    try:
+        entry = todo.get(todo.index_of(ref))
+    except IndexError as error:
+        return Response(str(error), status=404)
+    return fragments.conditional(
+        (todo.storage.path, todo.date, "item", entry.uid),
+        fragments.item_version(entry),
+        lambda: render_template("partials/todo/item.html", todo=entry, date=todo.date),
+    )
+
+
+@router.route("/todo/<date>/batch", methods=["POST"])
+@is_logged_in
+def todo_batch(date: str):
+    payload = request.get_json(silent=True)
+    operations = payload.get("operations") if isinstance(payload, dict) else payload
+    if not isinstance(operations, list) or not operations:
+        return Response("A list of operations is required", status=400)
+
+    try:
+        affected = Todo(date=date).apply_batch(operations)
+    except (ValueError, IndexError) as error:
+        return Response(str(error), status=400)
+
+    # postponed rows leave the page; the rest are swapped in place
+    removed = [entry.uid for day, entry in affected if day != date]
+    return render_template(
+        "partials/todo/batch.html",
+        todos=[entry for day, entry in affected if day == date],
+        removed=removed,
+        date=date,
+    )
+
+
+@router.route("/todo/<date>/rollover", methods=["POST"])
+@is_logged_in
+def todo_rollover(date: str):
+    """Carry the pending tasks of the previous days over to `date`."""
+    try:
+        Day.parse(date)
+        days = int(request.args.get("days", config.ROLLOVER_DAYS))
+    except ValueError as error:
+        return Response(str(error), status=400)
+    if days < 1:
+        return Response("days must be at least 1", status=400)
+    days = min(days, max(config.ROLLOVER_DAYS, MAX_ROLLOVER_DAYS))
+    moved = Todo(date=date).rollover(days)
+    return render_template(
+        "partials/todo/rollover.html", todos=[entry for _, entry in moved], date=date
+    )
+
+
+@router.route("/todo/<date>/<ref>/<method>", methods=["POST", "DELETE"])
 @is_logged_in
-def todo_date(date: str, index: int, method: str):
-    index = int(index)
-    if index < 0 or not date or not method:
-        raise ValueError("Index, date, and method required")
+def todo_date(date: str, ref: str, method: str):
+    """`ref` is the task's uid, or its index in links made before uids."""
+    todo = Todo(date=date)
+    try:
+        index = todo.index_of(ref)
+    except IndexError as error:
+        return Response(str(error), status=404)
 
     if request.method == "POST":
         match method:
             case "completed":
-                todo = Todo(date=date).update(index, Status.COMPLETED)
-                return render_template("partials/todo/item.html", todo=todo)
+                entry = todo.update(index, Status.COMPLETED)
+                return render_template("partials/todo/item.html", todo=entry, date=date)
             case "postpone":
-                todo = Todo(date=date).postpone(index)
+                todo.postpone(index)
                 return ""
 
     if request.method == "DELETE":
-        todo = Todo(date=date).update(index, Status.DELETED)
-        return render_template("partials/todo/item.html", todo=todo)
+        entry = todo.update(index, Status.DELETED)
+        return render_template("partials/todo/item.html", todo=entry, date=date)
 
     return render_template("404.html")
+
+
+def _assistant_answer(answer: Callable[[ai.AI], Future]):
+    """
+    The assistant's answer once it is ready. Until then a placeholder
+    that polls this same URL, so the request thread never waits on it.
+    """
+    try:
+        future = answer(ai.ai_for(open_storage()))
+    except ai.Busy:
+        future = None
+    if future is None or not future.done():
+        return render_template("partials/ai/answer.html", pending=True)
+    if future.exception() is not None:
+        return render_template("partials/ai/answer.html", error=True)
+    return render_template("partials/ai/answer.html", text=future.result())
+
+
+@router.route("/ai/<date>/summary", methods=["GET"])
+@is_logged_in
+def ai_summary(date: str):
+    try:
+        Day.parse(date)
+    except ValueError as error:
+        return Response(str(error), status=400)
+    return _assistant_answer(lambda assistant: assistant.daily_summary(date))
+
+
+@router.route("/ai/<date>/review", methods=["GET"])
+@is_logged_in
+def ai_review(date: str):
+    try:
+        Day.parse(date)
+    except ValueError as error:
+        return Response(str(error), status=400)
+    return _assistant_answer(lambda assistant: assistant.weekly_review(date))
+
+
+@router.route("/ai/<date>/<ref>/breakdown", methods=["GET"])
+@is_logged_in
+def ai_breakdown(date: str, ref: str):
+    todo = Todo(date=date)
+    try:
+        entry = todo.get(todo.index_of(ref))
+    except IndexError as error:
+        return Response(str(error), status=404)
+    return _assistant_answer(lambda assistant: assistant.breakdown(entry))
+
+
+@router.app_errorhandler(ConflictError)
+def conflict(error: ConflictError):
+    # the day kept changing under this request; have htmx reload the page
+    resp = Response(str(error), status=409)
+    resp.headers["HX-Refresh"] = "true"
+    return resp
+
+
+@router.route("/_stats/cache", methods=["GET"])
+@is_operator
+def cache_stats():
+    return jsonify({**day_cache.stats(), "fragments": fragment_cache.stats()})
+
+
+@router.route("/metrics", methods=["GET"])
+@is_operator
+def metrics_endpoint():
+    if not config.METRICS:
+        return Response("Metrics are disabled", status=404)
+    cache = day_cache.stats()
+    extra = [
+        *metrics.single(
+            "todo_day_cache_hits_total", "Day cache hits.", "counter", cache["hits"]
+        ),
+        *metrics.single(
+            "todo_day_cache_misses_total",
+            "Day cache misses.",
+            "counter",
+            cache["misses"],
+        ),
+        *metrics.single(
+            "todo_day_cache_entries",
+            "Entries held by the day cache.",
+            "gauge",
+            cache["entries"],
+        ),
+    ]
+    return Response(
+        metrics.render(extra), mimetype="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@router.route("/metrics/profile", methods=["POST"])
+@is_operator
+def profile_toggle():
+    if request.form.get("enabled", request.args.get("enabled")) in ("1", "true", "on"):
+        active = profiler.enable()
+        return jsonify({"enabled": True, "directory": active.directory, "files": []})
+    return jsonify({"enabled": False, "files": profiler.disable()})
@@ -0,0 +1,282 @@
+import bisect
+import heapq
+import os
+import re
+import threading
+from typing import Iterable, Optional
+
+from config import config
+
+from . import codec
+from .clock import key_to_iso
+from .entry_log import LogEvent
+from .events import Mutation, subscribe
+from .history import history_for, uid_of
+from .locking import atomic_write, file_lock
+from .storage import Storage, on_release
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def document(date: str, entry: dict) -> dict:
+    """What the index keeps of a serialized entry: enough to list it."""
+    doc = {
+        "date": date,
+        "day": key_to_iso(date),
+        "title": entry["title"],
+        "status": entry["status"],
+        "updated": entry["date_updated"],
+    }
+    if config.SEARCH_LOGS:
+        doc["log"] = " ".join(str(LogEvent.decode(raw)) for raw in entry.get("log", []))
+    return doc
+
+
+class SearchIndex:
+    """
+    Inverted index over task titles (and log text with SEARCH_LOGS),
+    persisted in a `<data>.search` file next to the data.
+
+    Documents are keyed by the entry's creation timestamp, which survives
+    reorders and postpones. The file is an append-only list of `put` and
+    `drop` lines, replayed once per process and tailed afterwards, like
+    the status counters; postings and the sorted term list used for
+    prefix lookups only live in memory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = file_lock(path)
+        self._docs: Optional[dict[str, dict]] = None
+        self._postings: dict[str, set[str]] = {}
+        self._terms: list[str] = []
+        self._terms_dirty = False
+        self._identity: Optional[tuple[int, int]] = None
+        self._offset = 0
+        self._lines = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    # in-memory state
+
+    def _index(self, key: str, doc: dict) -> None:
+        for term in set(tokenize(doc["title"]) + tokenize(doc.get("log", ""))):
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = set()
+                self._terms_dirty = True
+            postings.add(key)
+
+    def _unindex(self, key: str, doc: dict) -> None:
+        for term in set(tokenize(doc["title"]) + tokenize(doc.get("log", ""))):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._postings[term]
+                    self._terms_dirty = True
+
+    def _apply(self, line: dict) -> None:
+        key = line["key"]
+        previous = self._docs.pop(key, None)
+        if previous is not None:
+            self._unindex(key, previous)
+        if "put" in line:
+            self._docs[key] = line["put"]
+            self._index(key, line["put"])
+
+    def _refresh(self) -> dict[str, dict]:
+        try:
+            stat = os.stat(self.path)
+            identity = (stat.st_dev, stat.st_ino)
+        except FileNotFoundError:
+            identity = None
+
+        if self._docs is None or identity != self._identity:
+            self._docs, self._postings, self._terms = {}, {}, []
+            self._terms_dirty = True
+            self._offset, self._lines = 0, 0
+            self._identity = identity
+        if identity is None:
+            return self._docs
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self._apply(codec.loads_json(line))
+                self._offset += len(line)
+                self._lines += 1
+        return self._docs
+
+    # writes
+
+    def _append(self, lines: list[dict]) -> None:
+        if not lines:
+            return
+        with self._lock:
+            self._refresh()
+            raw = b"".join(codec.dumps_line(line) for line in lines)
+            with open(self.path, "ab") as f:
+                f.write(raw)
+            if self._identity is None:
+                stat = os.stat(self.path)
+                self._identity = (stat.st_dev, stat.st_ino)
+            self._offset += len(raw)
+            self._lines += len(lines)
+            for line in lines:
+                self._apply(line)
+
+            if self._lines > 2 * len(self._docs) + 1000:
+                self.replace_all(self._docs)
+
+    def put(self, key: str, doc: dict) -> None:
+        self._append([{"key": key, "put": doc}])
+
+    def drop(self, key: str) -> None:
+        self._append([{"key": key}])
+
+    def replace_day(self, date: str, entries: Iterable[dict]) -> None:
+        """Make the documents of `date` match `entries` exactly."""
+        with self._lock:
+            stale = {key for key, doc in self._refresh().items() if doc["date"] == date}
+            lines = []
+            for entry in entries:
+                stale.discard(entry["date_created"])
+                lines.append(
+                    {"key": entry["date_created"], "put": document(date, entry)}
+                )
+            lines += [{"key": key} for key in stale]
+            self._append(lines)
+
+    def replace_all(self, docs: dict[str, dict]) -> None:
+        """Atomically rewrite the file with one line per document."""
+        raw = b"".join(
+            codec.dumps_line({"key": key, "put": doc}) for key, doc in docs.items()
+        )
+        with self._lock:
+            atomic_write(self.path, raw)
+            self._docs = None
+            self._refresh()
+
+    # queries
+
+    def _matching(self, prefix: str) -> set[str]:
+        if self._terms_dirty:
+            self._terms = sorted(self._postings)
+            self._terms_dirty = False
+        keys: set[str] = set()
+        start = bisect.bisect_left(self._terms, prefix)
+        for term in self._terms[start:]:
+            if not term.startswith(prefix):
+                break
+            keys |= self._postings[term]
+        return keys
+
+    def search(self, query: str, limit: int = 20) -> list[dict]:
+        """
+        Documents matching every word of `query` as a prefix, most recent
+        day first, then most recently updated.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        with self._lock:
+            docs = self._refresh()
+            keys: Optional[set[str]] = None
+            # rarest-looking (longest) words first keeps the intersection small
+            for word in sorted(words, key=len, reverse=True):
+                matched = self._matching(word)
+                keys = matched if keys is None else keys & matched
+                if not keys:
+                    return []
+            ranked = heapq.nlargest(
+                limit, keys, key=lambda key: (docs[key]["day"], docs[key]["updated"])
+            )
+            return [{"key": key, **docs[key]} for key in ranked]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._refresh())
+
+
+def _with_logs(storage: Storage, entries: list[dict]) -> list[dict]:
+    """`entries` with their full log from the history store, when indexed."""
+    if not config.SEARCH_LOGS:
+        return entries
+    history = history_for(storage)
+    return [{**entry, "log": history.log_of(entry)} for entry in entries]
+
+
+def scan(storage: Storage) -> dict[str, dict]:
+    """Documents for every entry of `storage`, built by a full scan."""
+    docs = {}
+    logs = history_for(storage).all() if config.SEARCH_LOGS else {}
+    for date, entries in storage.load_days(storage.dates()).items():
+        for entry in entries:
+            if config.SEARCH_LOGS:
+                log = logs.get(uid_of(entry)) or entry.get("log", [])
+                entry = {**entry, "log": log}
+            docs[entry["date_created"]] = document(date, entry)
+    return docs
+
+
+def rebuild(storage: Storage) -> int:
+    docs = scan(storage)
+    index_for(storage).replace_all(docs)
+    return len(docs)
+
+
+_indexes: dict[str, SearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def index_for(storage: Storage) -> SearchIndex:
+    """
+    The process-wide search index of `storage`, built by a full scan the
+    first time it is needed for existing data.
+    """
+    with _indexes_lock:
+        index = _indexes.get(storage.path)
+    if index is not None:
+        return index
+    # the scan needs the storage lock, which mutations publish under, so it
+    # is taken before the registry lock rather than inside it
+    with storage.lock(), _indexes_lock:
+        index = _indexes.get(storage.path)
+        if index is None:
+            index = SearchIndex(f"{storage.path}.search")
+            if not index.exists():
+                index.replace_all(scan(storage))
+            _indexes[storage.path] = index
+        return index
+
+
+@on_release
+def _forget_index(path: str) -> None:
+    with _indexes_lock:
+        _indexes.pop(path, None)
+
+
+@subscribe
+def _index_mutation(mutation: Mutation) -> None:
+    index = index_for(mutation.storage)
+    match mutation.kind:
+        case "add" | "update" | "postpone":
+            entry = mutation.entry.serialize()
+            if config.SEARCH_LOGS:
+                entry["log"] = mutation.entry._raw_log()
+            date = mutation.to_date or mutation.date
+            index.put(entry["date_created"], document(date, entry))
+        case "reorder":
+            pass
+        case _:
+            # whole-day rewrites: batches and restores
+            entries = mutation.storage.load_day(mutation.date)
+            index.replace_day(mutation.date, _with_logs(mutation.storage, entries))
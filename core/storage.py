@@ -0,0 +1,1068 @@
+import hashlib
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Callable, Iterable, Iterator, Optional
+
+from config import config
+
+from . import codec
+from .clock import Day, iso_to_key, key_to_iso
+from .locking import FileLock, atomic_write, file_lock
+
+
+class Storage:
+    """
+    Base class for the places a journal can be kept.
+
+    A storage only deals with serialized entries (plain dicts), grouped by
+    their `%d-%m-%Y` day key. The mutation helpers are written in terms of
+    `load_day`/`save_day` so a backend only has to override them when it
+    can do better than a full read-modify-write of the day.
+    """
+
+    # whether `status_counts` is answered from an index instead of a scan
+    indexed_counts = False
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def dates(self) -> list[str]:
+        """Every day key that has entries."""
+        raise NotImplementedError
+
+    def load_day(self, date: str) -> list[dict]:
+        raise NotImplementedError
+
+    def load_days(self, dates: Iterable[str]) -> dict[str, list[dict]]:
+        return {date: self.load_day(date) for date in dates}
+
+    def iter_days(
+        self, dates: list[str], chunk: int = 31
+    ) -> Iterator[tuple[str, list[dict]]]:
+        """
+        `(day, entries)` for each of `dates` in order, read `chunk` days per
+        `load_days` call so a long range is never held in memory at once.
+        """
+        for offset in range(0, len(dates), chunk):
+            keys = dates[offset : offset + chunk]
+            days = self.load_days(keys)
+            for key in keys:
+                yield key, days[key]
+
+    def save_day(self, date: str, entries: list[dict]) -> None:
+        raise NotImplementedError
+
+    def save_days(
+        self, days: dict[str, list[dict]], expected: Optional[dict[str, str]] = None
+    ) -> dict[str, str]:
+        """
+        Replace several days at once. `expected` maps days to the version
+        the caller read them at; nothing is written if any of them has
+        moved on. Returns the new version of every saved day.
+        """
+        with self.lock():
+            if expected:
+                _check_versions(self.load_days(expected), expected)
+            for date, entries in days.items():
+                self.save_day(date, entries)
+            return {date: day_version(entries) for date, entries in days.items()}
+
+    def lock(self) -> FileLock:
+        """Exclusive lock held around every read-modify-write of the storage."""
+        return file_lock(self.path)
+
+    def _checked(self, date: str, expected: Optional[str]) -> list[dict]:
+        """Load `date` for a mutation, refusing if it is not at `expected`."""
+        entries = self.load_day(date)
+        if expected is not None and day_version(entries) != expected:
+            raise ConflictError(f"{date} changed since it was read")
+        return entries
+
+    def append(self, date: str, entry: dict, expected: Optional[str] = None) -> str:
+        """
+        Add an entry to the end of a day.
+
+        Like the other mutations it takes the version the caller last saw
+        (`expected`, None to skip the check) and returns the new one.
+        """
+        with self.lock():
+            entries = self._checked(date, expected)
+            entries.append(entry)
+            self.save_day(date, entries)
+            return day_version(entries)
+
+    def replace(
+        self, date: str, index: int, entry: dict, expected: Optional[str] = None
+    ) -> str:
+        """Overwrite the entry at `index` of a day."""
+        with self.lock():
+            entries = self._checked(date, expected)
+            entries[index] = entry
+            self.save_day(date, entries)
+            return day_version(entries)
+
+    def reorder(
+        self, date: str, from_index: int, to_index: int, expected: Optional[str] = None
+    ) -> str:
+        with self.lock():
+            entries = self._checked(date, expected)
+            entries.insert(to_index, entries.pop(from_index))
+            self.save_day(date, entries)
+            return day_version(entries)
+
+    def move(
+        self,
+        date: str,
+        index: int,
+        to_date: str,
+        entry: dict,
+        expected: Optional[str] = None,
+    ) -> str:
+        """
+        Remove the entry at `index` of `date` and append `entry` to `to_date`.
+        Returns the new version of `date`.
+        """
+        with self.lock():
+            days = self.load_days([date, to_date])
+            if expected is not None and day_version(days[date]) != expected:
+                raise ConflictError(f"{date} changed since it was read")
+            days[date].pop(index)
+            days[to_date].append(entry)
+            self.save_days(days)
+            return day_version(days[date])
+
+    def status_counts(self, dates: Iterable[str]) -> dict[str, dict[str, int]]:
+        """Number of entries per status for each of `dates`."""
+        counts: dict[str, dict[str, int]] = {}
+        for key, entries in self.load_days(dates).items():
+            counts[key] = {}
+            for entry in entries:
+                status = entry["status"]
+                counts[key][status] = counts[key].get(status, 0) + 1
+        return counts
+
+    def status_counts_between(
+        self, start: date, end: date
+    ) -> dict[str, dict[str, int]]:
+        """`status_counts` of every day from `start` to `end` inclusive."""
+        first, last = Day.of(start), Day.of(end)
+        return self.status_counts(
+            (first + offset).key for offset in range(last - first + 1)
+        )
+
+    def signature(self, date: str) -> Optional[tuple]:
+        """
+        Cheap fingerprint of the files backing `date`; it changes whenever
+        they are rewritten, from this process or any other.
+        """
+        return _stat_signature(self.path)
+
+    def paths_for(self, date: str) -> list[str]:
+        """Files that together hold `date`."""
+        return [self.path]
+
+    def load_day_at(
+        self, date: str, read: Callable[[str], Optional[bytes]]
+    ) -> list[dict]:
+        """
+        Decode `date` from another copy of the files, e.g. an older git
+        revision. `read` maps a path from `paths_for` to its contents, or
+        None when the file did not exist.
+        """
+        raw = read(self.path)
+        return codec.loads(raw).get(date, []) if raw else []
+
+    def close(self) -> None:
+        """Release any resources (threads, handles) held by the storage."""
+
+    def __repr__(self):
+        return f"{type(self).__name__}<path={self.path}>"
+
+
+class ConflictError(RuntimeError):
+    """A day changed between being read and being written."""
+
+
+def day_version(entries: list[dict]) -> str:
+    """
+    Content version of a day's serialized entries, used for optimistic
+    concurrency: a writer passes the version it read and the storage
+    refuses the write if the day has moved on since.
+    """
+    return hashlib.blake2b(codec.canonical(entries), digest_size=8).hexdigest()
+
+
+def _check_versions(
+    current: dict[str, list[dict]], expected: Optional[dict[str, str]]
+) -> None:
+    for key, version in (expected or {}).items():
+        if day_version(current.get(key, [])) != version:
+            raise ConflictError(f"{key} changed since it was read")
+
+
+def _stat_signature(*paths: str) -> Optional[tuple]:
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+            continue
+        signature.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+class JsonStorage(Storage):
+    """The original layout: every day in one `{date: [entry, ...]}` JSON file."""
+
+    def _read(self) -> dict[str, list[dict]]:
+        return codec.read(self.path)
+
+    def _write(self, data: dict[str, list[dict]]) -> None:
+        atomic_write(self.path, codec.dumps(data))
+
+    def dates(self) -> list[str]:
+        return [date for date, entries in self._read().items() if entries]
+
+    def load_day(self, date: str) -> list[dict]:
+        return self._read().get(date, [])
+
+    def load_days(self, dates: Iterable[str]) -> dict[str, list[dict]]:
+        data = self._read()
+        return {date: data.get(date, []) for date in dates}
+
+    def iter_days(
+        self, dates: list[str], chunk: int = 31
+    ) -> Iterator[tuple[str, list[dict]]]:
+        # the whole file is parsed by any read, so it is read only once
+        data = self._read()
+        for key in dates:
+            yield key, data.get(key, [])
+
+    def save_day(self, date: str, entries: list[dict]) -> None:
+        self.save_days({date: entries})
+
+    def save_days(
+        self, days: dict[str, list[dict]], expected: Optional[dict[str, str]] = None
+    ) -> dict[str, str]:
+        with self.lock():
+            data = self._read()
+            _check_versions(data, expected)
+            data.update(days)
+            self._write(data)
+            return {date: day_version(entries) for date, entries in days.items()}
+
+
+class ShardedStorage(Storage):
+    """
+    One JSON file per day or per month inside the directory at `path`.
+
+    Shards are named after the ISO form of their key (`2025-01-31.json` or
+    `2025-01.json`) and hold the same `{date: [entry, ...]}` mapping as the
+    single-file layout, so loading a day or a week only touches the shards
+    that cover it.
+    """
+
+    LAYOUTS = ("day", "month")
+
+    def __init__(self, path: str, layout: str = "month"):
+        super().__init__(path)
+        if layout not in self.LAYOUTS:
+            raise ValueError(f"Unknown shard layout {layout!r}")
+        self.layout = layout
+
+    def exists(self) -> bool:
+        return os.path.isdir(self.path)
+
+    def shard_path(self, date: str) -> str:
+        """The shard file holding `date`."""
+        # parsing also keeps arbitrary route input from escaping the directory
+        iso = Day.parse(date).isoformat()
+        name = iso if self.layout == "day" else iso[:7]
+        return os.path.join(self.path, f"{name}.json")
+
+    def _read(self, shard: str) -> dict[str, list[dict]]:
+        try:
+            return codec.read(shard)
+        except FileNotFoundError:
+            return {}
+
+    def _write(self, shard: str, data: dict[str, list[dict]]) -> None:
+        atomic_write(shard, codec.dumps(data))
+
+    def _shards(self) -> list[str]:
+        return sorted(
+            os.path.join(self.path, name)
+            for name in os.listdir(self.path)
+            if name.endswith(".json")
+        )
+
+    def signature(self, date: str) -> Optional[tuple]:
+        return _stat_signature(self.shard_path(date))
+
+    def paths_for(self, date: str) -> list[str]:
+        return [self.shard_path(date)]
+
+    def load_day_at(
+        self, date: str, read: Callable[[str], Optional[bytes]]
+    ) -> list[dict]:
+        raw = read(self.shard_path(date))
+        return codec.loads(raw).get(date, []) if raw else []
+
+    def dates(self) -> list[str]:
+        dates = []
+        for shard in self._shards():
+            dates.extend(date for date, entries in self._read(shard).items() if entries)
+        return dates
+
+    def load_day(self, date: str) -> list[dict]:
+        return self._read(self.shard_path(date)).get(date, [])
+
+    def load_days(self, dates: Iterable[str]) -> dict[str, list[dict]]:
+        result: dict[str, list[dict]] = {}
+        for shard, keys in self._group(dates).items():
+            data = self._read(shard)
+            for key in keys:
+                result[key] = data.get(key, [])
+        return result
+
+    def save_day(self, date: str, entries: list[dict]) -> None:
+        self.save_days({date: entries})
+
+    def save_days(
+        self, days: dict[str, list[dict]], expected: Optional[dict[str, str]] = None
+    ) -> dict[str, str]:
+        with self.lock():
+            shards = self._group([*days, *(expected or {})])
+            data = {shard: self._read(shard) for shard in shards}
+            for shard, keys in shards.items():
+                _check_versions(
+                    data[shard],
+                    {date: expected[date] for date in keys if date in (expected or {})},
+                )
+            # one atomic write per shard; a batch spanning shards is only
+            # guarded by the lock, not by a single rename
+            for shard, keys in shards.items():
+                changed = [date for date in keys if date in days]
+                if changed:
+                    data[shard].update((date, days[date]) for date in changed)
+                    self._write(shard, data[shard])
+            return {date: day_version(entries) for date, entries in days.items()}
+
+    def _group(self, dates: Iterable[str]) -> dict[str, list[str]]:
+        shards: dict[str, list[str]] = {}
+        for key in dates:
+            shards.setdefault(self.shard_path(key), []).append(key)
+        return shards
+
+
+class JournalStorage(Storage):
+    """
+    Append-only journal on top of the JSON snapshot.
+
+    Every mutation is one fsync'd event line in `<path>.journal`; the
+    snapshot at `path` keeps the original `{date: [entry, ...]}` format so
+    the two backends can be switched freely. Days are rebuilt by replaying
+    the events over the snapshot, and once `compact_every` events have
+    piled up a background thread folds them back into the snapshot.
+    """
+
+    def __init__(self, path: str, compact_every: int = 500):
+        super().__init__(path)
+        self.log_path = f"{path}.journal"
+        self.compacting_path = f"{path}.journal.compacting"
+        self.compact_every = compact_every
+
+        # guards the in-memory state as well as the files, across processes
+        self._lock = file_lock(path)
+        self._state: Optional[dict[str, list[dict]]] = None
+        self._log_stat: Optional[tuple[int, int]] = None
+        self._offset = 0
+        self._events = 0
+        self._compactor: Optional[threading.Thread] = None
+
+    # replay
+
+    @staticmethod
+    def _apply(state: dict[str, list[dict]], event: dict) -> None:
+        if event["op"] == "days":
+            state.update(event["days"])
+            return
+        date = event["date"]
+        entries = state.setdefault(date, [])
+        match event["op"]:
+            case "add":
+                entries.append(event["entry"])
+            case "replace":
+                entries[event["index"]] = event["entry"]
+            case "reorder":
+                entries.insert(event["to"], entries.pop(event["from"]))
+            case "move":
+                entries.pop(event["index"])
+                state.setdefault(event["to_date"], []).append(event["entry"])
+            case "day":
+                state[date] = event["entries"]
+            case _:
+                raise ValueError(f"Unknown journal event {event['op']!r}")
+
+    def _replay(
+        self, path: str, state: dict[str, list[dict]], offset: int = 0
+    ) -> tuple[int, int]:
+        """
+        Apply every complete event line of `path` from `offset`.
+        Returns the new offset and the number of events applied.
+        """
+        if not os.path.exists(path):
+            return offset, 0
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return self._replay_lines(f, state, offset)
+
+    @classmethod
+    def _replay_lines(
+        cls, lines: Iterable[bytes], state: dict[str, list[dict]], offset: int = 0
+    ) -> tuple[int, int]:
+        count = 0
+        for line in lines:
+            # a torn final line belongs to a write that never finished
+            if not line.endswith(b"\n"):
+                break
+            cls._apply(state, codec.loads_json(line))
+            offset += len(line)
+            count += 1
+        return offset, count
+
+    def _log_identity(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_dev, stat.st_ino
+
+    def _refresh(self) -> dict[str, list[dict]]:
+        """Bring the in-memory state up to date with the files on disk."""
+        identity = self._log_identity()
+        if self._state is None or identity != self._log_stat:
+            # first load, or the log was rotated by a compaction
+            state: dict[str, list[dict]] = codec.read(self.path)
+            self._replay(self.compacting_path, state)
+            self._state = state
+            self._offset = 0
+            self._events = 0
+            self._log_stat = identity
+
+        self._offset, count = self._replay(self.log_path, self._state, self._offset)
+        self._events += count
+        return self._state
+
+    # writes
+
+    def _record(self, event: dict, expected: Optional[str] = None) -> str:
+        """Append `event` if its day is still at `expected`; returns the new version."""
+        date = event["date"]
+        checks = {} if expected is None else {date: expected}
+        return self._commit(event, checks, [date])[date]
+
+    def _commit(
+        self, event: dict, expected: dict[str, str], dates: Iterable[str]
+    ) -> dict[str, str]:
+        """
+        Append `event` if every day in `expected` is still at its version.
+        Returns the new versions of `dates`.
+        """
+        line = codec.dumps_line(event)
+        with self._lock:
+            state = self._refresh()
+            _check_versions(state, expected)
+
+            with open(self.log_path, "ab") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            if self._log_stat is None:
+                self._log_stat = self._log_identity()
+            self._offset += len(line)
+            self._events += 1
+            self._apply(state, event)
+
+            if self._events >= self.compact_every:
+                self.compact(wait=False)
+            return {date: day_version(state.get(date, [])) for date in dates}
+
+    def append(self, date: str, entry: dict, expected: Optional[str] = None) -> str:
+        return self._record({"op": "add", "date": date, "entry": entry}, expected)
+
+    def replace(
+        self, date: str, index: int, entry: dict, expected: Optional[str] = None
+    ) -> str:
+        return self._record(
+            {"op": "replace", "date": date, "index": index, "entry": entry}, expected
+        )
+
+    def reorder(
+        self, date: str, from_index: int, to_index: int, expected: Optional[str] = None
+    ) -> str:
+        return self._record(
+            {"op": "reorder", "date": date, "from": from_index, "to": to_index},
+            expected,
+        )
+
+    def move(
+        self,
+        date: str,
+        index: int,
+        to_date: str,
+        entry: dict,
+        expected: Optional[str] = None,
+    ) -> str:
+        return self._record(
+            {
+                "op": "move",
+                "date": date,
+                "index": index,
+                "to_date": to_date,
+                "entry": entry,
+            },
+            expected,
+        )
+
+    def save_day(self, date: str, entries: list[dict]) -> None:
+        self._record({"op": "day", "date": date, "entries": entries})
+
+    def save_days(
+        self, days: dict[str, list[dict]], expected: Optional[dict[str, str]] = None
+    ) -> dict[str, str]:
+        # one event, so a batch is as durable as a single mutation
+        return self._commit({"op": "days", "days": days}, expected or {}, days)
+
+    # reads
+
+    def dates(self) -> list[str]:
+        with self._lock:
+            return [date for date, entries in self._refresh().items() if entries]
+
+    def load_day(self, date: str) -> list[dict]:
+        with self._lock:
+            return list(self._refresh().get(date, []))
+
+    def load_days(self, dates: Iterable[str]) -> dict[str, list[dict]]:
+        with self._lock:
+            state = self._refresh()
+            return {date: list(state.get(date, [])) for date in dates}
+
+    def signature(self, date: str) -> Optional[tuple]:
+        return _stat_signature(self.path, self.compacting_path, self.log_path)
+
+    def paths_for(self, date: str) -> list[str]:
+        return [self.path, self.compacting_path, self.log_path]
+
+    def load_day_at(
+        self, date: str, read: Callable[[str], Optional[bytes]]
+    ) -> list[dict]:
+        raw = read(self.path)
+        state: dict[str, list[dict]] = codec.loads(raw) if raw else {}
+        for path in (self.compacting_path, self.log_path):
+            raw = read(path)
+            if raw:
+                self._replay_lines(raw.splitlines(keepends=True), state)
+        return state.get(date, [])
+
+    # compaction
+
+    def compact(self, wait: bool = True) -> None:
+        """
+        Fold the journal into the snapshot.
+
+        The live log is renamed out of the way under the lock, so writers
+        only ever wait for a rename; the snapshot itself is rewritten on a
+        background thread.
+        """
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                if wait:
+                    self._compactor.join()
+                return
+            # a leftover `.compacting` file from an interrupted run is folded first
+            if not os.path.exists(self.compacting_path) and os.path.exists(
+                self.log_path
+            ):
+                self._refresh()
+                os.replace(self.log_path, self.compacting_path)
+                self._log_stat = None
+                self._offset = 0
+                self._events = 0
+
+            self._compactor = threading.Thread(
+                target=self._fold, name="journal-compactor", daemon=True
+            )
+            self._compactor.start()
+
+        if wait:
+            self._compactor.join()
+
+    def _fold(self) -> None:
+        # the slow part runs unlocked; if another process folded in the
+        # meantime the snapshot signature moved and this result is dropped
+        before = _stat_signature(self.path, self.compacting_path)
+        if before[1] is None:
+            return
+        state: dict[str, list[dict]] = codec.read(self.path)
+        self._replay(self.compacting_path, state)
+
+        with self._lock:
+            if _stat_signature(self.path, self.compacting_path) != before:
+                return
+            atomic_write(self.path, codec.dumps(state))
+            os.remove(self.compacting_path)
+
+    def close(self) -> None:
+        if self._compactor is not None:
+            self._compactor.join()
+
+
+class SqliteStorage(Storage):
+    """
+    Entries in a SQLite database, one row per entry and one per log line.
+
+    Rows are keyed by the ISO day so they can be range-scanned, with an
+    index on (day, position) for loading a day in order and one on
+    (day, status) so the dashboard aggregates are single grouped queries.
+    Every mutation is one transaction.
+
+    Positions are fractional ranks rather than list indices: a reorder
+    gives the moved row a position between its new neighbours, and a
+    removal leaves a gap, so neither has to renumber the rest of the day.
+    Only when repeated moves into the same gap run out of float precision
+    is the day renumbered.
+    """
+
+    indexed_counts = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            id INTEGER PRIMARY KEY,
+            day TEXT NOT NULL,
+            position REAL NOT NULL,
+            entry_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            status TEXT NOT NULL,
+            date_created TEXT NOT NULL,
+            date_updated TEXT NOT NULL,
+            extra TEXT
+        );
+        CREATE INDEX IF NOT EXISTS entries_day_position ON entries (day, position);
+        CREATE INDEX IF NOT EXISTS entries_day_status ON entries (day, status);
+        CREATE TABLE IF NOT EXISTS entry_log (
+            entry INTEGER NOT NULL REFERENCES entries (id) ON DELETE CASCADE,
+            seq INTEGER NOT NULL,
+            line TEXT NOT NULL,
+            PRIMARY KEY (entry, seq)
+        );
+    """
+
+    COLUMNS = ("id", "title", "status", "date_created", "date_updated")
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._local = threading.local()
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA foreign_keys = ON")
+            db.execute("PRAGMA synchronous = FULL")
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def _day(date: str) -> str:
+        return key_to_iso(date)
+
+    @staticmethod
+    def _date(day: str) -> str:
+        return iso_to_key(day)
+
+    # rows <-> entries
+
+    def _insert(self, db: sqlite3.Connection, day: str, position: float, entry: dict):
+        extra = {k: v for k, v in entry.items() if k not in self.COLUMNS + ("log",)}
+        cursor = db.execute(
+            "INSERT INTO entries (day, position, entry_id, title, status,"
+            " date_created, date_updated, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                day,
+                position,
+                codec.dumps_compact(entry["id"]).decode(),
+                entry["title"],
+                entry["status"],
+                entry["date_created"],
+                entry["date_updated"],
+                codec.dumps_compact(extra).decode() if extra else None,
+            ),
+        )
+        self._insert_log(db, cursor.lastrowid, entry.get("log", []))
+
+    @staticmethod
+    def _insert_log(db: sqlite3.Connection, rowid: int, log: list) -> None:
+        db.executemany(
+            "INSERT INTO entry_log (entry, seq, line) VALUES (?, ?, ?)",
+            [
+                (rowid, seq, codec.dumps_compact(line).decode())
+                for seq, line in enumerate(log)
+            ],
+        )
+
+    def _rows(self, db: sqlite3.Connection, days: list[str]) -> dict[str, list[dict]]:
+        placeholders = ",".join("?" * len(days))
+        rows = db.execute(
+            "SELECT id, day, entry_id, title, status, date_created, date_updated,"
+            f" extra FROM entries WHERE day IN ({placeholders}) ORDER BY day, position",
+            days,
+        ).fetchall()
+        logs: dict[int, list] = {}
+        for rowid, line in db.execute(
+            "SELECT entry, line FROM entry_log WHERE entry IN"
+            f" (SELECT id FROM entries WHERE day IN ({placeholders}))"
+            " ORDER BY entry, seq",
+            days,
+        ):
+            logs.setdefault(rowid, []).append(codec.loads_json(line))
+
+        result: dict[str, list[dict]] = {day: [] for day in days}
+        for rowid, day, entry_id, title, status, created, updated, extra in rows:
+            entry = {
+                "id": codec.loads_json(entry_id),
+                "title": title,
+                "status": status,
+                "date_created": created,
+                "date_updated": updated,
+                "log": logs.get(rowid, []),
+            }
+            if extra:
+                entry.update(codec.loads_json(extra))
+            result[day].append(entry)
+        return result
+
+    def _row_at(
+        self, db: sqlite3.Connection, day: str, index: int
+    ) -> tuple[int, float]:
+        """`(rowid, position)` of the entry at `index` of the day."""
+        row = None
+        if index >= 0:
+            row = db.execute(
+                "SELECT id, position FROM entries WHERE day = ?"
+                " ORDER BY position LIMIT 1 OFFSET ?",
+                (day, index),
+            ).fetchone()
+        if row is None:
+            raise IndexError("Task index out of range")
+        return row
+
+    def _rowid(self, db: sqlite3.Connection, day: str, index: int) -> int:
+        return self._row_at(db, day, index)[0]
+
+    @staticmethod
+    def _next_position(db: sqlite3.Connection, day: str) -> float:
+        (position,) = db.execute(
+            "SELECT MAX(position) FROM entries WHERE day = ?", (day,)
+        ).fetchone()
+        return 0 if position is None else math.floor(position) + 1
+
+    @staticmethod
+    def _renumber(db: sqlite3.Connection, day: str) -> None:
+        rows = db.execute(
+            "SELECT id FROM entries WHERE day = ? ORDER BY position", (day,)
+        ).fetchall()
+        db.executemany(
+            "UPDATE entries SET position = ? WHERE id = ?",
+            [(position, rowid) for position, (rowid,) in enumerate(rows)],
+        )
+
+    def _position_between(
+        self, db: sqlite3.Connection, day: str, low: int, high: int
+    ) -> float:
+        """A position strictly between the entries at indices `low` and `high`."""
+        for _ in range(2):
+            before = self._row_at(db, day, low)[1] if low >= 0 else None
+            try:
+                after = self._row_at(db, day, high)[1]
+            except IndexError:
+                after = None
+            if before is None:
+                return after - 1
+            if after is None:
+                return before + 1
+            position = (before + after) / 2
+            if before < position < after:
+                return position
+            self._renumber(db, day)
+        raise AssertionError("renumbered positions are one apart")
+
+    # reads
+
+    def dates(self) -> list[str]:
+        db = self._connect()
+        days = db.execute("SELECT DISTINCT day FROM entries ORDER BY day")
+        return [self._date(day) for (day,) in days]
+
+    def load_day(self, date: str) -> list[dict]:
+        return self.load_days([date])[date]
+
+    def load_days(self, dates: Iterable[str]) -> dict[str, list[dict]]:
+        days = {self._day(date): date for date in dates}
+        if not days:
+            return {}
+        rows = self._rows(self._connect(), list(days))
+        return {date: rows[day] for day, date in days.items()}
+
+    def status_counts(self, dates: Iterable[str]) -> dict[str, dict[str, int]]:
+        days = {self._day(date): date for date in dates}
+        counts: dict[str, dict[str, int]] = {date: {} for date in days.values()}
+        if not days:
+            return counts
+        placeholders = ",".join("?" * len(days))
+        rows = self._connect().execute(
+            "SELECT day, status, COUNT(*) FROM entries"
+            f" WHERE day IN ({placeholders}) GROUP BY day, status",
+            list(days),
+        )
+        for day, status, count in rows:
+            counts[days[day]][status] = count
+        return counts
+
+    def status_counts_between(
+        self, start: date, end: date
+    ) -> dict[str, dict[str, int]]:
+        counts: dict[str, dict[str, int]] = {}
+        rows = self._connect().execute(
+            "SELECT day, status, COUNT(*) FROM entries"
+            " WHERE day BETWEEN ? AND ? GROUP BY day, status ORDER BY day",
+            (start.isoformat(), end.isoformat()),
+        )
+        for day, status, count in rows:
+            counts.setdefault(self._date(day), {})[status] = count
+        return counts
+
+    # writes
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction holding SQLite's reserved lock from the start."""
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.rollback()
+            raise
+        db.commit()
+
+    def _check(self, db: sqlite3.Connection, day: str, expected: Optional[str]):
+        if expected is not None and self._version(db, day) != expected:
+            raise ConflictError(f"{self._date(day)} changed since it was read")
+
+    def _version(self, db: sqlite3.Connection, day: str) -> str:
+        return day_version(self._rows(db, [day])[day])
+
+    def save_day(self, date: str, entries: list[dict]) -> None:
+        self.save_days({date: entries})
+
+    def save_days(
+        self, days: dict[str, list[dict]], expected: Optional[dict[str, str]] = None
+    ) -> dict[str, str]:
+        with self._transaction() as db:
+            for date, version in (expected or {}).items():
+                self._check(db, self._day(date), version)
+            for date, entries in days.items():
+                day = self._day(date)
+                db.execute("DELETE FROM entries WHERE day = ?", (day,))
+                for position, entry in enumerate(entries):
+                    self._insert(db, day, position, entry)
+            return {date: self._version(db, self._day(date)) for date in days}
+
+    def append(self, date: str, entry: dict, expected: Optional[str] = None) -> str:
+        day = self._day(date)
+        with self._transaction() as db:
+            self._check(db, day, expected)
+            self._insert(db, day, self._next_position(db, day), entry)
+            return self._version(db, day)
+
+    def replace(
+        self, date: str, index: int, entry: dict, expected: Optional[str] = None
+    ) -> str:
+        day = self._day(date)
+        with self._transaction() as db:
+            self._check(db, day, expected)
+            rowid, position = self._row_at(db, day, index)
+            db.execute("DELETE FROM entries WHERE id = ?", (rowid,))
+            self._insert(db, day, position, entry)
+            return self._version(db, day)
+
+    def reorder(
+        self, date: str, from_index: int, to_index: int, expected: Optional[str] = None
+    ) -> str:
+        day = self._day(date)
+        with self._transaction() as db:
+            self._check(db, day, expected)
+            rowid = self._rowid(db, day, from_index)
+            if from_index != to_index:
+                # only the moved row changes: it lands between the entries
+                # that will be its neighbours
+                if from_index < to_index:
+                    position = self._position_between(db, day, to_index, to_index + 1)
+                else:
+                    position = self._position_between(db, day, to_index - 1, to_index)
+                db.execute(
+                    "UPDATE entries SET position = ? WHERE id = ?", (position, rowid)
+                )
+            return self._version(db, day)
+
+    def move(
+        self,
+        date: str,
+        index: int,
+        to_date: str,
+        entry: dict,
+        expected: Optional[str] = None,
+    ) -> str:
+        day, to_day = self._day(date), self._day(to_date)
+        with self._transaction() as db:
+            self._check(db, day, expected)
+            rowid = self._rowid(db, day, index)
+            db.execute("DELETE FROM entries WHERE id = ?", (rowid,))
+            self._insert(db, to_day, self._next_position(db, to_day), entry)
+            return self._version(db, day)
+
+    # history
+
+    def load_day_at(
+        self, date: str, read: Callable[[str], Optional[bytes]]
+    ) -> list[dict]:
+        raw = read(self.path)
+        if not raw:
+            return []
+        with tempfile.TemporaryDirectory() as tmp:
+            copy = os.path.join(tmp, "journal.sqlite3")
+            with open(copy, "wb") as f:
+                f.write(raw)
+            storage = SqliteStorage(copy)
+            try:
+                return storage.load_day(date)
+            finally:
+                storage.close()
+
+    # json interchange
+
+    def import_json(self, source: str) -> int:
+        """Load a single-file JSON journal in one transaction; returns the day count."""
+        data = JsonStorage(source)._read()
+        self.save_days(data)
+        return len(data)
+
+    def export_json(self, target: str) -> int:
+        """Write every day to a single-file JSON journal; returns the day count."""
+        dates = self.dates()
+        atomic_write(target, codec.dumps(self.load_days(dates), "pretty"))
+        return len(dates)
+
+    def close(self) -> None:
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+BACKENDS: dict[str, type[Storage]] = {
+    "json": JsonStorage,
+    "journal": JournalStorage,
+    "sqlite": SqliteStorage,
+}
+
+_storages: dict[tuple[str, str, str], Storage] = {}
+_storages_lock = threading.Lock()
+# called with the path of every released storage
+_release_hooks: list[Callable[[str], None]] = []
+
+
+def shard_dir(path: str) -> str:
+    """Directory used by the sharded layout for the data file at `path`."""
+    return os.path.splitext(path)[0]
+
+
+def sqlite_path(path: str) -> str:
+    """Database used by the SQLite backend for the data file at `path`."""
+    return f"{os.path.splitext(path)[0]}.sqlite3"
+
+
+def get_storage(
+    path: str, backend: Optional[str] = None, layout: Optional[str] = None
+) -> Storage:
+    """
+    Return the process-wide storage for `path`.
+
+    Storages are shared so that in-memory state (journal replay, background
+    threads) is not duplicated per request. `layout` other than `file`
+    shards the JSON backend into `shard_dir(path)`.
+    """
+    backend = backend or config.STORAGE_BACKEND
+    layout = layout or config.STORAGE_LAYOUT
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend {backend!r}")
+    if layout != "file" and backend != "json":
+        raise ValueError(f"The {backend!r} backend only supports the file layout")
+
+    key = (backend, layout, os.path.abspath(path))
+    with _storages_lock:
+        if key not in _storages:
+            if backend == "sqlite":
+                _storages[key] = SqliteStorage(sqlite_path(key[2]))
+            elif layout == "file":
+                _storages[key] = BACKENDS[backend](key[2])
+            else:
+                _storages[key] = ShardedStorage(shard_dir(key[2]), layout)
+        return _storages[key]
+
+
+def on_release(hook: Callable[[str], None]) -> Callable[[str], None]:
+    """
+    Register `hook(path)` to drop what a module keeps for a storage once
+    it is released; usable as a decorator.
+    """
+    _release_hooks.append(hook)
+    return hook
+
+
+def release_storage(storage: Storage) -> None:
+    """
+    Forget `storage` and everything kept in memory for it. The next
+    `get_storage` of its path starts afresh from the files on disk.
+    """
+    with _storages_lock:
+        for key, value in list(_storages.items()):
+            if value is storage:
+                del _storages[key]
+    storage.close()
+    for hook in _release_hooks:
+        hook(storage.path)
+
+
+def migrate_to_shards(source: str, layout: str = "month") -> ShardedStorage:
+    """
+    One-shot conversion of a single-file journal at `source` into shards
+    next to it. The source file is left untouched.
+    """
+    data = JsonStorage(source)._read()
+    target = ShardedStorage(shard_dir(source), layout)
+    os.makedirs(target.path, exist_ok=True)
+    target.save_days({date: entries for date, entries in data.items() if entries})
+    return target
@@ -0,0 +1,253 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from flask import g, has_app_context
+
+from config import config
+
+from . import codec
+from .locking import atomic_write, file_lock, forget_locks
+from .storage import Storage, _stat_signature, get_storage, release_storage
+
+NAME = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+# hashed login key of every tenant, inside TENANTS_DIR
+REGISTRY = "tenants.json"
+
+
+def hash_key(login_key: str) -> str:
+    """What the session cookie holds for `login_key`."""
+    return hashlib.sha256(login_key.encode()).hexdigest()
+
+
+class TenantKeys:
+    """
+    The tenants of a deployment and their hashed login keys, kept in
+    `<root>/tenants.json` and reloaded whenever it changes.
+    """
+
+    def __init__(self, root: str):
+        os.makedirs(root, exist_ok=True)
+        self.path = os.path.join(root, REGISTRY)
+        self._lock = file_lock(self.path)
+        self._signature: Optional[tuple] = None
+        self._keys: dict[str, str] = {}
+        self._tenants: dict[str, str] = {}
+
+    def _refresh(self) -> dict[str, str]:
+        signature = _stat_signature(self.path)
+        if signature != self._signature:
+            try:
+                with open(self.path, "rb") as f:
+                    keys = codec.loads_json(f.read())["tenants"]
+            except FileNotFoundError:
+                keys = {}
+            self._keys = keys
+            self._tenants = {hashed: name for name, hashed in keys.items()}
+            self._signature = signature
+        return self._keys
+
+    def tenant_for(self, hashed: str) -> Optional[str]:
+        with self._lock:
+            self._refresh()
+            return self._tenants.get(hashed)
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return sorted(self._refresh())
+
+    def register(self, keys: dict[str, str]) -> None:
+        """Add tenants (or change their keys) from `name -> login key`."""
+        for name in keys:
+            if not NAME.match(name):
+                raise ValueError(f"Invalid tenant name {name!r}")
+        with self._lock:
+            merged = {
+                **self._refresh(),
+                **{name: hash_key(key) for name, key in keys.items()},
+            }
+            hashes = set(merged.values())
+            if len(hashes) != len(merged) or config.HASHED_LOGIN_KEY in hashes:
+                raise ValueError("Every tenant needs a login key of its own")
+            atomic_write(self.path, codec.dumps({"tenants": merged}, "pretty"))
+            self._signature = None
+
+
+@dataclass
+class Journal:
+    """One tenant's journal while it is open."""
+
+    name: str
+    storage: Storage
+    last_used: float
+    # requests (and streams) currently using it; never evicted while > 0
+    refs: int = 0
+
+
+class JournalPool:
+    """
+    The tenant journals open in this process, most recently used last.
+
+    A journal is opened on the first request of its tenant. Its data
+    file is created then if it does not exist, and everything derived
+    from it (counters, search index, caches) is built lazily as usual.
+    Each acquire closes journals that nobody is using and that are
+    either past `max_open` or idle for `idle_seconds`. Closing releases
+    the storage and all the state kept for it, so memory is bounded by
+    `max_open` journals however many tenants there are.
+    """
+
+    def __init__(self, root: str, max_open: int = 256, idle_seconds: float = 900.0):
+        self.root = os.path.abspath(root)
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self._open: OrderedDict[str, Journal] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.opened = 0
+        self.evictions = 0
+
+    def directory(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def data_path(self, name: str) -> str:
+        return os.path.join(self.directory(name), "todo.json")
+
+    def _open_journal(self, name: str) -> Journal:
+        path = self.data_path(name)
+        if not os.path.exists(path):
+            os.makedirs(self.directory(name), exist_ok=True)
+            with file_lock(path):
+                if not os.path.exists(path):
+                    atomic_write(path, b"{}")
+        self.opened += 1
+        return Journal(name, get_storage(path), time.monotonic())
+
+    def acquire(self, name: str) -> Journal:
+        """The open journal of tenant `name`, held until `release`."""
+        with self._lock:
+            journal = self._open.get(name)
+            if journal is None:
+                journal = self._open[name] = self._open_journal(name)
+            else:
+                self._open.move_to_end(name)
+            journal.refs += 1
+            journal.last_used = time.monotonic()
+            self._evict()
+        return journal
+
+    def release(self, journal: Journal) -> None:
+        with self._lock:
+            journal.refs -= 1
+            journal.last_used = time.monotonic()
+
+    def evict_idle(self) -> int:
+        """Close every unused journal idle for `idle_seconds`; returns how many."""
+        with self._lock:
+            return self._evict()
+
+    def _evict(self) -> int:
+        # called with the lock held, so a journal cannot be reopened while
+        # it is being closed
+        deadline = time.monotonic() - self.idle_seconds
+        evicted = 0
+        for name, journal in list(self._open.items()):
+            if len(self._open) <= self.max_open and journal.last_used > deadline:
+                break
+            if journal.refs > 0:
+                continue
+            del self._open[name]
+            release_storage(journal.storage)
+            forget_locks(self.directory(name))
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def close(self) -> None:
+        """Close every journal, in use or not."""
+        with self._lock:
+            for name, journal in self._open.items():
+                release_storage(journal.storage)
+                forget_locks(self.directory(name))
+            self._open.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open": len(self._open),
+                "in_use": sum(1 for journal in self._open.values() if journal.refs),
+                "max_open": self.max_open,
+                "opened": self.opened,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+
+_pools: dict[str, JournalPool] = {}
+_keys: dict[str, TenantKeys] = {}
+_registry_lock = threading.Lock()
+
+
+def pool_for(root: str) -> JournalPool:
+    """The process-wide pool of the journals under `root`."""
+    root = os.path.abspath(root)
+    with _registry_lock:
+        pool = _pools.get(root)
+        if pool is None:
+            pool = _pools[root] = JournalPool(
+                root, config.TENANTS_MAX_OPEN, config.TENANTS_IDLE_SECONDS
+            )
+        return pool
+
+
+def keys_for(root: str) -> TenantKeys:
+    root = os.path.abspath(root)
+    with _registry_lock:
+        keys = _keys.get(root)
+        if keys is None:
+            keys = _keys[root] = TenantKeys(root)
+        return keys
+
+
+def resolve(hashed: Optional[str]) -> Optional[str]:
+    """
+    The tenant a session cookie belongs to: "" for the journal at
+    DATA_PATH (LOGIN_KEY), a tenant name when TENANTS_DIR is set, or
+    None when the cookie is not valid.
+    """
+    if not hashed:
+        return None
+    if hashed == config.HASHED_LOGIN_KEY:
+        return ""
+    if config.TENANTS_DIR:
+        return keys_for(config.TENANTS_DIR).tenant_for(hashed)
+    return None
+
+
+def enter(tenant: str) -> Optional[Journal]:
+    """Open the journal of `tenant` for the current request."""
+    if not tenant:
+        return None
+    journal = pool_for(config.TENANTS_DIR).acquire(tenant)
+    g.journal = journal
+    return journal
+
+
+def leave(journal: Optional[Journal]) -> None:
+    if journal is not None:
+        pool_for(config.TENANTS_DIR).release(journal)
+
+
+def current_data_path() -> str:
+    """The data file of the journal the current request is for."""
+    journal = g.get("journal") if has_app_context() else None
+    if journal is None:
+        return config.DATA_PATH
+    return pool_for(config.TENANTS_DIR).data_path(journal.name)
@@ -0,0 +1,199 @@
+import csv
+import io
+import uuid
+from datetime import date, datetime
+from typing import Iterable, Iterator, Optional, Union
+
+from . import codec, entry_log
+from .clock import Day
+from .history import history_for, uid_of
+from .model import Status, Todo, _parse_day
+from .storage import Storage
+
+FORMATS = ("ndjson", "csv")
+FIELDS = (
+    "date",
+    "id",
+    "uid",
+    "title",
+    "status",
+    "date_created",
+    "date_updated",
+    "log",
+)
+MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# days read per storage call while exporting, entries written per import chunk
+EXPORT_CHUNK_DAYS = 31
+IMPORT_CHUNK_SIZE = 1000
+
+
+def _dates(storage: Storage, start: Optional[date], end: Optional[date]) -> list[str]:
+    """Day keys of `storage` inside the window, oldest first."""
+    selected = []
+    for key in storage.dates():
+        day = _parse_day(key)
+        if (start is None or day >= start) and (end is None or day <= end):
+            selected.append((day, key))
+    return [key for _, key in sorted(selected)]
+
+
+def entries(
+    storage: Storage,
+    start: Union[str, date, None] = None,
+    end: Union[str, date, None] = None,
+) -> Iterator[tuple[str, dict]]:
+    """
+    Every serialized entry from `start` to `end` inclusive (open ended
+    when None) with its day and its full log from the history store,
+    oldest day first. Days are read through `Storage.iter_days`, a chunk
+    at a time where the backend can read part of the journal.
+    """
+    start = _parse_day(start) if start else None
+    end = _parse_day(end) if end else None
+    dates = _dates(storage, start, end)
+    history = history_for(storage)
+    for key, day in storage.iter_days(dates, EXPORT_CHUNK_DAYS):
+        for entry in day:
+            yield (
+                key,
+                {
+                    **entry,
+                    "uid": uid_of(entry),
+                    "log": history.log_of(entry),
+                },
+            )
+
+
+def _csv_line(row: Iterable) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(row)
+    return buffer.getvalue()
+
+
+def export(
+    storage: Storage,
+    format: str = "ndjson",
+    start: Union[str, date, None] = None,
+    end: Union[str, date, None] = None,
+) -> Iterator[str]:
+    """
+    The entries of the window as lines of text, one entry per line: a
+    JSON object per line for `ndjson`, or a header and one row per entry
+    for `csv`, where the log column holds the JSON encoded log.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown export format {format!r}")
+    rows = entries(storage, start, end)
+    if format == "ndjson":
+        for key, entry in rows:
+            yield codec.dumps_line({"date": key, **entry}).decode()
+        return
+
+    yield _csv_line(FIELDS)
+    for key, entry in rows:
+        yield _csv_line(
+            [
+                key,
+                entry["id"],
+                entry["uid"],
+                entry["title"],
+                entry["status"],
+                entry["date_created"],
+                entry["date_updated"],
+                codec.dumps_compact(entry["log"]).decode(),
+            ]
+        )
+
+
+def _validated(record: dict) -> tuple[str, dict]:
+    """The day key and serialized entry of one imported record."""
+    missing = [field for field in ("date", "title") if not record.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    key = Day.parse(str(record["date"])).key
+
+    status = Status(record.get("status") or Status.PENDING.value)
+    created = record.get("date_created")
+    if not created:
+        raise ValueError("missing date_created")
+    created = datetime.fromisoformat(created)
+    updated = datetime.fromisoformat(record.get("date_updated") or created.isoformat())
+
+    uid = record.get("uid")
+    if uid:
+        uid = uuid.UUID(str(uid)).hex
+
+    log = record.get("log")
+    if isinstance(log, str):
+        log = codec.loads_json(log.encode()) if log else None
+    if log is None:
+        log = [entry_log.encode(entry_log.CREATED, created)]
+    if not isinstance(log, list):
+        raise ValueError("log must be a list")
+    for raw in log:
+        entry_log.LogEvent.decode(raw)
+
+    entry = {
+        "id": 0,
+        "uid": uid,
+        "title": str(record["title"]),
+        "status": status.value,
+        "date_created": created.isoformat(),
+        "date_updated": updated.isoformat(),
+        "log": log,
+    }
+    entry["uid"] = uid_of(entry)
+    return key, entry
+
+
+def parse(lines: Iterable[str], format: str = "ndjson") -> Iterator[tuple[str, dict]]:
+    """
+    Validate exported lines back into `(day, entry)` pairs, lazily. A
+    ValueError names the first bad line.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown import format {format!r}")
+    if format == "csv":
+        # the header is line 1
+        records = enumerate(csv.DictReader(lines), start=2)
+    else:
+        records = enumerate(lines, start=1)
+
+    for number, record in records:
+        try:
+            if isinstance(record, str):
+                if not record.strip():
+                    continue
+                record = codec.loads_json(record.encode())
+            if not isinstance(record, dict):
+                raise ValueError("expected an object")
+            validated = _validated(record)
+        except (ValueError, TypeError, KeyError) as error:
+            raise ValueError(f"Line {number}: {error}") from None
+        yield validated
+
+
+def load(
+    storage: Storage,
+    lines: Iterable[str],
+    format: str = "ndjson",
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> int:
+    """
+    Import exported lines into `storage`, `chunk_size` entries per write.
+    Every chunk is validated before it is written, so a bad line stops the
+    import after the chunks before it. Returns the number of entries added.
+    """
+    added = 0
+    chunk: dict[str, list[dict]] = {}
+    pending = 0
+    for key, entry in parse(lines, format):
+        chunk.setdefault(key, []).append(entry)
+        pending += 1
+        if pending >= chunk_size:
+            added += Todo.import_days(chunk, storage=storage)
+            chunk, pending = {}, 0
+    if chunk:
+        added += Todo.import_days(chunk, storage=storage)
+    return added
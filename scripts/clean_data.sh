@@ -14,5 +14,9 @@ fi
 
 # Overwrite the file with an empty JSON object
 echo "{}" > "$FILE_PATH"
+# Derived status counters are rebuilt from the (now empty) data on next use;
+# the task history goes with the data it belongs to, as do cached assistant answers
+rm -f "${FILE_PATH}.counts" "${FILE_PATH}.search" "${FILE_PATH}.history" "${FILE_PATH}.goals.rollup"
+rm -rf "${FILE_PATH}.ai"
 
 echo "File '$FILE_PATH' has been cleared and overwritten with {}."
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+from flask import Flask
+
+from config import config
+from core.router import router
+from core.storage import JsonStorage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def todo_file(tmp_path) -> str:
+    """Path of an empty journal."""
+    todo_file = tmp_path / "todo.json"
+    todo_file.write_text("{}")
+    return str(todo_file)
+
+
+@pytest.fixture
+def storage(todo_file):
+    return JsonStorage(todo_file)
+
+
+@pytest.fixture
+def app(todo_file, monkeypatch):
+    """The app, serving `todo_file` as DATA_PATH."""
+    monkeypatch.setattr(config, "DATA_PATH", todo_file)
+    app = Flask(__name__, template_folder=os.path.join(ROOT, "templates"))
+    app.register_blueprint(router)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    """A test client logged in with LOGIN_KEY."""
+    client = app.test_client()
+    client.set_cookie("_s_key", config.HASHED_LOGIN_KEY)
+    return client
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from config import config
+from core import ai
+from core.ai import AI, GeminiProvider, ProviderError, ResponseCache
+from core.model import Status, Todo
+
+DATE = "01-01-2025"
+
+
+class FakeGemini(BaseHTTPRequestHandler):
+    """Answers each prompt with `echo: <its first line>`."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.path, self.headers["x-goog-api-key"], body))
+        if self.server.fail:
+            self.send_response(500)
+            self.end_headers()
+            return
+        answers = [
+            f"echo: {part['text'].splitlines()[0]}"
+            for part in body["contents"][0]["parts"]
+        ]
+        text = json.dumps(answers) if "generationConfig" in body else answers[0]
+        reply = {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+        raw = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGemini)
+    server.requests, server.fail = [], False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def assistant(server, storage):
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    assistant = AI(storage, GeminiProvider("secret", "fake", url), window=0.2)
+    yield assistant
+    assistant.close()
+
+
+def test_prompts_are_batched_deduplicated_and_cached(assistant, server):
+    futures = [assistant.submit(prompt) for prompt in ["one", "two", "one", "three"]]
+    assert futures[0] is futures[2]
+    assert [future.result(5) for future in futures] == [
+        "echo: one",
+        "echo: two",
+        "echo: one",
+        "echo: three",
+    ]
+
+    [(path, key, body)] = server.requests
+    assert path == "/v1beta/models/fake:generateContent" and key == "secret"
+    assert [part["text"] for part in body["contents"][0]["parts"]] == [
+        "one",
+        "two",
+        "three",
+    ]
+
+    again = assistant.submit("two")
+    assert again.done() and again.result() == "echo: two"
+    assert len(server.requests) == assistant.calls == 1
+
+
+def test_unchanged_days_are_never_asked_twice(assistant, server, storage):
+    todo = Todo(storage=storage, date=DATE)
+    assert (
+        assistant.daily_summary(DATE).result(5) == "Nothing was recorded on this day."
+    )
+    assert server.requests == []
+
+    todo.add("Write report")
+    first = assistant.daily_summary(DATE).result(5)
+    assert first.startswith("echo: Summarize this day (01-01-2025)")
+    assert assistant.daily_summary(DATE).result(5) == first
+    assert len(server.requests) == 1
+
+    todo.update(0, Status.COMPLETED)
+    assistant.daily_summary(DATE).result(5)
+    assistant.weekly_review("03-01-2025").result(5)
+    assistant.breakdown(todo.get(0)).result(5)
+    assert len(server.requests) == 4
+    review = server.requests[2][2]["contents"][0]["parts"][0]["text"]
+    assert "28-12-2024\n- nothing recorded" in review
+    assert "01-01-2025\n- [completed] Write report" in review
+
+
+def test_failures_are_reported_and_not_cached(assistant, server):
+    server.fail = True
+    with pytest.raises(ProviderError):
+        assistant.submit("flaky").result(5)
+    server.fail = False
+    assert assistant.submit("flaky").result(5) == "echo: flaky"
+    assert len(server.requests) == 2
+
+
+def test_pending_prompts_are_bounded(storage):
+    release = threading.Event()
+
+    class Blocked:
+        name = "blocked"
+
+        def complete(self, prompts):
+            release.wait(5)
+            return prompts
+
+    assistant = AI(storage, Blocked(), workers=1, batch_size=1, max_pending=2)
+    first, second = assistant.submit("a"), assistant.submit("b")
+    with pytest.raises(ai.Busy):
+        assistant.submit("c")
+    release.set()
+    assert (first.result(5), second.result(5)) == ("a", "b")
+    assistant.close()
+
+
+def test_response_cache_expires(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache"), ttl=60)
+    cache.put("aa01", "fresh")
+    cache.put("bb02", "stale")
+    past = time.time() - 120
+    os.utime(cache._path("bb02"), (past, past))
+    assert cache.get("aa01") == "fresh" and cache.get("bb02") is None
+    assert not os.path.exists(cache._path("bb02"))
+
+    os.utime(cache._path("aa01"), (past, past))
+    assert cache.evict() == 1 and cache.get("aa01") is None
+
+
+def test_routes_answer_without_waiting(server, client, monkeypatch):
+    monkeypatch.setattr(
+        config, "AI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}"
+    )
+    uid = Todo(date=DATE).add("Plan trip").uid
+
+    url = f"/ai/{DATE}/{uid}/breakdown"
+    first = client.get(url)
+    assert b"Thinking" in first.data and f'hx-get="{url}"'.encode() in first.data
+    deadline = time.monotonic() + 5
+    while b"Thinking" in (answer := client.get(url)).data:
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+    assert b"echo: Break this task" in answer.data
+
+    assert client.get(f"/ai/{DATE}/missing/breakdown").status_code == 404
+    assert client.get("/ai/2025-01-01/summary").status_code == 400
+    ai.ai_for(Todo(date=DATE).storage).close()
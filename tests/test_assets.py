@@ -0,0 +1,85 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, render_template_string
+
+from core import assets
+from core.assets import build
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "js").mkdir()
+    (static / "css" / "input.css").write_text("@import 'tailwindcss';")
+    (static / "css" / "dist.css").write_text("body { color: red; }\n" * 200)
+    (static / "js" / "tiny.js").write_text("1")
+    return static
+
+
+@pytest.fixture
+def client(static_dir):
+    app = Flask(__name__, static_url_path="", static_folder=str(static_dir))
+    app.register_blueprint(assets.assets)
+    return app.test_client()
+
+
+def test_build_fingerprints_and_precompresses(static_dir):
+    manifest = build(str(static_dir))
+    assert set(manifest) == {"css/dist.css", "js/tiny.js"}
+
+    css = manifest["css/dist.css"]
+    assert css["file"].startswith("css/dist.") and css["file"].endswith(".css")
+    assert "gzip" in css["encodings"]
+    assert manifest["js/tiny.js"]["encodings"] == []  # nothing to gain
+
+    dist = static_dir / "dist"
+    original = (static_dir / "css" / "dist.css").read_bytes()
+    assert gzip.decompress((dist / (css["file"] + ".gz")).read_bytes()) == original
+    assert json.loads((dist / "manifest.json").read_text()) == manifest
+    assert build(str(static_dir)) == manifest  # content-addressed
+
+
+def test_rebuild_keeps_the_previous_generation(static_dir):
+    css = static_dir / "css" / "dist.css"
+    first = build(str(static_dir))["css/dist.css"]["file"]
+    css.write_text("body { color: blue; }")
+    second = build(str(static_dir))["css/dist.css"]["file"]
+    css.write_text("body { color: green; }")
+    third = build(str(static_dir))["css/dist.css"]["file"]
+
+    dist = static_dir / "dist"
+    assert len({first, second, third}) == 3
+    assert (dist / second).exists() and (dist / third).exists()
+    assert not (dist / first).exists() and not (dist / (first + ".gz")).exists()
+
+
+def test_asset_urls_and_negotiated_serving(client, static_dir):
+    with client.application.test_request_context():
+        assert render_template_string("{{ asset('css/dist.css') }}") == "/css/dist.css"
+
+    manifest = build(str(static_dir))
+    file = manifest["css/dist.css"]["file"]
+    with client.application.test_request_context():
+        assert (
+            render_template_string("{{ asset('css/dist.css') }}") == f"/assets/{file}"
+        )
+        assert render_template_string("{{ asset('js/none.js') }}") == "/js/none.js"
+
+    plain = client.get(f"/assets/{file}", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.data == (static_dir / "css" / "dist.css").read_bytes()
+    assert plain.headers["Cache-Control"] == assets.IMMUTABLE
+    assert plain.headers["Vary"] == "Accept-Encoding"
+    assert plain.mimetype == "text/css"
+
+    compressed = client.get(f"/assets/{file}", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers["Cache-Control"] == assets.IMMUTABLE
+
+    assert client.get("/assets/manifest.json").status_code == 404
+    assert client.get("/assets/css/missing.css").status_code == 404
+    assert client.get("/assets/../css/dist.css").status_code == 404
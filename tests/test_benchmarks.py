@@ -0,0 +1,42 @@
+import json
+
+from benchmarks.generate import generate
+from benchmarks.run import main
+from benchmarks.tenants import load_test
+from config import config
+from core.storage import JsonStorage
+
+
+def test_generate_is_deterministic(tmp_path):
+    files = []
+    for name in ("a.json", "b.json"):
+        todo_file = tmp_path / name
+        todo_file.write_text("{}")
+        assert generate(JsonStorage(str(todo_file)), years=0.05, tasks_per_day=3) == 57
+        files.append(json.loads(todo_file.read_text()))
+    assert files[0] == files[1]
+
+
+def test_suite_writes_a_report(tmp_path, monkeypatch):
+    for name in ("DATA_PATH", "STORAGE_BACKEND", "STORAGE_LAYOUT", "STORAGE_FORMAT"):
+        monkeypatch.setattr(config, name, getattr(config, name))
+    output = tmp_path / "report.json"
+
+    main(["--years", "0.02", "--iterations", "2", "--output", str(output)])
+
+    report = json.loads(output.read_text())
+    assert report["meta"]["entries"] == 80
+    names = [result["name"] for result in report["results"]]
+    assert "Todo.postpone" in names and "GET /" in names
+    assert all(result["p99_ms"] >= result["p50_ms"] for result in report["results"])
+
+
+def test_tenant_load_stays_within_the_pool():
+    before = config.TENANTS_DIR
+    report = load_test(count=60, requests=40, max_open=8)
+
+    assert config.TENANTS_DIR == before
+    assert report["pool"]["largest"] == 8 and report["pool"]["in_use"] == 0
+    assert report["pool"]["opened"] - report["pool"]["evictions"] == 8
+    assert len(report["heap_kib"]) == 10
+    assert [result["iterations"] for result in report["results"]] == [55, 40]
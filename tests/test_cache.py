@@ -0,0 +1,80 @@
+import json
+import os
+
+from pytest import fixture
+
+from core.cache import DayCache, day_cache
+from core.model import Status, Todo
+
+
+@fixture
+def fake_todo_with_data(tmp_path):
+    todo_file = tmp_path / "todo.json"
+    todo_file.write_text("{}")
+    todo = Todo(str(todo_file), date="01-01-2025")
+    todo.add("task1")
+    todo.add("task2")
+    return str(todo_file)
+
+
+def test_day_cache_lru_eviction():
+    cache = DayCache(max_entries=3)
+    cache.put("a", 1, [1, 2])
+    cache.put("b", 1, [1])
+    assert cache.get("a", 1) == [1, 2]
+
+    cache.put("c", 1, [1])  # over the cap, "b" is the least recently used
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == [1, 2]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_day_cache_signature_mismatch_is_a_miss():
+    cache = DayCache()
+    cache.put("a", (1, 2), ["x"])
+    assert cache.get("a", (1, 3)) is None
+    assert cache.get("a", (1, 2)) == ["x"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_todo_reads_are_served_from_cache(fake_todo_with_data):
+    before = day_cache.stats()["hits"]
+    Todo(fake_todo_with_data, date="01-01-2025").data
+    Todo(fake_todo_with_data, date="01-01-2025").data
+    assert day_cache.stats()["hits"] == before + 2
+
+
+def test_mutations_write_through(fake_todo_with_data):
+    Todo(fake_todo_with_data, date="01-01-2025").update(0, status=Status.COMPLETED)
+
+    before = day_cache.stats()["hits"]
+    entry = Todo(fake_todo_with_data, date="01-01-2025").get(0)
+    assert day_cache.stats()["hits"] == before + 1
+    assert entry.status == Status.COMPLETED
+
+
+def test_callers_never_share_cached_entries(fake_todo_with_data):
+    first = Todo(fake_todo_with_data, date="01-01-2025")
+    first.get(0).update_title("not written yet")
+
+    second = Todo(fake_todo_with_data, date="01-01-2025")
+    assert second.get(0) is not first.get(0)
+    assert second.get(0).title != "not written yet"
+    assert second.get(0)._pending == []
+
+
+def test_external_edits_invalidate(fake_todo_with_data):
+    Todo(fake_todo_with_data, date="01-01-2025").data
+
+    with open(fake_todo_with_data) as f:
+        data = json.load(f)
+    data["01-01-2025"][0]["title"] = "edited outside"
+    with open(fake_todo_with_data, "w") as f:
+        json.dump(data, f)
+    # make sure the change is visible even on coarse mtime filesystems
+    stat = os.stat(fake_todo_with_data)
+    os.utime(fake_todo_with_data, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert Todo(fake_todo_with_data, date="01-01-2025").get(0).title == "edited outside"
@@ -0,0 +1,59 @@
+from datetime import date, datetime
+
+import pytest
+
+from core import clock
+from core.clock import Day, iso_to_key, key_to_iso
+from core.model import Todo
+
+
+def test_day_round_trips_keys():
+    day = Day.parse("28-02-2024")
+    assert day == date(2024, 2, 28).toordinal()
+    assert (day + 1).key == "29-02-2024"
+    assert str(day + 2) == "01-03-2024"
+    assert (day - 59).key == "31-12-2023"
+    assert Day.parse("01-03-2024") - day == 2
+    assert Day.of(date(2024, 2, 28)) == day == Day.of(datetime(2024, 2, 28, 23))
+    assert day.isoformat() == "2024-02-28"
+    assert key_to_iso("05-01-2025") == "2025-01-05"
+    assert iso_to_key("2025-01-05") == "05-01-2025"
+
+
+@pytest.mark.parametrize("key", ["2025-01-05", "31-02-2025", "aa-bb-cccc", ""])
+def test_day_rejects_invalid_keys(key):
+    with pytest.raises(ValueError):
+        Day.parse(key)
+
+
+def test_unpadded_keys_are_normalized(todo_file):
+    assert key_to_iso("1-1-2025") == "2025-01-01"
+    todo = Todo(todo_file, date="5-1-2025")
+    todo.add("Padded")
+    assert todo.date == "05-01-2025"
+    assert todo.storage.dates() == ["05-01-2025"]
+
+
+def test_frozen_clock_drives_the_model(todo_file):
+    at = datetime(2025, 3, 9, 23, 30)
+    with clock.frozen(at, "Asia/Kolkata") as frozen:
+        todo = Todo(todo_file)
+        assert todo.date == "09-03-2025"
+        entry = todo.add("Late task")
+        assert entry.date_created.isoformat() == "2025-03-09T23:30:00+05:30"
+
+        frozen.advance(hours=1)
+        assert clock.today().key == "10-03-2025"
+        assert Todo(todo_file).date == "10-03-2025"
+        todo.postpone(0)
+        assert Todo(todo_file, date="10-03-2025").get(0).date_updated == frozen.now()
+
+    assert clock.now().tzinfo is not None and clock.now().year >= 2025
+
+
+def test_clock_resolves_the_zone_once(monkeypatch):
+    system = clock.Clock()
+    zone = system.tz
+    assert system.tz is zone
+    monkeypatch.setattr(clock.config, "TIMEZONE", "UTC")
+    assert str(system.tz) == "UTC"
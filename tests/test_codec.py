@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from config import config
+from core import codec
+from core.model import Todo
+from core.storage import JsonStorage
+
+DATA = {"01-01-2025": [{"title": "a", "log": [["c", "2025-01-01T10:00:00"]]}]}
+
+
+def test_json_formats_round_trip():
+    pretty = codec.dumps(DATA, "pretty")
+    compact = codec.dumps(DATA, "compact")
+
+    assert pretty == json.dumps(DATA, indent=4).encode()
+    assert b" " not in compact and b"\n" not in compact
+    assert codec.loads(pretty) == codec.loads(compact) == DATA
+    assert codec.loads(b"") == {}
+
+
+def test_binary_format_round_trip():
+    pytest.importorskip("msgpack")
+    raw = codec.dumps(DATA, "binary")
+
+    assert raw[:1] not in (b"{", b"[")
+    assert codec.loads(raw) == DATA
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        codec.dumps(DATA, "yaml")
+
+
+def test_compact_storage_reads_pretty_files(tmp_path, monkeypatch):
+    todo_file = tmp_path / "todo.json"
+    todo_file.write_text(json.dumps({"01-01-2025": []}, indent=4))
+    monkeypatch.setattr(config, "STORAGE_FORMAT", "compact")
+
+    todo = Todo(storage=JsonStorage(str(todo_file)), date="01-01-2025")
+    todo.add("task1")
+
+    raw = todo_file.read_bytes()
+    assert b"\n" not in raw
+    assert json.loads(raw)["01-01-2025"][0]["title"] == "task1"
@@ -0,0 +1,101 @@
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from config import config
+from core import counters
+from core.cache import day_cache
+from core.model import Status, Todo
+from core.storage import ConflictError, JsonStorage, day_version, get_storage
+
+DATE = "01-01-2025"
+
+
+@pytest.fixture(params=["json", "journal"])
+def client(request, client, monkeypatch):
+    monkeypatch.setattr(config, "STORAGE_BACKEND", request.param)
+    return client
+
+
+def _storage():
+    return get_storage(config.DATA_PATH)
+
+
+def test_parallel_adds_are_not_lost(client):
+    def add(n):
+        return client.post(f"/todo?_t={DATE}", data={"title": f"task{n}"}).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert set(pool.map(add, range(40))) == {200}
+
+    day_cache.clear()
+    titles = sorted(e.title for e in Todo(date=DATE).data)
+    assert titles == sorted(f"task{n}" for n in range(40))
+    assert counters.verify(_storage()) == {}
+
+
+def test_parallel_updates_keep_every_change(client):
+    todo = Todo(date=DATE)
+    for n in range(20):
+        todo.add(f"task{n}")
+
+    def complete(index):
+        return client.post(f"/todo/{DATE}/{index}/completed").status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert set(pool.map(complete, range(20))) == {200}
+
+    day_cache.clear()
+    assert {e.status for e in Todo(date=DATE).data} == {Status.COMPLETED}
+    assert counters.verify(_storage()) == {}
+
+
+def _add_from_process(path, worker, count):
+    todo = Todo(storage=JsonStorage(path), date=DATE)
+    for n in range(count):
+        todo.add(f"w{worker}-{n}")
+
+
+def test_parallel_processes_share_the_file(tmp_path):
+    todo_file = tmp_path / "todo.json"
+    todo_file.write_text("{}")
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_add_from_process, args=(str(todo_file), w, 10))
+        for w in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    titles = [e["title"] for e in JsonStorage(str(todo_file)).load_day(DATE)]
+    assert sorted(titles) == sorted(f"w{w}-{n}" for w in range(4) for n in range(10))
+
+
+def test_stale_version_is_rejected(tmp_path):
+    todo_file = tmp_path / "todo.json"
+    todo_file.write_text("{}")
+    storage = JsonStorage(str(todo_file))
+    storage.append(DATE, {"title": "a"})
+    stale = day_version(storage.load_day(DATE))
+    storage.append(DATE, {"title": "b"})
+
+    with pytest.raises(ConflictError):
+        storage.replace(DATE, 0, {"title": "c"}, expected=stale)
+    assert storage.load_day(DATE) == [{"title": "a"}, {"title": "b"}]
+
+
+def test_retried_update_counts_the_status_it_replaced(client):
+    Todo(date=DATE).add("shared")
+    first, second = Todo(date=DATE), Todo(date=DATE)
+    first.data, second.data
+
+    first.update(0, Status.COMPLETED)
+    # the second writer's version is stale, so it conflicts and retries
+    second.update(0, Status.COMPLETED)
+
+    assert counters.verify(_storage()) == {}
+    assert Todo(date=DATE).percentage()["completed"] == 100.0
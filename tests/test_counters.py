@@ -0,0 +1,73 @@
+import json
+from datetime import date
+
+from core import counters
+from core.model import Status, Todo
+from core.storage import JsonStorage
+
+
+def test_counters_follow_mutations(storage):
+    todo = Todo(storage=storage, date="01-01-2025")
+    todo.add("task1")
+    todo.add("task2")
+    todo.add("task3")
+    todo.update(0, status=Status.COMPLETED)
+    todo.update(0, title="renamed")
+    todo.postpone(2)
+
+    stored = counters.counters_for(storage).get(["01-01-2025", "02-01-2025"])
+    assert stored == {
+        "01-01-2025": {"pending": 1, "completed": 1, "postponed": 1},
+        "02-01-2025": {"pending": 1},
+    }
+    assert counters.verify(storage) == {}
+
+
+def test_percentage_reads_counters_without_loading_entries(storage):
+    todo = Todo(storage=storage, date="01-01-2025")
+    todo.add("task1")
+    todo.add("task2")
+    todo.update(0, status=Status.COMPLETED)
+
+    fresh = Todo(storage=storage, date="01-01-2025")
+    assert fresh.percentage() == {"completed": 50.0, "pending": 50.0, "deleted": 0.0}
+    assert fresh._data is None
+
+
+def test_range_reads_only_the_window(storage):
+    for day in ("31-12-2024", "01-01-2025", "15-01-2025", "01-02-2025"):
+        Todo(storage=storage, date=day).add("task1")
+
+    window = counters.counters_for(storage).range(date(2025, 1, 1), date(2025, 1, 31))
+
+    assert window == {"01-01-2025": {"pending": 1}, "15-01-2025": {"pending": 1}}
+
+
+def test_recount_scans_statuses_and_postpone_logs(tmp_path):
+    todo_file = tmp_path / "todo.json"
+    todo_file.write_text("{}")
+    todo = Todo(str(todo_file), date="01-01-2025")
+    todo.add("task1")
+    todo.postpone(0)
+
+    storage = JsonStorage(str(todo_file))
+    assert counters.recount(storage) == {
+        "01-01-2025": {"postponed": 1},
+        "02-01-2025": {"pending": 1},
+    }
+
+
+def test_verify_detects_drift_and_rebuild_fixes_it(storage):
+    Todo(storage=storage, date="01-01-2025").add("task1")
+
+    with open(storage.path) as f:
+        data = json.load(f)
+    data["01-01-2025"][0]["status"] = "completed"
+    with open(storage.path, "w") as f:
+        json.dump(data, f)
+
+    assert counters.verify(storage) == {
+        "01-01-2025": ({"pending": 1}, {"completed": 1})
+    }
+    counters.rebuild(storage)
+    assert counters.verify(storage) == {}
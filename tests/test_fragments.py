@@ -0,0 +1,85 @@
+import pytest
+
+from core import model
+from core.cache import FragmentCache, fragment_cache
+from core.model import Status, Todo
+
+DATE = "01-01-2025"
+
+
+@pytest.fixture
+def client(client):
+    todo = Todo(date=DATE)
+    todo.add("First")
+    todo.add("Second")
+    return client
+
+
+def revalidate(client, url, response):
+    return client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+
+
+def test_fragment_cache_versions_and_invalidation():
+    cache = FragmentCache(max_chars=10)
+    cache.put(("p", DATE, "page"), 1, "12345")
+    cache.put(("p", DATE, "item", "a"), 1, "123")
+    cache.put(("p", None, "dashboard"), 1, "12")
+    assert cache.get(("p", DATE, "page"), 2) is None
+    assert cache.get(("p", DATE, "page"), 1) == "12345"
+
+    cache.invalidate_day("p", DATE)
+    assert cache.get(("p", DATE, "item", "a"), 1) is None
+    assert cache.get(("p", None, "dashboard"), 1) == "12"
+
+    cache.put(("p", DATE, "page"), 2, "123456789")  # over the cap
+    assert cache.stats()["evictions"] == 1
+    assert cache.get(("p", None, "dashboard"), 1) is None
+
+
+@pytest.mark.parametrize(
+    "url", [f"/todo?_t={DATE}", f"/todo/{DATE}/progress", f"/todo/{DATE}/0", "/"]
+)
+def test_conditional_get(client, url):
+    first = client.get(url)
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    again = revalidate(client, url, first)
+    assert again.status_code == 304 and not again.data
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+    Todo(date=DATE).update(0, status=Status.COMPLETED)
+    changed = revalidate(client, url, first)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+
+
+def test_progress_never_loads_the_day(client, monkeypatch):
+    monkeypatch.setattr(model, "_load_days", None)
+    url = f"/todo/{DATE}/progress"
+    first = client.get(url)
+    assert b"Pending: 100.0%" in first.data
+    assert revalidate(client, url, first).status_code == 304
+
+    model.counters_for(model.open_storage()).adjust(DATE, completed=1)
+    fragment_cache.clear()
+    assert client.get(url).headers["ETag"] != first.headers["ETag"]
+
+
+def test_page_reuses_unchanged_items(client):
+    client.get(f"/todo?_t={DATE}")
+    Todo(date=DATE).update(1, title="Second, renamed")
+
+    before = fragment_cache.stats()
+    page = client.get(f"/todo?_t={DATE}").get_data(as_text=True)
+    after = fragment_cache.stats()
+    assert "Second, renamed" in page and "First" in page
+    # the mutation dropped the day's fragments; both items render once,
+    # after which the page is served from the cache
+    assert after["misses"] - before["misses"] == 3
+    assert client.get(f"/todo?_t={DATE}").get_data(as_text=True) == page
+    assert fragment_cache.stats()["hits"] == after["hits"] + 1
+
+
+def test_missing_item_is_a_404(client):
+    assert client.get(f"/todo/{DATE}/5").status_code == 404
@@ -0,0 +1,93 @@
+import json
+import subprocess
+
+from pytest import fixture
+
+from core.git_store import GitStore
+from core.model import Status, Todo
+from core.storage import JsonStorage
+
+
+@fixture
+def data_dir(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "todo.json").write_text("{}")
+    return data
+
+
+@fixture
+def remote(tmp_path):
+    bare = tmp_path / "remote.git"
+    subprocess.run(["git", "init", "--quiet", "--bare", str(bare)], check=True)
+    return str(bare)
+
+
+def _remote_log(remote: str) -> list[str]:
+    out = subprocess.run(
+        ["git", f"--git-dir={remote}", "log", "--format=%s", "main"],
+        capture_output=True,
+        check=True,
+    )
+    return out.stdout.decode().splitlines()
+
+
+def test_mutations_are_batched_into_one_commit(data_dir, remote):
+    store = GitStore(str(data_dir), window=60, max_ops=100, remote=remote).start()
+    try:
+        todo = Todo(str(data_dir / "todo.json"), date="01-01-2025")
+        todo.add("task1")
+        todo.add("task2")
+        todo.update(0, status=Status.COMPLETED)
+        store.flush(timeout=10)
+    finally:
+        store.stop()
+
+    assert _remote_log(remote) == ["journal: 3 change(s) on 01-01-2025"]
+
+
+def test_commits_once_max_ops_is_reached(data_dir, remote):
+    store = GitStore(str(data_dir), window=60, max_ops=2, remote=remote).start()
+    try:
+        todo = Todo(str(data_dir / "todo.json"), date="01-01-2025")
+        for i in range(5):
+            todo.add(f"task{i}")
+        store.flush(timeout=10)
+    finally:
+        store.stop()
+
+    # batches of two; a batch is skipped when an earlier commit already
+    # picked its changes up from the work tree
+    assert 1 <= len(_remote_log(remote)) <= 3
+    todo_at_head = subprocess.run(
+        ["git", f"--git-dir={remote}", "show", "main:todo.json"],
+        capture_output=True,
+        check=True,
+    )
+    assert len(json.loads(todo_at_head.stdout)["01-01-2025"]) == 5
+
+
+def test_history_and_restore(data_dir, remote):
+    storage = JsonStorage(str(data_dir / "todo.json"))
+    store = GitStore(str(data_dir), remote=remote)
+
+    todo = Todo(storage=storage, date="01-01-2025")
+    todo.add("task1")
+    first = store.commit("first")
+    todo.update(0, title="renamed")
+    todo.add("task2")
+    store.commit("second")
+    Todo(storage=storage, date="02-01-2025").add("other day")
+
+    history = store.history(storage, "01-01-2025")
+    assert [c.message for c in history] == ["second", "first"]
+    assert [e["title"] for e in store.load_at(storage, "01-01-2025", first)] == [
+        "task1"
+    ]
+
+    store.restore(storage, "01-01-2025", first)
+
+    assert [e.title for e in Todo(storage=storage, date="01-01-2025").data] == ["task1"]
+    # other days keep their current state
+    assert Todo(storage=storage, date="02-01-2025").get(0).title == "other day"
+    assert _remote_log(remote)[0] == f"journal: restore 01-01-2025 to {first[:12]}"
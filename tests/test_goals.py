@@ -0,0 +1,136 @@
+import os
+
+from core import goals
+from core.goals import goals_for, tags_of
+from core.model import Status, Todo
+
+
+def test_tags_of():
+    assert tags_of("Run 5k #Fitness #daily-habit, not#this") == {
+        "fitness",
+        "daily-habit",
+        "this",
+    }
+
+
+def test_rollups_follow_linked_tasks_without_rescanning(storage, monkeypatch):
+    Todo(storage=storage, date="30-12-2024").add("Run #fitness")
+    Todo(storage=storage, date="30-12-2024").add("Groceries")
+    store = goals_for(storage)
+    goal = store.create("Get fit", "#Fitness")
+    assert goal.tag == "fitness"
+    assert store.progress(goal.id)["total"] == 1
+
+    def no_scan():
+        raise AssertionError("the rollup must not rescan the journal")
+
+    monkeypatch.setattr(storage, "dates", no_scan)
+    todo = Todo(storage=storage, date="31-12-2024")
+    todo.add("Swim #fitness")
+    todo.add("Stretch")
+    todo.update(0, Status.COMPLETED)
+    todo.update(1, title="Stretch #fitness")
+    todo.postpone(1)
+    Todo(storage=storage, date="30-12-2024").apply_batch(
+        [{"op": "status", "index": 0, "status": "deleted"}]
+    )
+    Todo(storage=storage, date="02-01-2025").rollover(days=5)
+
+    progress = store.progress(goal.id)
+    assert (progress["completed"], progress["pending"], progress["total"]) == (1, 1, 2)
+    assert progress["percentage"] == 50.0
+    assert progress["days"] == {
+        "02-01-2025": {"pending": 1},
+        "31-12-2024": {"completed": 1},
+        "30-12-2024": {"deleted": 1},
+    }
+    monkeypatch.undo()
+    assert store.verify() == {}
+
+
+def test_links_deletion_and_rebuild(storage):
+    todo = Todo(storage=storage, date="01-01-2025")
+    entry = todo.add("Write chapter one")
+    store = goals_for(storage)
+    goal = store.create("Finish the book")
+    other = store.create("Anything tagged", "book")
+    assert store.progress(goal.id)["total"] == 0
+
+    assert store.link(goal.id, "01-01-2025", entry)
+    assert not store.link("missing", "01-01-2025", entry)
+    todo.update(0, title="Write chapter one #book")
+    todo.update(0, Status.COMPLETED)
+    assert store.progress(goal.id)["percentage"] == 100.0
+    assert store.progress(other.id)["completed"] == 1
+
+    assert store.delete(other.id) and not store.delete(other.id)
+    assert [g.id for g in store.goals()] == [goal.id]
+    assert store.progress(other.id)["total"] == 0
+
+    # a fresh process reads the materialized rollup as it was left
+    os.remove(store.rollup_path)
+    goals._stores.clear()
+    store = goals_for(storage)
+    assert store.progress(goal.id)["total"] == 0
+    assert list(store.verify()) == [goal.id]
+    assert store.rebuild() == 1 and store.verify() == {}
+    assert store.progress(goal.id)["completed"] == 1
+
+
+def test_rollup_changes_are_appended_and_replayed(storage):
+    todo = Todo(storage=storage, date="01-01-2025")
+    todo.add("Run #fitness")
+    store = goals_for(storage)
+    goal = store.create("Get fit", "fitness")
+    inode = os.stat(store.rollup_path).st_ino
+    size = os.path.getsize(store.rollup_path)
+
+    todo.update(0, Status.COMPLETED)
+    todo.add("Swim #fitness")
+    todo.add("Groceries")
+    # one line per touched task, without rewriting the file
+    assert os.stat(store.rollup_path).st_ino == inode
+    with open(store.rollup_path, "rb") as f:
+        assert len(f.read()[size:].splitlines()) == 2
+    other = store.create("Anything")
+    store.delete(other.id)
+
+    goals._stores.clear()
+    replayed = goals_for(storage)
+    assert replayed.progress(goal.id) == store.progress(goal.id)
+    assert replayed.progress(goal.id)["completed"] == 1
+    assert replayed.verify() == {}
+
+    store._compact()
+    with open(store.rollup_path, "rb") as f:
+        assert len(f.read().splitlines()) == 2
+
+
+def test_goal_routes(client):
+    todo = Todo(date="01-01-2025")
+    todo.add("Read #books")
+    uid = todo.add("Plan").uid
+
+    assert b"No goals yet" in client.get("/goals").data
+    created = client.post("/goals", data={"title": "Reading", "tag": "books"})
+    assert b"0 / 1 done" in created.data
+    [goal] = goals_for(todo.storage).goals()
+
+    linked = client.post(
+        f"/goals/{goal.id}/link", json={"date": "01-01-2025", "ref": uid}
+    )
+    assert b"0 / 2 done" in linked.data
+    todo.update(1, Status.COMPLETED)
+    assert b"1 / 2 done (50.0%)" in client.get(f"/goals/{goal.id}/progress").data
+    assert b"Reading" in client.get("/goals").data
+
+    assert client.post("/goals", data={"title": ""}).status_code == 400
+    assert client.get("/goals/missing/progress").status_code == 404
+    assert (
+        client.post(
+            f"/goals/{goal.id}/link", json={"date": "01-01-2025", "ref": "nope"}
+        ).status_code
+        == 404
+    )
+    assert client.delete(f"/goals/{goal.id}").status_code == 200
+    assert client.delete(f"/goals/{goal.id}").status_code == 404
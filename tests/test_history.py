@@ -0,0 +1,82 @@
+import json
+
+from core import history, transfer
+from core.counters import recount
+from core.history import HistoryStore, history_for, uid_of
+from core.model import Entry, Status, Todo
+
+DATE = "01-01-2025"
+
+
+def test_postponed_task_keeps_its_id_and_a_flat_day_entry(storage):
+    todo = Todo(storage=storage, date=DATE)
+    uid = todo.add("Recurring").uid
+    for _ in range(5):
+        todo.postpone(0)
+        todo = Todo(storage=storage, date=todo.day + 1)
+
+    [stored] = storage.load_day(todo.date)
+    assert stored["uid"] == uid and stored["log"] == []
+    entry = todo.get(0)
+    assert entry.uid == uid
+    assert [event.kind for event in entry.log] == ["c"] + ["p"] * 5
+    assert len(history_for(storage).events(uid)) == 6
+
+
+def test_inline_logs_move_to_the_store_when_their_day_is_written(storage):
+    created = "2025-01-01T09:00:00+05:30"
+    legacy = {
+        "id": 0,
+        "title": "Legacy",
+        "status": "pending",
+        "date_created": created,
+        "date_updated": created,
+        "log": [["c", created], "An old free-form line"],
+    }
+    storage.save_days({DATE: [legacy]})
+
+    todo = Todo(storage=storage, date=DATE)
+    assert todo.get(0).uid == uid_of(legacy)
+    assert [str(event) for event in todo.get(0).log][1] == "An old free-form line"
+
+    todo.update(0, status=Status.COMPLETED)
+    todo.add("New")
+    [first, second] = storage.load_day(DATE)
+    assert first["log"] == [] and second["log"] == []
+    assert history_for(storage).events(uid_of(legacy)) == [
+        *legacy["log"],
+        ["s", first["date_updated"], "COMPLETED"],
+    ]
+    assert recount(storage)[DATE] == {"completed": 1, "pending": 1}
+
+    # a second process still holding the inline log does not repeat it
+    history_for(storage).record([(uid_of(legacy), legacy["log"], [])])
+    assert len(Todo(storage=storage, date=DATE).get(0).log) == 3
+
+
+def test_migrate_and_export(storage):
+    entry = Entry(0, "Standalone")
+    entry.update_title("Renamed")
+    storage.save_days({DATE: [entry.serialize()]})
+
+    assert history.migrate(storage) == 1
+    assert history.migrate(storage) == 0
+    [stored] = storage.load_day(DATE)
+    assert stored["log"] == []
+
+    [line] = transfer.export(storage)
+    exported = json.loads(line)
+    assert exported["uid"] == entry.uid
+    assert [raw[0] for raw in exported["log"]] == ["c", "t"]
+
+
+def test_store_compacts_and_reloads(tmp_path):
+    path = str(tmp_path / "todo.json.history")
+    store = HistoryStore(path)
+    for n in range(1100):
+        store.record([("a", [], [["n", f"2025-01-01T00:00:{n % 60:02d}", n]])])
+    assert len(open(path).readlines()) < 1100
+
+    reloaded = HistoryStore(path)
+    assert [raw[2] for raw in reloaded.events("a")] == list(range(1100))
+    assert "a" in reloaded and "b" not in reloaded
@@ -0,0 +1,82 @@
+import pytest
+
+from config import config
+from core import live
+
+DATE = "01-01-2025"
+THREADED = {"wsgi.multithread": True}
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    monkeypatch.setattr(config, "LIVE_STREAM_SECONDS", 0.2)
+    monkeypatch.setattr(live, "broker", live.Broker(max_streams=2))
+    return client
+
+
+def test_format_event_splits_lines():
+    assert live.format_event("swap", "<a>\n</a>") == (
+        "event: swap\ndata: <a>\ndata: </a>\n\n"
+    )
+
+
+def test_broker_skips_sender_and_drops_slow_subscribers(monkeypatch):
+    monkeypatch.setattr(live, "QUEUE_SIZE", 1)
+    broker = live.Broker(max_streams=2)
+    sender = broker.subscribe(("todo", DATE), client="a")
+    other = broker.subscribe(("todo", DATE), client="b")
+    assert broker.subscribe(("todo", DATE)) is None
+
+    assert broker.publish(("todo", DATE), "swap", "x", skip="a") == 1
+    assert sender.get(0) is None
+    assert other.get(0) == live.format_event("swap", "x")
+
+    broker.publish(("todo", DATE), "swap", "1", skip="a")
+    broker.publish(("todo", DATE), "swap", "2", skip="a")
+    assert other.closed and len(broker) == 1
+    sender.close()
+    assert not broker.listening(("todo", DATE))
+
+
+def test_stream_pushes_changes_from_other_clients(client):
+    response = client.get(f"/live/{DATE}?client=a", environ_overrides=THREADED)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    body = (chunk.decode() for chunk in response.response)
+    assert next(body).startswith("retry:")
+    assert 'id="progress-bar"' in next(body)
+
+    client.post(f"/todo?_t={DATE}", data={"title": "Shared task"})
+    items = next(body)
+    assert "afterbegin:#todo-container" in items and "Shared task" in items
+    assert 'hx-swap-oob="true"' in next(body)
+
+    # the tab that made a change only gets the progress bar
+    client.post(f"/todo/{DATE}/0/completed", headers={"X-Client": "a"})
+    progress = next(body)
+    assert 'id="progress-bar"' in progress and "Completed: 100.0%" in progress
+
+    client.post(f"/todo/{DATE}/0/postpone")
+    assert 'id="todo-container" hx-swap-oob="innerHTML"' in next(body)
+    response.close()
+    assert len(live.broker) == 0
+
+
+def test_stream_of_an_unpadded_date(client):
+    response = client.get("/live/1-1-2025", environ_overrides=THREADED)
+    body = (chunk.decode() for chunk in response.response)
+    next(body), next(body)
+
+    client.post(f"/todo?_t={DATE}", data={"title": "Shared task"})
+    assert "Shared task" in next(body)
+    response.close()
+
+
+def test_stream_degrades_without_threads(client):
+    assert client.get(f"/live/{DATE}").status_code == 204
+    assert client.get("/live/2025-01-01", environ_overrides=THREADED).status_code == 400
+
+    streams = [client.get(f"/live/{DATE}", environ_overrides=THREADED) for _ in "ab"]
+    assert client.get(f"/live/{DATE}", environ_overrides=THREADED).status_code == 204
+    for response in reversed(streams):
+        response.close()
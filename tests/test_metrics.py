@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from config import config
+from core import metrics
+from core.cache import day_cache
+from core.model import Todo
+from core.profiler import SamplingProfiler
+
+DATE = "01-01-2025"
+
+
+@pytest.fixture
+def client(client, monkeypatch):
+    monkeypatch.setattr(config, "METRICS", True)
+    return client
+
+
+def test_server_timing_header(client):
+    Todo(date=DATE).add("task1")
+    day_cache.clear()
+
+    resp = client.get(f"/todo?_t={DATE}")
+
+    names = [part.split(";")[0] for part in resp.headers["Server-Timing"].split(", ")]
+    assert {"storage_load", "deserialize", "render", "total"} <= set(names)
+
+
+def test_metrics_endpoint(client):
+    client.get(f"/todo?_t={DATE}")
+
+    resp = client.get("/metrics")
+
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+    body = resp.get_data(as_text=True)
+    assert (
+        'todo_requests_total{endpoint="router.todo",method="GET",status="200"}' in body
+    )
+    assert 'todo_span_duration_seconds_count{span="render"}' in body
+    assert "# TYPE todo_request_duration_seconds histogram" in body
+
+
+def test_metrics_are_opt_in(client, monkeypatch):
+    monkeypatch.setattr(config, "METRICS", False)
+
+    assert "Server-Timing" not in client.get(f"/todo?_t={DATE}").headers
+    assert client.get("/metrics").status_code == 404
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("h", "help", ("span",))
+    histogram.observe(0.003, "a")
+    histogram.observe(0.3, "a")
+
+    lines = histogram.render()
+    assert 'h_bucket{span="a",le="0.005"} 1' in lines
+    assert 'h_bucket{span="a",le="0.5"} 2' in lines
+    assert 'h_bucket{span="a",le="+Inf"} 2' in lines
+
+
+def test_sampling_profiler_dumps_folded_stacks(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path))
+    profiler.track("router.todo")
+    profiler.sample()
+    profiler.untrack()
+    profiler.sample()
+
+    (path,) = profiler.dump()
+    assert os.path.basename(path) == "router.todo.folded"
+    stack, count = open(path).read().strip().rsplit(" ", 1)
+    assert "test_sampling_profiler_dumps_folded_stacks" in stack
+    assert count == "1"
@@ -16,7 +16,7 @@ def test_entry_init():
     assert isinstance(entry.date_created, datetime.datetime)
     assert isinstance(entry.date_updated, datetime.datetime)
     assert len(entry.log) == 1
-    assert entry.log[0].startswith("Task created on ")
+    assert str(entry.log[0]).startswith("Task created on ")
 
 
 def test_entry_update_status():
@@ -24,7 +24,7 @@ def test_entry_update_status():
     entry.update_status(Status.COMPLETED)
     assert entry.status == Status.COMPLETED
     assert len(entry.log) == 2
-    assert entry.log[1].startswith("Status updated to COMPLETED on ")
+    assert str(entry.log[1]).startswith("Status updated to COMPLETED on ")
 
 
 def test_entry_update_title():
@@ -32,7 +32,7 @@ def test_entry_update_title():
     entry.update_title("Testing")
     assert entry.title == "Testing"
     assert len(entry.log) == 2
-    assert entry.log[1].startswith("Title updated to ")
+    assert str(entry.log[1]).startswith("Title updated to ")
 
 
 def test_entry_serialize_deserialize():
@@ -56,7 +56,7 @@ def test_entry_serialize_output():
     assert isinstance(serialized["date_created"], str)
     assert isinstance(serialized["date_updated"], str)
     assert len(serialized["log"]) == 1
-    assert serialized["log"][0].startswith("Task created on ")
+    assert serialized["log"][0] == ["c", serialized["date_created"]]
 
 
 def test_entry_deserialize_input():
@@ -77,7 +77,21 @@ def test_entry_deserialize_input():
     assert entry.status == Status.COMPLETED
     assert entry.date_created.isoformat() == "2024-01-01T10:00:00"
     assert entry.date_updated.isoformat() == "2024-01-01T12:00:00"
-    assert entry.log == data["log"]
+    assert [str(event) for event in entry.log] == data["log"]
+
+
+def test_entry_log_is_structured_and_reads_old_lines():
+    data = Entry(1, "Test Task").serialize()
+    data["log"].insert(0, "Task postponed to 02-01-2024 on 01-01-2024, 10:00:00")
+    entry = Entry.deserialize(data)
+    entry.update_title("Renamed")
+
+    assert not hasattr(entry, "__dict__")
+    assert [event.kind for event in entry.log] == ["n", "c", "t"]
+    assert str(entry.log[0]) == data["log"][0]
+    assert str(entry.log[2]).startswith("Title updated to Renamed from Test Task on ")
+    # old lines are written back untouched
+    assert entry.serialize()["log"][0] == data["log"][0]
 
 
 @fixture
@@ -188,3 +202,155 @@ def test_todo_reorder_basic(fake_todo_with_data):
     assert todo.get(0).title == "task3"
     assert todo.get(1).title == "task2"
     assert todo.get(2).title == "task1"
+
+
+def test_todo_ids_survive_reorders(fake_todo_with_data):
+    todo = Todo(fake_todo_with_data)
+    uids = [entry.uid for entry in todo.data]
+    assert len(set(uids)) == 3
+
+    todo.reorder(0, 2)
+    assert todo.index_of(uids[0]) == 2 and todo.index_of("0") == 0
+    assert Todo(fake_todo_with_data).index_of(uids[0]) == 2
+    with pytest.raises(IndexError):
+        todo.index_of("f" * 32)
+
+    todo.apply_batch([{"op": "status", "id": uids[0], "status": "completed"}])
+    assert Todo(fake_todo_with_data).get(2).status == Status.COMPLETED
+
+
+def test_todo_apply_batch(fake_todo_with_data):
+    todo = Todo(fake_todo_with_data, date="01-01-2025")
+    todo.add("task1")
+    todo.add("task2")
+    todo.add("task3")
+
+    affected = todo.apply_batch(
+        [
+            {"op": "status", "index": 0, "status": "completed"},
+            {"op": "title", "index": 1, "title": "renamed"},
+            {"op": "postpone", "index": 2},
+            {"op": "reorder", "from": 1, "to": 0},
+        ]
+    )
+
+    assert [(date, entry.title) for date, entry in affected] == [
+        ("01-01-2025", "task1"),
+        ("01-01-2025", "renamed"),
+        ("02-01-2025", "task3"),
+    ]
+    fresh = Todo(fake_todo_with_data, date="01-01-2025")
+    assert [e.title for e in fresh.data] == ["renamed", "task1"]
+    assert fresh.get(1).status == Status.COMPLETED
+    assert Todo(fake_todo_with_data, date="02-01-2025").get(0).title == "task3"
+
+
+def test_todo_apply_batch_normalizes_dates(fake_todo_with_data):
+    Todo(fake_todo_with_data, date="02-01-2025").add("later")
+    todo = Todo(fake_todo_with_data, date="01-01-2025")
+
+    affected = todo.apply_batch([{"op": "postpone", "index": 0, "date": "2-1-2025"}])
+
+    assert [(date, entry.title) for date, entry in affected] == [
+        ("03-01-2025", "later")
+    ]
+    assert Todo(fake_todo_with_data, date="03-01-2025").get(0).title == "later"
+
+
+def test_todo_apply_batch_is_all_or_nothing(fake_todo_with_data):
+    todo = Todo(fake_todo_with_data, date="01-01-2025")
+    todo.add("task1")
+
+    with pytest.raises(IndexError):
+        todo.apply_batch(
+            [
+                {"op": "status", "index": 0, "status": "completed"},
+                {"op": "postpone", "index": 5},
+            ]
+        )
+    with pytest.raises(ValueError):
+        todo.apply_batch([{"op": "explode", "index": 0}])
+
+    entry = Todo(fake_todo_with_data, date="01-01-2025").get(0)
+    assert entry.status == Status.PENDING
+    assert len(entry.log) == 1
+
+
+def test_todo_rollover_moves_a_week_of_pending_tasks_in_one_write(
+    fake_todo_file, monkeypatch
+):
+    for day in range(1, 8):
+        todo = Todo(fake_todo_file, date=f"0{day}-01-2025")
+        todo.add(f"open {day}")
+        todo.add(f"done {day}")
+        todo.update(1, status=Status.COMPLETED)
+    todo = Todo(fake_todo_file, date="08-01-2025")
+    todo.add("today")
+
+    writes = []
+    save_days = todo.storage.save_days
+    monkeypatch.setattr(
+        todo.storage,
+        "save_days",
+        lambda days, **kwargs: writes.append(sorted(days)) or save_days(days, **kwargs),
+    )
+    moved = todo.rollover(days=7)
+
+    assert len(writes) == 1 and len(writes[0]) == 8
+    assert [(date, entry.title) for date, entry in moved] == [
+        ("08-01-2025", f"open {day}") for day in range(1, 8)
+    ]
+    assert [entry.title for entry in todo.data] == ["today"] + [
+        f"open {day}" for day in range(1, 8)
+    ]
+    assert [entry.id for entry in todo.data] == list(range(8))
+    assert str(todo.get(1).log[-1]).startswith("Task postponed to 08-01-2025")
+    assert [e.title for e in Todo(fake_todo_file, date="01-01-2025").data] == ["done 1"]
+    assert todo.counters.get(["01-01-2025", "08-01-2025"]) == {
+        "01-01-2025": {"pending": 0, "completed": 1, "postponed": 1},
+        "08-01-2025": {"pending": 8},
+    }
+    assert todo.rollover(days=7) == [] and len(writes) == 1
+
+
+def test_todo_rolls_over_on_first_open_of_today(fake_todo_file, monkeypatch):
+    from config import config
+    from core import clock
+
+    Todo(fake_todo_file, date="01-01-2025").add("left over")
+    monkeypatch.setattr(config, "ROLLOVER_ON_OPEN", True)
+    with clock.frozen(datetime.datetime(2025, 1, 3, 9), "Asia/Kolkata"):
+        assert Todo(fake_todo_file, date="02-01-2025").data == []
+        assert [entry.title for entry in Todo(fake_todo_file).data] == ["left over"]
+    assert Todo(fake_todo_file, date="01-01-2025").data == []
+
+
+def test_todo_stats_buckets_and_streaks(fake_todo_file):
+    for date in ("30-12-2024", "31-12-2024", "01-01-2025", "06-01-2025"):
+        todo = Todo(fake_todo_file, date=date)
+        todo.add("task1")
+        todo.add("task2")
+        todo.update(0, status=Status.COMPLETED)
+    Todo(fake_todo_file, date="06-01-2025").postpone(1)
+
+    weekly = Todo.stats("30-12-2024", "12-01-2025", "week", path=fake_todo_file)
+
+    assert [b["label"] for b in weekly["buckets"]] == ["2025-W01", "2025-W02"]
+    first, second = weekly["buckets"]
+    assert first["counts"] == {
+        "completed": 3,
+        "pending": 3,
+        "deleted": 0,
+        "postponed": 0,
+    }
+    assert first["percentage"]["completed"] == 50.0
+    assert second["counts"]["postponed"] == 1
+    assert second["postpone_rate"] == 33.33
+    assert weekly["totals"]["total"] == 8
+    assert weekly["streak"]["longest"] == 3
+
+    monthly = Todo.stats("01-12-2024", "31-01-2025", "month", path=fake_todo_file)
+    assert [b["counts"]["completed"] for b in monthly["buckets"]] == [2, 2]
+
+    with pytest.raises(ValueError):
+        Todo.stats("02-01-2025", "01-01-2025", path=fake_todo_file)
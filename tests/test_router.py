@@ -0,0 +1,97 @@
+from core.model import Status, Todo
+from core.router import MAX_ROLLOVER_DAYS
+
+DATE = "01-01-2025"
+
+
+def test_batch_endpoint(client):
+    todo = Todo(date=DATE)
+    for title in ("task1", "task2", "task3"):
+        todo.add(title)
+    postponed = todo.get(2).uid
+
+    resp = client.post(
+        f"/todo/{DATE}/batch",
+        json={
+            "operations": [
+                {"op": "status", "index": 0, "status": "completed"},
+                {"op": "postpone", "index": 2},
+            ]
+        },
+    )
+
+    assert resp.status_code == 200
+    body = resp.get_data(as_text=True)
+    assert body.count('hx-swap-oob="true"') == 1
+    assert f'<div id="todo-entry-{postponed}" hx-swap-oob="delete"></div>' in body
+    assert Todo(date=DATE).get(0).status == Status.COMPLETED
+    assert len(Todo(date=DATE)) == 2
+
+
+def test_task_routes_accept_ids_and_indexes(client):
+    todo = Todo(date=DATE)
+    for title in ("task1", "task2", "task3"):
+        todo.add(title)
+    first = todo.get(0).uid
+    todo.reorder(0, 2)
+
+    resp = client.post(f"/todo/{DATE}/{first}/completed")
+    assert resp.status_code == 200 and f"todo-entry-{first}" in resp.text
+    assert Todo(date=DATE).get(2).status == Status.COMPLETED
+
+    # index based links keep working
+    assert client.delete(f"/todo/{DATE}/0/delete").status_code == 200
+    assert Todo(date=DATE).get(0).status == Status.DELETED
+    assert f"todo-entry-{first}" in client.get(f"/todo/{DATE}/{first}").text
+
+    assert client.post(f"/todo/{DATE}/{first}/postpone").status_code == 200
+    assert client.post(f"/todo/{DATE}/{first}/completed").status_code == 404
+    assert client.get(f"/todo/{DATE}/7").status_code == 404
+
+
+def test_batch_endpoint_rejects_bad_operations(client):
+    Todo(date=DATE).add("task1")
+
+    assert client.post(f"/todo/{DATE}/batch", json={}).status_code == 400
+    resp = client.post(
+        f"/todo/{DATE}/batch", json=[{"op": "status", "index": 3, "status": "done"}]
+    )
+    assert resp.status_code == 400
+    assert Todo(date=DATE).get(0).status == Status.PENDING
+
+
+def test_stats_endpoint(client):
+    Todo(date=DATE).add("task1")
+
+    resp = client.get(f"/stats?start={DATE}&end=31-01-2025&bucket=week")
+    assert resp.status_code == 200
+    assert resp.json["totals"]["counts"]["pending"] == 1
+    assert client.get("/stats?start=x&end=y").status_code == 400
+
+
+def test_dashboard_renders_history(client):
+    resp = client.get("/")
+
+    assert resp.status_code == 200
+    assert b"monthlyChart" in resp.data and b"yearlyChart" in resp.data
+
+
+def test_rollover_endpoint(client):
+    Todo(date="31-12-2024").add("carried")
+    Todo(date=DATE).add("fresh")
+
+    resp = client.post(f"/todo/{DATE}/rollover")
+    assert resp.status_code == 200
+    assert resp.get_data(as_text=True).count('id="todo-entry-') == 1
+    assert [entry.title for entry in Todo(date=DATE).data] == ["fresh", "carried"]
+    assert client.post(f"/todo/{DATE}/rollover?days=x").status_code == 400
+    assert client.post(f"/todo/{DATE}/rollover?days=-3").status_code == 400
+    assert client.post(f"/todo/{DATE}/rollover?days=0").status_code == 400
+
+
+def test_rollover_endpoint_caps_days(client, monkeypatch):
+    asked = []
+    monkeypatch.setattr(Todo, "rollover", lambda self, days: asked.append(days) or [])
+    client.post(f"/todo/{DATE}/rollover?days=100000000")
+    client.post(f"/todo/{DATE}/rollover?days=7")
+    assert asked == [MAX_ROLLOVER_DAYS, 7]
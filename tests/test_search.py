@@ -0,0 +1,67 @@
+import os
+
+from core import search
+from core.model import Todo
+
+
+def titles(results):
+    return [(result["date"], result["title"]) for result in results]
+
+
+def test_index_follows_mutations(storage):
+    todo = Todo(storage=storage, date="01-01-2025")
+    todo.add("Buy groceries")
+    todo.add("Write report")
+    todo.update(1, title="Write quarterly report")
+    todo.postpone(0)
+
+    index = search.index_for(storage)
+    assert titles(index.search("gro")) == [("02-01-2025", "Buy groceries")]
+    assert titles(index.search("quart rep")) == [
+        ("01-01-2025", "Write quarterly report")
+    ]
+    assert index.search("write weekly") == []
+    assert os.path.exists(f"{storage.path}.search")
+
+
+def test_results_are_ranked_by_recency(storage):
+    for date in ("01-01-2025", "03-01-2025", "02-01-2025"):
+        Todo(storage=storage, date=date).add(f"Standup {date}")
+
+    results = search.index_for(storage).search("standup")
+    assert [result["date"] for result in results] == [
+        "03-01-2025",
+        "02-01-2025",
+        "01-01-2025",
+    ]
+
+
+def test_index_is_built_from_existing_data_and_reloaded(storage):
+    Todo(storage=storage, date="01-01-2025").add("Existing task")
+    os.remove(f"{storage.path}.search")
+    search._indexes.clear()
+
+    assert titles(search.index_for(storage).search("exist")) == [
+        ("01-01-2025", "Existing task")
+    ]
+    # a fresh process replays the file instead of scanning the data
+    assert len(search.SearchIndex(f"{storage.path}.search")) == 1
+
+
+def test_batch_reindexes_the_day(storage):
+    todo = Todo(storage=storage, date="01-01-2025")
+    todo.add("Old title")
+    todo.apply_batch([{"op": "title", "index": 0, "title": "New title"}])
+
+    index = search.index_for(storage)
+    assert index.search("old") == []
+    assert titles(index.search("new")) == [("01-01-2025", "New title")]
+
+
+def test_search_endpoint(client):
+    Todo(date="01-01-2025").add("Call the dentist")
+
+    body = client.get("/search?q=dent").get_data(as_text=True)
+    assert "Call the dentist" in body
+    assert 'href="/todo?_t=01-01-2025"' in body
+    assert "No tasks match" in client.get("/search?q=zzz").get_data(as_text=True)
@@ -0,0 +1,268 @@
+import json
+import os
+
+import pytest
+from pytest import fixture
+
+from core.model import Status, Todo
+from core.storage import (
+    ConflictError,
+    JournalStorage,
+    JsonStorage,
+    ShardedStorage,
+    SqliteStorage,
+    get_storage,
+    migrate_to_shards,
+)
+
+
+@fixture
+def fake_todo_with_data(tmp_path):
+    todo_file = tmp_path / "todo.json"
+    todo_file.write_text("{}")
+    todo = Todo(str(todo_file), date="01-01-2025")
+    todo.add("task1")
+    todo.add("task2")
+    return str(todo_file)
+
+
+@fixture
+def journal(tmp_path):
+    todo_file = tmp_path / "todo.json"
+    todo_file.write_text("{}")
+    return JournalStorage(str(todo_file))
+
+
+def test_json_storage_round_trip(tmp_path):
+    todo_file = tmp_path / "todo.json"
+    todo_file.write_text("{}")
+    storage = JsonStorage(str(todo_file))
+
+    storage.append("01-01-2025", {"title": "a"})
+    storage.append("01-01-2025", {"title": "b"})
+    storage.reorder("01-01-2025", 0, 1)
+    storage.move("01-01-2025", 0, "02-01-2025", {"title": "b"})
+
+    assert storage.load_day("01-01-2025") == [{"title": "a"}]
+    assert storage.load_day("02-01-2025") == [{"title": "b"}]
+    assert json.loads(todo_file.read_text())["02-01-2025"] == [{"title": "b"}]
+
+
+def test_journal_appends_one_line_per_mutation(journal):
+    journal.append("01-01-2025", {"title": "a"})
+    journal.append("01-01-2025", {"title": "b"})
+    journal.replace("01-01-2025", 1, {"title": "c"})
+
+    with open(journal.log_path) as f:
+        lines = f.readlines()
+
+    assert len(lines) == 3
+    assert json.loads(lines[2]) == {
+        "op": "replace",
+        "date": "01-01-2025",
+        "index": 1,
+        "entry": {"title": "c"},
+    }
+    # the snapshot is untouched until compaction
+    with open(journal.path) as f:
+        assert json.load(f) == {}
+
+
+def test_journal_saves_a_batch_as_one_event(journal):
+    journal.append("01-01-2025", {"title": "a"})
+    stale = journal.save_days({"01-01-2025": [], "02-01-2025": [{"title": "a"}]})
+
+    with open(journal.log_path) as f:
+        assert len(f.readlines()) == 2
+    assert JournalStorage(journal.path).load_day("02-01-2025") == [{"title": "a"}]
+    with pytest.raises(ConflictError):
+        journal.save_days({"02-01-2025": []}, expected={"01-01-2025": "stale"})
+    assert journal.save_days({}, expected=stale) == {}
+
+
+def test_journal_replays_after_reopen(journal):
+    journal.append("01-01-2025", {"title": "a"})
+    journal.append("01-01-2025", {"title": "b"})
+    journal.reorder("01-01-2025", 1, 0)
+    journal.move("01-01-2025", 1, "02-01-2025", {"title": "a", "moved": True})
+
+    reopened = JournalStorage(journal.path)
+    assert reopened.load_day("01-01-2025") == [{"title": "b"}]
+    assert reopened.load_day("02-01-2025") == [{"title": "a", "moved": True}]
+
+
+def test_journal_ignores_torn_last_line(journal):
+    journal.append("01-01-2025", {"title": "a"})
+    with open(journal.log_path, "a") as f:
+        f.write('{"op": "add", "date": "01-01-2025"')
+
+    assert JournalStorage(journal.path).load_day("01-01-2025") == [{"title": "a"}]
+
+
+def test_journal_compaction_folds_into_snapshot(journal):
+    for i in range(5):
+        journal.append("01-01-2025", {"title": str(i)})
+
+    journal.compact()
+
+    with open(journal.path) as f:
+        snapshot = json.load(f)
+    assert [e["title"] for e in snapshot["01-01-2025"]] == ["0", "1", "2", "3", "4"]
+
+    journal.append("01-01-2025", {"title": "5"})
+    reopened = JournalStorage(journal.path)
+    assert len(reopened.load_day("01-01-2025")) == 6
+
+
+def test_journal_compacts_in_background(tmp_path):
+    todo_file = tmp_path / "todo.json"
+    todo_file.write_text("{}")
+    storage = JournalStorage(str(todo_file), compact_every=3)
+
+    for i in range(4):
+        storage.append("01-01-2025", {"title": str(i)})
+    storage.close()
+
+    with open(storage.path) as f:
+        assert len(json.load(f)["01-01-2025"]) == 3
+    assert len(JournalStorage(storage.path).load_day("01-01-2025")) == 4
+
+
+def test_todo_on_journal_storage(journal):
+    todo = Todo(storage=journal, date="01-01-2025")
+    todo.add("task1")
+    todo.add("task2")
+    todo.update(0, status=Status.COMPLETED)
+    todo.postpone(1)
+
+    assert [e.status for e in Todo(storage=journal, date="01-01-2025").data] == [
+        Status.COMPLETED
+    ]
+    assert Todo(storage=journal, date="02-01-2025").get(0).title == "task2"
+
+
+@pytest.mark.parametrize(
+    "layout, shard", [("day", "2025-01-31.json"), ("month", "2025-01.json")]
+)
+def test_sharded_storage_writes_one_shard(tmp_path, layout, shard):
+    storage = ShardedStorage(str(tmp_path), layout)
+    storage.append("31-01-2025", {"title": "a"})
+
+    assert os.listdir(tmp_path) == [shard]
+    assert storage.load_day("31-01-2025") == [{"title": "a"}]
+    assert storage.load_day("01-02-2025") == []
+
+
+def test_sharded_storage_rejects_bad_keys(tmp_path):
+    with pytest.raises(ValueError):
+        ShardedStorage(str(tmp_path)).load_day("../../etc/passwd")
+
+
+def test_migrate_to_shards(tmp_path):
+    todo_file = tmp_path / "todo.json"
+    todo_file.write_text("{}")
+    todo = Todo(str(todo_file), date="31-01-2025")
+    todo.add("task1")
+    Todo(str(todo_file), date="01-02-2025").add("task2")
+
+    migrate_to_shards(str(todo_file), "month")
+
+    storage = get_storage(str(todo_file), layout="month")
+    assert sorted(os.listdir(storage.path)) == ["2025-01.json", "2025-02.json"]
+    assert sorted(storage.dates()) == ["01-02-2025", "31-01-2025"]
+    assert Todo(storage=storage, date="31-01-2025").get(0).title == "task1"
+
+
+@fixture
+def sqlite(tmp_path):
+    return SqliteStorage(str(tmp_path / "todo.sqlite3"))
+
+
+def _entry(title: str, status: str = "pending") -> dict:
+    return {
+        "id": 0,
+        "title": title,
+        "status": status,
+        "date_created": "2025-01-01T10:00:00",
+        "date_updated": "2025-01-01T10:00:00",
+        "log": [f"created {title}"],
+    }
+
+
+def test_sqlite_storage_mutations(sqlite):
+    for title in ["a", "b", "c"]:
+        sqlite.append("01-01-2025", _entry(title))
+
+    sqlite.reorder("01-01-2025", 0, 2)
+    assert [e["title"] for e in sqlite.load_day("01-01-2025")] == ["b", "c", "a"]
+    sqlite.reorder("01-01-2025", 2, 0)
+    assert [e["title"] for e in sqlite.load_day("01-01-2025")] == ["a", "b", "c"]
+
+    sqlite.replace("01-01-2025", 1, _entry("B", "completed"))
+    sqlite.move("01-01-2025", 0, "02-01-2025", _entry("a"))
+
+    assert sqlite.load_day("01-01-2025") == [_entry("B", "completed"), _entry("c")]
+    assert sqlite.load_day("02-01-2025") == [_entry("a")]
+    assert sqlite.dates() == ["01-01-2025", "02-01-2025"]
+
+
+def test_sqlite_reorder_updates_only_the_moved_row(sqlite):
+    sqlite.save_day("01-01-2025", [_entry(title) for title in "abcd"])
+    db = sqlite._connect()
+
+    def positions():
+        return dict(db.execute("SELECT title, position FROM entries").fetchall())
+
+    before = positions()
+    sqlite.reorder("01-01-2025", 3, 1)
+    after = positions()
+    assert [title for title in after if after[title] != before[title]] == ["d"]
+    columns = {row[1]: row[2] for row in db.execute("PRAGMA table_info(entries)")}
+    assert columns["position"] == "REAL"
+
+    # moving into the same gap until the floats run out renumbers the day
+    for _ in range(60):
+        sqlite.reorder("01-01-2025", 3, 2)
+    assert [e["title"] for e in sqlite.load_day("01-01-2025")] == list("adbc")
+    assert len(set(positions().values())) == 4
+
+
+def test_sqlite_status_counts_are_grouped(sqlite):
+    sqlite.save_days(
+        {
+            "01-01-2025": [_entry("a", "completed"), _entry("b"), _entry("c")],
+            "02-01-2025": [_entry("d", "deleted")],
+        }
+    )
+
+    assert sqlite.status_counts(["01-01-2025", "02-01-2025", "03-01-2025"]) == {
+        "01-01-2025": {"completed": 1, "pending": 2},
+        "02-01-2025": {"deleted": 1},
+        "03-01-2025": {},
+    }
+
+
+def test_sqlite_json_import_export(tmp_path, sqlite, fake_todo_with_data):
+    assert sqlite.import_json(fake_todo_with_data) == 1
+    exported = tmp_path / "exported.json"
+    sqlite.export_json(str(exported))
+
+    with open(fake_todo_with_data) as f:
+        assert json.load(f) == json.loads(exported.read_text())
+
+
+def test_todo_on_sqlite_storage(sqlite):
+    todo = Todo(storage=sqlite, date="01-01-2025")
+    todo.add("task1")
+    todo.add("task2")
+    todo.update(0, status=Status.COMPLETED)
+    todo.postpone(1)
+
+    todo = Todo(storage=sqlite, date="01-01-2025")
+    assert todo.percentage() == {"completed": 100.0, "pending": 0.0, "deleted": 0.0}
+    assert Todo(storage=sqlite, date="02-01-2025").get(0).title == "task2"
+    stats = Todo.stats("01-01-2025", "02-01-2025", storage=sqlite)
+    assert [b["counts"] for b in stats["buckets"]] == [
+        {"completed": 1, "pending": 0, "deleted": 0, "postponed": 1},
+        {"completed": 0, "pending": 1, "deleted": 0, "postponed": 0},
+    ]
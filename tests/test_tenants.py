@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from config import config
+from core import counters, locking, profiler, storage, tenants
+from core.counters import counters_for
+from core.model import Todo
+from core.tenants import JournalPool, hash_key
+
+DATE = "01-01-2025"
+
+
+@pytest.fixture
+def tenants_dir(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TENANTS_DIR", str(tmp_path / "tenants"))
+    tenants.keys_for(config.TENANTS_DIR).register({"ada": "key-a", "bob": "key-b"})
+    yield config.TENANTS_DIR
+    tenants.pool_for(config.TENANTS_DIR).close()
+
+
+def test_each_tenant_logs_into_a_journal_of_its_own(app, tenants_dir):
+    client = app.test_client()
+
+    assert client.post("/login", data={"login-key": "nope"}).data == (
+        b"Invalid login key"
+    )
+    client.post("/login", data={"login-key": "key-a"}).close()
+    assert client.get_cookie("_s_key").value == hash_key("key-a")
+    client.post(f"/todo?_t={DATE}", data={"title": "Ada's task"}).close()
+
+    client.set_cookie("_s_key", hash_key("key-b"))
+    with client.get(f"/todo?_t={DATE}") as page:
+        assert b"Ada's task" not in page.data
+    client.set_cookie("_s_key", config.HASHED_LOGIN_KEY)
+    with client.get(f"/todo?_t={DATE}") as page:
+        assert b"Ada's task" not in page.data
+    assert len(Todo(date=DATE)) == 0
+
+    pool = tenants.pool_for(tenants_dir)
+    assert os.path.exists(pool.data_path("bob"))
+    assert pool.stats()["in_use"] == 0
+    ada = Todo(storage=storage.get_storage(pool.data_path("ada")), date=DATE)
+    assert ada.get(0).title == "Ada's task"
+
+
+def test_register_rejects_bad_names_and_shared_keys(tenants_dir):
+    keys = tenants.keys_for(tenants_dir)
+    with pytest.raises(ValueError):
+        keys.register({"../etc": "key-x"})
+    with pytest.raises(ValueError):
+        keys.register({"cy": "key-a"})
+    with pytest.raises(ValueError):
+        keys.register({"cy": config.LOGIN_KEY})
+    keys.register({"ada": "new-key"})
+    assert keys.names() == ["ada", "bob"]
+    assert tenants.resolve(hash_key("new-key")) == "ada"
+    assert tenants.resolve(hash_key("key-a")) is None
+
+
+def test_pool_closes_least_recently_used_and_idle_journals(tmp_path):
+    pool = JournalPool(str(tmp_path), max_open=2, idle_seconds=3600)
+    ada = pool.acquire("ada")
+    Todo(storage=ada.storage, date=DATE).add("Keep me")
+    counts_path = ada.storage.path
+    assert counters_for(ada.storage) is counters._counters[counts_path]
+    pool.release(ada)
+
+    # an unused journal is closed once the pool is full, one in use is kept
+    bob = pool.acquire("bob")
+    pool.release(pool.acquire("cy"))
+    assert (len(pool), pool.evictions) == (2, 1)
+    assert counts_path not in counters._counters
+    assert not any(path.startswith(str(tmp_path / "ada")) for path in locking._locks)
+    assert all(s.path != counts_path for s in storage._storages.values())
+    pool.release(pool.acquire("dan"))
+    assert len(pool) == 2 and pool.acquire("bob") is bob
+
+    # reopened lazily, from the files on disk
+    assert Todo(storage=pool.acquire("ada").storage, date=DATE).get(0).title == (
+        "Keep me"
+    )
+
+    pool.idle_seconds = 0
+    assert pool.evict_idle() == 0
+    for _ in range(2):
+        pool.release(bob)
+    pool.release(pool._open["ada"])
+    assert pool.evict_idle() == 2 and len(pool) == 0
+    pool.close()
+
+
+def test_only_the_primary_login_sees_process_wide_state(app, tenants_dir, monkeypatch):
+    monkeypatch.setattr(config, "METRICS", True)
+    client = app.test_client()
+
+    client.set_cookie("_s_key", hash_key("key-a"))
+    for method, url in [
+        ("GET", "/_stats/cache"),
+        ("GET", "/metrics"),
+        ("POST", "/metrics/profile?enabled=1"),
+    ]:
+        with client.open(url, method=method) as response:
+            assert response.status_code == 403
+    assert profiler.active is None
+
+    client.set_cookie("_s_key", config.HASHED_LOGIN_KEY)
+    assert client.get("/_stats/cache").status_code == 200
+    assert client.get("/metrics").status_code == 200
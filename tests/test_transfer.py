@@ -0,0 +1,109 @@
+import io
+
+import pytest
+from pytest import fixture
+
+from core import transfer
+from core.counters import counters_for
+from core.model import Status, Todo
+from core.storage import JournalStorage, JsonStorage
+
+
+def _storage(tmp_path, name):
+    todo_file = tmp_path / name
+    todo_file.write_text("{}")
+    return JsonStorage(str(todo_file))
+
+
+@fixture
+def storage(storage):
+    for date in ("31-12-2024", "01-01-2025", "02-01-2025"):
+        todo = Todo(storage=storage, date=date)
+        todo.add(f"Plan {date}")
+        todo.add(f'Review "notes", {date}')
+        todo.update(1, status=Status.COMPLETED)
+    return storage
+
+
+@pytest.mark.parametrize("format", transfer.FORMATS)
+def test_round_trip(storage, tmp_path, format):
+    lines = list(transfer.export(storage, format))
+    assert len(lines) == 6 + (format == "csv")
+
+    target = _storage(tmp_path, "copy.json")
+    assert transfer.load(target, io.StringIO("".join(lines)), format) == 6
+    # the copy keeps the task ids, and the logs the source moved to its
+    # history store
+    assert list(transfer.export(target, format)) == lines
+    assert counters_for(target).get(["01-01-2025"])["01-01-2025"] == {
+        "pending": 1,
+        "completed": 1,
+    }
+
+    # entries already in the journal are skipped
+    assert transfer.load(target, io.StringIO("".join(lines)), format) == 0
+
+
+def test_export_window_is_in_date_order(storage):
+    rows = list(transfer.entries(storage, start="01-01-2025"))
+    assert [date for date, _ in rows] == ["01-01-2025"] * 2 + ["02-01-2025"] * 2
+    assert list(transfer.entries(storage, end="31-12-2024"))[0][1]["title"] == (
+        "Plan 31-12-2024"
+    )
+
+
+def test_export_reads_a_single_file_journal_once(storage, monkeypatch):
+    monkeypatch.setattr(transfer, "EXPORT_CHUNK_DAYS", 1)
+    reads = []
+    read = storage._read
+    monkeypatch.setattr(storage, "_read", lambda: reads.append(1) or read())
+
+    assert len(list(transfer.export(storage))) == 6
+    # one read to list the days, one for all of their entries
+    assert len(reads) == 2
+
+
+def test_import_writes_once_per_chunk(storage, tmp_path, monkeypatch):
+    target = JournalStorage(str(_storage(tmp_path, "journal.json").path))
+    writes = []
+    save_days = target.save_days
+    monkeypatch.setattr(
+        target, "save_days", lambda days, **kw: writes.append(days) or save_days(days)
+    )
+
+    lines = transfer.export(storage)
+    assert transfer.load(target, lines, chunk_size=4) == 6
+    assert [sum(map(len, days.values())) for days in writes] == [4, 2]
+    assert [entry["id"] for entry in target.load_day("02-01-2025")] == [0, 1]
+    target.close()
+
+
+def test_import_normalizes_day_keys(storage):
+    line = '{"date": "1-1-2025", "title": "Unpadded", "date_created": "2025-01-01"}\n'
+    assert transfer.load(storage, [line]) == 1
+    assert Todo(storage=storage, date="01-01-2025").get(2).title == "Unpadded"
+    assert counters_for(storage).get(["01-01-2025"])["01-01-2025"]["pending"] == 2
+    assert "1-1-2025" not in storage.dates()
+
+
+def test_import_rejects_bad_lines(storage):
+    lines = ['{"date": "01-01-2025", "title": "ok", "date_created": "2025-01-01"}\n']
+    lines.append('{"date": "01-01-2025", "title": "x", "status": "lost"}\n')
+    with pytest.raises(ValueError, match="Line 2"):
+        transfer.load(storage, lines)
+    with pytest.raises(ValueError, match="Line 1"):
+        transfer.load(storage, ["not json\n"])
+
+
+def test_export_endpoint(storage, client):
+
+    response = client.get("/export?format=csv&start=01-01-2025&end=01-01-2025")
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert response.is_streamed
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == ",".join(transfer.FIELDS)
+    assert len(lines) == 3
+
+    assert client.get("/export?format=xml").status_code == 400
+    assert client.get("/export?start=2025").status_code == 400